@@ -0,0 +1,46 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from main.custom.cache import cache as tiered_cache
+from users.models import Customer, DailyActivity, Driver, User
+
+
+class DashboardTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            phone_number="+15550009000", email="admin@example.com"
+        )
+        for number, is_verified in enumerate([True, None, None], 1):
+            user = User.objects.create_user(
+                phone_number=f"+1555000900{number}", email=f"user{number}@example.com"
+            )
+            Driver.objects.create(user=user, is_verified=is_verified)
+            DailyActivity.objects.create(user=user, day=timezone.localdate())
+        Customer.objects.create(user=cls.admin, is_verified=True)
+
+    def setUp(self):
+        cache.clear()
+        tiered_cache.local.clear()
+
+    def test_renders_counts(self):
+        self.client.force_login(self.admin)
+        response = self.client.get("/", HTTP_HOST="dj-admin.localhost")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                response.context[name]
+                for name in (
+                    "drivers_count",
+                    "pending_drivers_count",
+                    "customers_count",
+                    "pending_customers_count",
+                    "active_users_today",
+                )
+            ],
+            [1, 2, 1, 0, 3],
+        )
+        self.assertContains(response, "Active users: 3 today")
+        self.assertContains(response, '?is_verified__isnull=True">2</a>')
+        self.assertEqual(len(response.context["daily_active_users"]), 7)
@@ -6,19 +6,45 @@
 # from django.db.models.aggregates import Count
 # from django.utils import timezone
 # from django.utils.html import escape
+from django.contrib import admin
 from django.views.generic import TemplateView
 # from django_datatables_view.base_datatable_view import BaseDatatableView
 
 # from bookings.models import CustomerAd, DriverAd, Booking, Transaction
+from main.custom.cache import cache
 from main.custom.permissions import StaffUserRequiredMixin
 # from main.helpers.weekdays import weekdays
-# from users.models import User, Driver, Customer
+from users.activity import daily_active_users
+from users.models import Driver, Customer
 # from vehicles.models import Vehicle
 
 
+def verification_counts():
+    return {
+        "drivers_count": Driver.objects.filter(is_verified=True).count(),
+        "customers_count": Customer.objects.filter(is_verified=True).count(),
+        "pending_drivers_count": Driver.objects.filter(is_verified__isnull=True).count(),
+        "pending_customers_count": Customer.objects.filter(is_verified__isnull=True).count(),
+    }
+
+
 class Dashboard(StaffUserRequiredMixin, TemplateView):
     template_name = 'admin_panel/dashboard.html'
 
+    def get_context_data(self, **kwargs):
+        # the admin's header and navigation, the template extends its base
+        context = {**super().get_context_data(**kwargs), **admin.site.each_context(self.request)}
+        # invalidated by every Driver/Customer save, see users.signals
+        counts = cache.get_or_set("verification-counts", verification_counts, tags=["verification"])
+        # DailyActivity is written in batches anyway, a minute behind is fine
+        active = cache.get_or_set("daily-active-users", daily_active_users, timeout=60)
+        return {
+            **context,
+            **counts,
+            "daily_active_users": active,
+            "active_users_today": active[-1][1],
+        }
+
 #     def get_context_data(self, **kwargs):
 #         print(self.request.build_absolute_uri)
 #         context = super().get_context_data(**kwargs)
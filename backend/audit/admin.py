@@ -0,0 +1,26 @@
+from django.contrib import admin
+
+from main.custom.paginations import EstimatedCountPaginator
+from .models import Event
+
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the audit log, newest first. Filter with query
+    parameters such as ?actor_id=42 (indexed) or ?kind=auth.login.
+    """
+
+    list_display = ["created", "kind", "actor_id", "ip"]
+    ordering = ("-created",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
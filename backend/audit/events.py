@@ -0,0 +1,100 @@
+"""
+Audit events: who did what, and from where.
+
+log() only appends to a per-process buffer. EventBuffer writes each batch
+with a single COPY on PostgreSQL (bulk_create elsewhere) from a background
+thread, see main.helpers.buffers. Events are written outside the request's
+transaction, so an event is kept even when the request rolls back.
+"""
+
+import csv
+import io
+import ipaddress
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+
+from main.helpers.buffers import FlushingBuffer
+from . import partitions
+from .models import Event
+
+COLUMNS = ("created", "kind", "actor_id", "ip", "data")
+
+
+class EventBuffer(FlushingBuffer):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # months whose partition this process has already made sure of
+        self.months = set()
+
+    def write(self, items):
+        connection = connections[router.db_for_write(Event)]
+        if connection.vendor != "postgresql":
+            Event.objects.using(connection.alias).bulk_create(
+                (Event(**dict(zip(COLUMNS, item))) for item in items),
+                batch_size=1000,
+            )
+            return
+
+        rows = io.StringIO()
+        writer = csv.writer(rows)
+        for created, kind, actor_id, ip, data in items:
+            # None is written unquoted and empty, which COPY reads as NULL
+            writer.writerow(
+                (
+                    created.isoformat(),
+                    kind,
+                    actor_id,
+                    ip,
+                    json.dumps(data, cls=DjangoJSONEncoder),
+                )
+            )
+        rows.seek(0)
+        with connection.cursor() as cursor:
+            for month in {
+                partitions.month_start(item[0]) for item in items
+            } - self.months:
+                partitions.create_partition(cursor, month)
+                self.months.add(month)
+            with connection.wrap_database_errors:
+                cursor.copy_expert(
+                    f"COPY {Event._meta.db_table} ({', '.join(COLUMNS)}) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    rows,
+                )
+
+
+buffer = EventBuffer(
+    max_size=settings.AUDIT_BUFFER_SIZE, interval=settings.AUDIT_FLUSH_INTERVAL
+)
+
+
+def client_ip(request):
+    ip = BaseThrottle().get_ident(request)
+    try:
+        return str(ipaddress.ip_address(ip.strip()))
+    except ValueError:
+        # a forged X-Forwarded-For would fail the whole batch
+        return None
+
+
+def log(kind, actor=None, request=None, **data):
+    """
+    Record that `actor` (a user or user id, by default the user of `request`)
+    did `kind`, with `data` as the details.
+    """
+    if actor is None and request is not None and request.user.is_authenticated:
+        actor = request.user
+    buffer.add(
+        (
+            timezone.now(),
+            kind,
+            getattr(actor, "pk", actor),
+            client_ip(request) if request is not None else None,
+            data,
+        )
+    )
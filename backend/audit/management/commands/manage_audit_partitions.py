@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from audit import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the audit_event partitions of the coming months and drop the "
+        "ones older than the retention period. Run it daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead", type=int, default=settings.AUDIT_PARTITIONS_AHEAD
+        )
+        parser.add_argument(
+            "--retention-months", type=int, default=settings.AUDIT_RETENTION_MONTHS
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write("audit_event is only partitioned on PostgreSQL.")
+            return
+        month = partitions.month_start(timezone.now())
+        with connection.cursor() as cursor:
+            partitions.create_partitions(cursor, month, options["ahead"] + 1)
+            dropped = partitions.drop_partitions_before(
+                cursor, partitions.add_months(month, -options["retention_months"])
+            )
+            kept = sorted(partitions.list_partitions(cursor).values())
+        for name in dropped:
+            self.stdout.write(f"Dropped {name}")
+        self.stdout.write(f"Partitions: {', '.join(kept)}")
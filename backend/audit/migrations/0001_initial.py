@@ -0,0 +1,85 @@
+# Generated by Django 3.2.10 on 2026-10-19 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+from audit import partitions
+
+
+def create_event_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.create_model(apps.get_model("audit", "Event"))
+        return
+    # the partition key has to be part of the primary key
+    schema_editor.execute("""
+        CREATE TABLE audit_event (
+            id bigserial NOT NULL,
+            created timestamp with time zone NOT NULL,
+            kind varchar(50) NOT NULL,
+            actor_id bigint NULL,
+            ip inet NULL,
+            data jsonb NOT NULL,
+            PRIMARY KEY (id, created)
+        ) PARTITION BY RANGE (created)
+        """)
+    schema_editor.execute(
+        "CREATE INDEX audit_event_created_idx ON audit_event (created DESC)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX audit_event_actor_idx ON audit_event (actor_id, created)"
+    )
+    with schema_editor.connection.cursor() as cursor:
+        partitions.create_partitions(
+            cursor,
+            partitions.month_start(timezone.now()),
+            settings.AUDIT_PARTITIONS_AHEAD + 1,
+        )
+
+
+def drop_event_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.delete_model(apps.get_model("audit", "Event"))
+        return
+    # drops the partitions with it
+    schema_editor.execute("DROP TABLE audit_event")
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="Event",
+                    fields=[
+                        ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                        ("created", models.DateTimeField()),
+                        ("kind", models.CharField(max_length=50)),
+                        ("actor_id", models.BigIntegerField(blank=True, null=True)),
+                        (
+                            "ip",
+                            models.GenericIPAddressField(blank=True, null=True),
+                        ),
+                        ("data", models.JSONField(blank=True, default=dict)),
+                    ],
+                    options={
+                        "indexes": [
+                            models.Index(
+                                fields=["-created"], name="audit_event_created_idx"
+                            ),
+                            models.Index(
+                                fields=["actor_id", "created"],
+                                name="audit_event_actor_idx",
+                            ),
+                        ],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_event_table, drop_event_table),
+    ]
@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class Event(models.Model):
+    """
+    Append-only audit log, written in batches by audit.events.
+
+    On PostgreSQL the table is range partitioned by month on `created` (see
+    audit.partitions). actor_id is a plain column, so events outlive the
+    users they mention.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    created = models.DateTimeField()
+    kind = models.CharField(max_length=50)
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    ip = models.GenericIPAddressField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created"], name="audit_event_created_idx"),
+            models.Index(fields=["actor_id", "created"], name="audit_event_actor_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} by {self.actor_id} at {self.created:%Y-%m-%d %H:%M:%S}"
@@ -0,0 +1,68 @@
+"""
+Monthly range partitions of audit_event, on PostgreSQL.
+
+Partitions are named audit_event_yYYYYmMM and each holds one calendar month
+(UTC). They are created ahead of time by the migration and by
+manage_audit_partitions, and on demand by the event writer. Pruning detaches
+and drops whole partitions, so it never DELETEs from the live table.
+"""
+
+import re
+from datetime import date
+
+TABLE = "audit_event"
+_NAME = re.compile(rf"^{TABLE}_y(?P<year>\d{{4}})m(?P<month>\d{{2}})$")
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+def create_partition(cursor, month):
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE} "
+        "FOR VALUES FROM (%s) TO (%s)",
+        [f"{month} 00:00+00", f"{add_months(month, 1)} 00:00+00"],
+    )
+
+
+def create_partitions(cursor, first, count):
+    """Create the partitions of `count` months starting at `first`."""
+    for offset in range(count):
+        create_partition(cursor, add_months(first, offset))
+
+
+def list_partitions(cursor):
+    """{month: partition name} of the existing monthly partitions."""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = %s::regclass",
+        [TABLE],
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = _NAME.match(name)
+        if match:
+            partitions[date(int(match["year"]), int(match["month"]), 1)] = name
+    return partitions
+
+
+def drop_partitions_before(cursor, month):
+    """Detach and drop the partitions of the months before `month`."""
+    dropped = []
+    for start, name in sorted(list_partitions(cursor).items()):
+        if start >= month:
+            continue
+        cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+        cursor.execute(f"DROP TABLE {name}")
+        dropped.append(name)
+    return dropped
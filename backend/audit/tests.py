@@ -0,0 +1,33 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from . import events
+from .models import Event
+
+
+class EventBufferTest(TestCase):
+    def setUp(self):
+        # a fresh buffer, partitions made by an earlier test were rolled back
+        self.buffer = events.EventBuffer(max_size=2)
+
+    def test_flush_persists_events(self):
+        now = timezone.now()
+        self.buffer.add((now, "login", 1, "203.0.113.7", {"method": "password"}))
+        self.assertFalse(Event.objects.exists())
+        self.buffer.flush()
+        event = Event.objects.get()
+        self.assertEqual(
+            (event.created, event.kind, event.actor_id, event.ip, event.data),
+            (now, "login", 1, "203.0.113.7", {"method": "password"}),
+        )
+
+    def test_full_buffer_is_written_without_a_flusher_thread(self):
+        now = timezone.now()
+        self.buffer.add((now, "logout", None, None, {}))
+        self.buffer.add((now, "logout", 2, None, {}))
+        self.assertEqual(self.buffer.items, [])
+        self.assertQuerysetEqual(
+            Event.objects.order_by("id").values_list("actor_id", "ip"),
+            [(None, None), (2, None)],
+            transform=tuple,
+        )
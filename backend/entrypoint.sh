@@ -10,6 +10,12 @@ done
 fi
 
 python manage.py migrate
-python manage.py collectstatic --no-input
+# collectstatic is only needed when a static source or a dependency changed
+# since the last manifest was written; the storage itself skips unchanged files
+MANIFEST=staticfiles/staticfiles.json
+if [ ! -f "$MANIFEST" ] || [ -n "$(find templates/static pyproject.toml poetry.lock -newer "$MANIFEST" -print -quit)" ]
+then
+    python manage.py collectstatic --no-input
+fi
 
 exec "$@"
\ No newline at end of file
@@ -0,0 +1,32 @@
+# gunicorn reads ./gunicorn.conf.py automatically
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    # files left by a previous master would be merged into every scrape
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # load the revoked tokens while the worker boots, not on its first request
+    from users import revocation
+
+    revocation.store.start()
+
+
+def worker_exit(server, worker):
+    # write out what the worker still buffers, e.g. audit events
+    from main.helpers.buffers import flush_all
+
+    flush_all()
@@ -0,0 +1,25 @@
+"""
+Load generator for the client API.
+
+    python manage.py seed_loadtest_users
+    python -m loadtest --duration 60 --output before.json
+    python -m loadtest --compare before.json
+
+Virtual users pick weighted scenarios (see scenarios.py) until the duration
+is over; the JSON report holds throughput and p50/p95/p99 per endpoint.
+
+Run it against gunicorn, not through nginx. Virtual users send the
+X-Forwarded-For header nginx would, spread over --client-ips addresses, and
+the throttle reads it with NUM_PROXIES=1. Through nginx the generator's own
+address is appended and every request lands in one ip bucket. Production
+only publishes gunicorn on the host's loopback, so run it from there.
+
+--attackers adds virtual users trying wrong passwords at --attack-rate
+attempts per second from --attacker-ips addresses, next to the mix; compare
+with a run without them to see what the attack costs everyone else:
+
+    python -m loadtest --pace 2 --duration 120 --output baseline.json
+    python -m loadtest --pace 2 --duration 120 --attackers 20 --compare baseline.json
+
+Measured reports are kept in loadtest/reports/.
+"""
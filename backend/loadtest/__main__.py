@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from .scenarios import DEFAULT_MIX, SCENARIOS, Session
+from .stats import Recorder, compare
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(
+                f"unknown scenario {name!r}, choose from {', '.join(SCENARIOS)}"
+            )
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m loadtest",
+        description=(
+            "Drive the client API with concurrent virtual users and report "
+            "throughput and latency percentiles per endpoint as JSON. Seed the "
+            "users first with `manage.py seed_loadtest_users`."
+        ),
+    )
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--host", help="Host header, e.g. client-api.example.com")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="weighted scenarios, e.g. poll=8,upload=1,register=1",
+    )
+    parser.add_argument(
+        "--pace",
+        type=float,
+        default=0,
+        help="seconds between the starts of a virtual user's scenarios",
+    )
+    parser.add_argument("--polls", type=int, default=5, help="GET /user/ per poll")
+    parser.add_argument("--users", type=int, default=1000, help="seeded users")
+    parser.add_argument(
+        "--client-ips",
+        type=int,
+        default=1000,
+        help="forwarded client addresses the virtual users spread over",
+    )
+    parser.add_argument(
+        "--attackers",
+        type=int,
+        default=0,
+        help="virtual users running credential_stuffing alongside the mix",
+    )
+    parser.add_argument(
+        "--attack-rate",
+        type=float,
+        default=20,
+        help="login attempts per second, shared by the attackers",
+    )
+    parser.add_argument(
+        "--attacker-ips",
+        type=int,
+        default=10,
+        help="addresses the attackers spread over",
+    )
+    parser.add_argument("--phone-prefix", default="+1555")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    parser.add_argument("--seed", type=int, help="random seed for the scenario mix")
+    return parser.parse_args(argv)
+
+
+async def virtual_user(config, client, recorder, deadline, mix, interval=0):
+    """Run scenarios from `mix`, starting one every `interval` seconds at most."""
+    session = Session(client, recorder, config)
+    names = list(mix)
+    weights = list(mix.values())
+    start = time.monotonic()
+    while start < deadline:
+        scenario = SCENARIOS[random.choices(names, weights)[0]]
+        await scenario(session)
+        start += interval
+        await asyncio.sleep(start - time.monotonic())
+        start = max(start, time.monotonic())
+
+
+async def run(config):
+    recorder = Recorder()
+    headers = {"Host": config.host} if config.host else {}
+    limits = httpx.Limits(max_connections=config.concurrency + config.attackers)
+    async with httpx.AsyncClient(
+        base_url=config.base_url,
+        headers=headers,
+        limits=limits,
+        timeout=config.timeout,
+    ) as client:
+        start = time.monotonic()
+        deadline = start + config.duration
+        users = [
+            virtual_user(
+                config, client, recorder, deadline, config.mix, interval=config.pace
+            )
+            for _ in range(config.concurrency)
+        ]
+        # paced, so the attack has the same rate however fast the answers are
+        users += [
+            virtual_user(
+                config,
+                client,
+                recorder,
+                deadline,
+                {"credential_stuffing": 1},
+                interval=config.attackers / config.attack_rate,
+            )
+            for _ in range(config.attackers)
+        ]
+        await asyncio.gather(*users)
+        elapsed = time.monotonic() - start
+    return recorder.report(elapsed), elapsed
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    config = parse_args(argv)
+    if config.seed is not None:
+        random.seed(config.seed)
+
+    report, elapsed = asyncio.run(run(config))
+    report = {
+        "meta": {
+            "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "base_url": config.base_url,
+            "concurrency": config.concurrency,
+            "pace_s": config.pace,
+            "client_ips": config.client_ips,
+            "attackers": config.attackers,
+            "attack_rate": config.attack_rate,
+            "attacker_ips": config.attacker_ips,
+            "duration_s": round(elapsed, 2),
+            "mix": config.mix,
+            "python": platform.python_version(),
+        },
+        **report,
+    }
+    if config.compare:
+        with open(config.compare) as f:
+            report["change_pct"] = compare(json.load(f), report)
+
+    output = json.dumps(report, indent=2)
+    if config.output:
+        with open(config.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
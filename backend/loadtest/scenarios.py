@@ -0,0 +1,179 @@
+"""
+Scripted client flows. Each scenario is one iteration of a virtual user and
+records every request under a stable endpoint name.
+"""
+
+import ipaddress
+import random
+import struct
+import uuid
+import zlib
+from time import perf_counter
+
+import httpx
+
+
+def _png():
+    # smallest valid PNG (1x1 grey), ImageField runs it through Pillow
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(b"\x00\x80"))
+        + chunk(b"IEND", b"")
+    )
+
+
+DOCUMENT = _png()
+
+# shared address space (RFC 6598), load test clients stand out in the logs
+CLIENT_NETWORK = ipaddress.ip_network("100.64.0.0/10")
+# benchmarking range (RFC 2544), kept apart from the legitimate clients
+ATTACKER_NETWORK = ipaddress.ip_network("198.18.0.0/15")
+
+
+def client_address(config):
+    return str(CLIENT_NETWORK[1 + random.randrange(config.client_ips)])
+
+
+def attacker_address(config):
+    return str(ATTACKER_NETWORK[1 + random.randrange(config.attacker_ips)])
+
+
+class Session:
+    """
+    A virtual user: an HTTP client, its tokens and the shared recorder.
+
+    Requests carry X-Forwarded-For with the address of the client the
+    virtual user currently plays, as nginx would send it. It changes with
+    every new login or registration, so the per IP throttle buckets see
+    --client-ips clients instead of one.
+    """
+
+    def __init__(self, client, recorder, config):
+        self.client = client
+        self.recorder = recorder
+        self.config = config
+        self.access = None
+        self.refresh = None
+        self.address = client_address(config)
+
+    def new_client(self):
+        self.access = None
+        self.refresh = None
+        self.address = client_address(self.config)
+
+    async def request(self, name, method, url, **kwargs):
+        headers = kwargs.setdefault("headers", {})
+        headers["X-Forwarded-For"] = self.address
+        if self.access:
+            headers["Authorization"] = f"Bearer {self.access}"
+        start = perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(name, "error", perf_counter() - start)
+            return None
+        self.recorder.record(name, response.status_code, perf_counter() - start)
+        return response
+
+    def fcm_fields(self):
+        return {
+            "fcm_id": uuid.uuid4().hex,
+            "device_type": random.choice(["android", "ios"]),
+        }
+
+    async def login(self):
+        self.new_client()
+        i = random.randrange(self.config.users)
+        response = await self.request(
+            "login",
+            "POST",
+            "/login/",
+            data={
+                "username": f"{self.config.phone_prefix}{i:07d}",
+                "password": self.config.password,
+                **self.fcm_fields(),
+            },
+        )
+        if response is not None and response.status_code == 200:
+            body = response.json()
+            self.access = body["access_token"]
+            self.refresh = body["refresh_token"]
+        return self.access is not None
+
+
+async def register(session):
+    session.new_client()
+    await session.request(
+        "register",
+        "POST",
+        "/register/",
+        data={
+            "full_name": "load test",
+            "phone_number": f"+1666{uuid.uuid4().int % 10 ** 12:012d}",
+            "password": session.config.password,
+            **session.fcm_fields(),
+        },
+    )
+
+
+async def poll(session):
+    """Log in once, then poll the profile and refresh the access token."""
+    if session.access is None and not await session.login():
+        return
+    for _ in range(session.config.polls):
+        await session.request("user", "GET", "/user/")
+    response = await session.request(
+        "token_refresh", "POST", "/token/refresh/", data={"refresh": session.refresh}
+    )
+    if response is not None and response.status_code == 200:
+        session.access = response.json()["access"]
+
+
+async def upload(session):
+    if session.access is None and not await session.login():
+        return
+    await session.request(
+        "upload_documents",
+        "POST",
+        "/users/request/",
+        data={"role": random.choice(["D", "C"])},
+        files=[
+            ("documents", (f"document-{n}.png", DOCUMENT, "image/png"))
+            for n in range(2)
+        ],
+    )
+
+
+async def credential_stuffing(session):
+    """
+    Wrong passwords against seeded accounts from one of --attacker-ips
+    addresses, expected to end in 429s.
+    """
+    session.access = None
+    session.address = attacker_address(session.config)
+    i = random.randrange(session.config.users)
+    await session.request(
+        "login_attack",
+        "POST",
+        "/login/",
+        data={
+            "username": f"{session.config.phone_prefix}{i:07d}",
+            "password": uuid.uuid4().hex,
+        },
+    )
+
+
+SCENARIOS = {
+    "register": register,
+    "poll": poll,
+    "upload": upload,
+    "credential_stuffing": credential_stuffing,
+}
+
+# roughly the production mix; --attackers run credential_stuffing on top
+DEFAULT_MIX = {"poll": 8, "upload": 1, "register": 1}
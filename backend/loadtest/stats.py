@@ -0,0 +1,75 @@
+import math
+from collections import Counter, defaultdict
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Latencies and status codes per endpoint name."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+
+    def record(self, name, status, elapsed):
+        self.latencies[name].append(elapsed)
+        self.statuses[name][status] += 1
+        if status == "error" or status >= 500:
+            self.errors[name] += 1
+
+    def report(self, duration):
+        endpoints = {}
+        for name in sorted(self.latencies):
+            latencies = sorted(self.latencies[name])
+            endpoints[name] = {
+                "requests": len(latencies),
+                "errors": self.errors[name],
+                "throughput_rps": round(len(latencies) / duration, 2),
+                "p50_ms": _ms(percentile(latencies, 50)),
+                "p95_ms": _ms(percentile(latencies, 95)),
+                "p99_ms": _ms(percentile(latencies, 99)),
+                "max_ms": _ms(latencies[-1]),
+                "status": {
+                    str(status): count
+                    for status, count in sorted(
+                        self.statuses[name].items(), key=lambda item: str(item[0])
+                    )
+                },
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "requests": total,
+            "throughput_rps": round(total / duration, 2),
+            "endpoints": endpoints,
+        }
+
+
+def compare(baseline, current):
+    """Relative change of throughput and percentiles per endpoint, in percent."""
+    changes = {}
+    for name, stats in current["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            continue
+        changes[name] = {
+            key: _change(before[key], stats[key])
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+        }
+    return changes
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def _change(before, after):
+    if not before or after is None:
+        return None
+    return round((after - before) / before * 100, 1)
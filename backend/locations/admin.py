@@ -0,0 +1,26 @@
+from django.contrib import admin
+
+from .models import DriverLocation
+
+
+@admin.register(DriverLocation)
+class DriverLocationAdmin(admin.ModelAdmin):
+    """Last known positions, written by locations.tracker only."""
+
+    list_display = [
+        "driver_id",
+        "latitude",
+        "longitude",
+        "available",
+        "recorded_at",
+        "received_at",
+    ]
+    list_filter = ["available"]
+    ordering = ("-updated",)
+    raw_id_fields = ["driver"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
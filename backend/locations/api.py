@@ -0,0 +1,68 @@
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .serializers import LocationBatchSerializer, NearestDriversSerializer
+from .tracker import Ping, drivers, tracker
+
+
+class LocationAPI(APIView):
+    """
+    Batched GPS pings of the authenticated, verified driver. Only the latest
+    of them is kept, see locations.tracker.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        # loaded along with the user by CachedJWTAuthentication
+        driver = getattr(request.user, "driver_profile", None)
+        if driver is None or not driver.is_verified:
+            raise PermissionDenied("Only verified drivers report their location.")
+        serializer = LocationBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        latest = max(serializer.validated_data["pings"], key=lambda p: p["recorded_at"])
+        ping = Ping(
+            latitude=latest["latitude"],
+            longitude=latest["longitude"],
+            heading=latest.get("heading"),
+            speed=latest.get("speed"),
+            accuracy=latest.get("accuracy"),
+            available=serializer.validated_data["available"],
+            recorded_at=latest["recorded_at"],
+            received_at=timezone.now(),
+        )
+        tracker.add((driver.pk, ping))
+        drivers.update(driver.pk, ping)
+        return Response(
+            {"accepted": len(serializer.validated_data["pings"])},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class NearestDriversAPI(APIView):
+    """The available, verified drivers nearest to a point, nearest first."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        serializer = NearestDriversSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data
+        nearest = drivers.nearest(
+            query["latitude"], query["longitude"], query["k"], query["radius"]
+        )
+        return Response(
+            [
+                {
+                    "driver": driver_id,
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "distance": round(distance),
+                }
+                for distance, driver_id, latitude, longitude in nearest
+            ]
+        )
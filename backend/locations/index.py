@@ -0,0 +1,128 @@
+"""
+In-memory grid of driver positions for nearest-driver lookups.
+
+Positions are bucketed in square cells of `cell_size` degrees. A lookup
+scans the rings of cells around the query point, nearest ring first, and
+stops once the k-th candidate is closer than anything the next ring can
+hold. Distances use the equirectangular approximation, well within a
+meter at city scale; the grid does not wrap around the antimeridian.
+"""
+
+import heapq
+import math
+import threading
+
+EARTH_RADIUS = 6_371_000  # meters
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+
+class GridIndex:
+    def __init__(self, cell_size=0.0025):
+        self.cell_size = cell_size
+        # (row, column) -> {driver id: (latitude, longitude, seen)}
+        self.cells = {}
+        # driver id -> its cell
+        self.drivers = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.drivers)
+
+    def cell(self, latitude, longitude):
+        size = self.cell_size
+        return math.floor(latitude / size), math.floor(longitude / size)
+
+    def update(self, driver_id, latitude, longitude, seen):
+        """Move the driver to the position seen at `seen`, unless it is older."""
+        key = self.cell(latitude, longitude)
+        with self.lock:
+            previous = self.drivers.get(driver_id)
+            if previous is not None:
+                if self.cells[previous][driver_id][2] > seen:
+                    return
+                if previous != key:
+                    self._discard(previous, driver_id)
+            self.cells.setdefault(key, {})[driver_id] = (latitude, longitude, seen)
+            self.drivers[driver_id] = key
+
+    def remove(self, driver_id):
+        with self.lock:
+            key = self.drivers.pop(driver_id, None)
+            if key is not None:
+                self._discard(key, driver_id)
+
+    def _discard(self, key, driver_id):
+        cell = self.cells[key]
+        del cell[driver_id]
+        if not cell:
+            del self.cells[key]
+
+    def expire(self, before):
+        """Drop the drivers last seen before `before`."""
+        with self.lock:
+            stale = [
+                (key, driver_id)
+                for key, cell in self.cells.items()
+                for driver_id, (_, _, seen) in cell.items()
+                if seen < before
+            ]
+            for key, driver_id in stale:
+                del self.drivers[driver_id]
+                self._discard(key, driver_id)
+        return len(stale)
+
+    def nearest(self, latitude, longitude, k, radius, seen_after=0):
+        """
+        [(distance in meters, driver id, latitude, longitude)] of the `k`
+        drivers nearest to the point within `radius` meters, nearest first,
+        counting only those seen after `seen_after`.
+        """
+        size = self.cell_size
+        row, column = self.cell(latitude, longitude)
+        scale = math.cos(math.radians(latitude))
+        # degrees of latitude, longitude scaled to them
+        limit = (radius / METERS_PER_DEGREE) ** 2
+        max_ring = math.ceil(radius / (size * METERS_PER_DEGREE * max(scale, 0.01)))
+        cells = self.cells
+        found = []
+
+        for ring in range(max_ring + 1):
+            for key in self._ring(row, column, ring):
+                cell = cells.get(key)
+                if not cell:
+                    continue
+                # copied, a concurrent update may resize the dict
+                for driver_id, (lat, lng, seen) in list(cell.items()):
+                    dx = (lng - longitude) * scale
+                    dy = lat - latitude
+                    squared = dx * dx + dy * dy
+                    if squared <= limit and seen > seen_after:
+                        found.append((squared, driver_id, lat, lng))
+            if len(found) >= k:
+                found = heapq.nsmallest(k, found)
+                # nothing outside the rings scanned so far is closer than
+                # the nearest edge of their square
+                edge = min(
+                    latitude - (row - ring) * size,
+                    (row + ring + 1) * size - latitude,
+                    (longitude - (column - ring) * size) * scale,
+                    ((column + ring + 1) * size - longitude) * scale,
+                )
+                if found[-1][0] <= edge * edge:
+                    break
+        return [
+            (math.sqrt(squared) * METERS_PER_DEGREE, driver_id, lat, lng)
+            for squared, driver_id, lat, lng in heapq.nsmallest(k, found)
+        ]
+
+    @staticmethod
+    def _ring(row, column, ring):
+        if ring == 0:
+            yield row, column
+            return
+        for offset in range(-ring, ring + 1):
+            yield row - ring, column + offset
+            yield row + ring, column + offset
+        for offset in range(-ring + 1, ring):
+            yield row + offset, column - ring
+            yield row + offset, column + ring
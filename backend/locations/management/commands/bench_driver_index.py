@@ -0,0 +1,106 @@
+import random
+import statistics
+import time
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from locations.index import GridIndex
+
+# roughly the Kathmandu valley
+BOUNDS = (27.60, 27.80, 85.20, 85.50)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure position updates and k-nearest lookups of the driver grid "
+        "with the given number of online drivers, and check the lookups "
+        "against a brute force scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--drivers", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=10_000)
+        parser.add_argument("--k", type=int, default=5)
+        parser.add_argument("--radius", type=float, default=5000)
+        parser.add_argument("--cell", type=float, default=settings.LOCATION_GRID_CELL)
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        count, k, radius = options["drivers"], options["k"], options["radius"]
+        grid = GridIndex(options["cell"])
+        now = time.time()
+
+        positions = [self.point() for _ in range(count)]
+        start = perf_counter()
+        for driver_id, (latitude, longitude) in enumerate(positions):
+            grid.update(driver_id, latitude, longitude, now)
+        self.report("insert", perf_counter() - start, count)
+
+        # a ping moves a driver by up to ~50 m
+        moves = [
+            (
+                random.randrange(count),
+                latitude + random.uniform(-0.0005, 0.0005),
+                longitude + random.uniform(-0.0005, 0.0005),
+            )
+            for latitude, longitude in random.sample(positions, min(count, 100_000))
+        ]
+        start = perf_counter()
+        for driver_id, latitude, longitude in moves:
+            grid.update(driver_id, latitude, longitude, now + 1)
+        self.report("update", perf_counter() - start, len(moves))
+
+        points = [self.point() for _ in range(options["queries"])]
+        timings = []
+        for latitude, longitude in points:
+            start = perf_counter()
+            grid.nearest(latitude, longitude, k, radius)
+            timings.append(perf_counter() - start)
+        timings.sort()
+        self.stdout.write(
+            f"nearest   k={k}  median {statistics.median(timings) * 1e6:7.1f} us  "
+            f"p99 {timings[int(len(timings) * 0.99)] * 1e6:7.1f} us"
+        )
+
+        start = perf_counter()
+        expired = grid.expire(now + 0.5)
+        self.stdout.write(
+            f"expire    {(perf_counter() - start) * 1000:7.1f} ms "
+            f"for {count} drivers ({expired} stale)"
+        )
+        self.check_nearest(grid, points[:50], k, radius)
+
+    def check_nearest(self, grid, points, k, radius):
+        entries = [
+            (driver_id, latitude, longitude)
+            for cell in grid.cells.values()
+            for driver_id, (latitude, longitude, _) in cell.items()
+        ]
+        # every driver in one cell, lookups degenerate to a full scan
+        probe = GridIndex(360)
+        probe.cells = {(0, 0): {d: (la, lo, 1) for d, la, lo in entries}}
+        for latitude, longitude in points:
+            found = [
+                driver
+                for _, driver, _, _ in grid.nearest(latitude, longitude, k, radius)
+            ]
+            expected = [
+                driver
+                for _, driver, _, _ in probe.nearest(latitude, longitude, k, radius)
+            ]
+            if found != expected:
+                raise CommandError(f"({latitude}, {longitude}): {found} != {expected}")
+        self.stdout.write(f"checked   {len(points)} lookups against a full scan")
+
+    @staticmethod
+    def point():
+        south, north, west, east = BOUNDS
+        return random.uniform(south, north), random.uniform(west, east)
+
+    def report(self, name, duration, count):
+        self.stdout.write(
+            f"{name:<9} {duration / count * 1e6:7.2f} us each, {count} in "
+            f"{duration * 1000:.0f} ms"
+        )
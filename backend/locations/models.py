@@ -0,0 +1,27 @@
+from django.db import models
+
+from users.models import Driver
+
+
+class DriverLocation(models.Model):
+    """Last reported position of a driver, written by locations.tracker."""
+
+    driver = models.OneToOneField(
+        Driver, primary_key=True, related_name="location", on_delete=models.CASCADE
+    )
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    heading = models.FloatField(null=True, blank=True)
+    speed = models.FloatField(null=True, blank=True)
+    accuracy = models.FloatField(null=True, blank=True)
+    # taking rides, drivers on a break keep reporting their position
+    available = models.BooleanField(default=True)
+    # device clock, orders the pings of a driver
+    recorded_at = models.DateTimeField()
+    # server clock, drivers are offline LOCATION_TTL seconds after their last ping
+    received_at = models.DateTimeField()
+    # when the row was written, the nearest-driver indexes sync from it
+    updated = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.latitude:.5f}, {self.longitude:.5f}"
@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+
+# device clocks run ahead a little, pings from further out are refused
+CLOCK_SKEW = timedelta(minutes=1)
+
+
+class PingSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    heading = serializers.FloatField(
+        min_value=0, max_value=360, required=False, allow_null=True
+    )
+    speed = serializers.FloatField(min_value=0, required=False, allow_null=True)
+    accuracy = serializers.FloatField(min_value=0, required=False, allow_null=True)
+    recorded_at = serializers.DateTimeField()
+
+    def validate_recorded_at(self, value):
+        if value > timezone.now() + CLOCK_SKEW:
+            raise serializers.ValidationError("Pings can't be from the future.")
+        return value
+
+
+class LocationBatchSerializer(serializers.Serializer):
+    pings = PingSerializer(
+        many=True, allow_empty=False, max_length=settings.LOCATION_MAX_BATCH
+    )
+    available = serializers.BooleanField(default=True)
+
+
+class NearestDriversSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    k = serializers.IntegerField(
+        min_value=1, max_value=settings.LOCATION_NEAREST_MAX, default=5
+    )
+    radius = serializers.FloatField(
+        min_value=1, max_value=settings.LOCATION_NEAREST_RADIUS, default=5000
+    )
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from main.custom.cache import cache as tiered_cache
+from monitoring.testing import QueryBudgetMixin
+from users import revocation
+from users.models import Driver, User
+from .tracker import drivers
+
+
+class LocationQueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone_number="+15550002000")
+        cls.driver = Driver.objects.create(user=cls.user, is_verified=True)
+
+    def setUp(self):
+        cache.clear()
+        tiered_cache.local.clear()
+        revocation.store.sync()
+        token = RefreshToken.for_user(self.user).access_token
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def test_report_and_find_nearest(self):
+        response = self.assertQueryBudget(
+            "post",
+            "/locations/",
+            {
+                "pings": [
+                    {
+                        "latitude": 27.7172,
+                        "longitude": 85.3240,
+                        "recorded_at": timezone.now().isoformat(),
+                    }
+                ]
+            },
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 202)
+
+        # the budget covers the periodic sync of the index
+        drivers.refreshed_at = 0.0
+        response = self.assertQueryBudget(
+            "get",
+            "/locations/nearest/",
+            {"latitude": 27.7173, "longitude": 85.3241},
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["driver"], self.driver.pk)
@@ -0,0 +1,169 @@
+"""
+Driver location ingestion and the nearest-driver index.
+
+Drivers post their GPS pings in batches. Only the latest ping of a driver
+matters, so LocationTracker coalesces what a process received per driver
+and writes it as one upsert per flush (see main.helpers.buffers), a row per
+driver in DriverLocation that never moves back in time.
+
+Every process answering nearest-driver queries keeps a GridIndex of the
+available, verified drivers seen in the last LOCATION_TTL seconds, by the
+device clock capped at the server's, which also orders the pings. It is
+loaded on the first query, synced from the rows written since at most every
+LOCATION_INDEX_REFRESH seconds, and updated right away with the pings this
+process receives itself.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from main.helpers.buffers import FlushingBuffer
+from users.models import Driver
+from .index import GridIndex
+from .models import DriverLocation
+
+CHUNK_SIZE = 1000
+# rows are stamped before their transaction commits
+REFRESH_OVERLAP = timedelta(seconds=2)
+TIMESTAMPS = ", ".join(["%s::timestamptz"] * 3)
+
+Ping = namedtuple(
+    "Ping",
+    "latitude longitude heading speed accuracy available recorded_at received_at",
+)
+
+
+class LocationTracker(FlushingBuffer):
+    def write(self, items):
+        latest = {}
+        for driver_id, ping in items:
+            if (
+                driver_id not in latest
+                or latest[driver_id].recorded_at < ping.recorded_at
+            ):
+                latest[driver_id] = ping
+        rows = list(latest.items())
+        alias = router.db_for_write(DriverLocation)
+        now = timezone.now()
+        with transaction.atomic(using=alias):
+            for start in range(0, len(rows), CHUNK_SIZE):
+                upsert_locations(alias, rows[start : start + CHUNK_SIZE], now)
+
+
+def upsert_locations(alias, rows, now):
+    """Store the (driver id, ping) rows, unless a later ping is stored."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        for driver_id, ping in rows:
+            values = {**ping._asdict(), "updated": now}
+            locations = DriverLocation.objects.using(alias).filter(driver_id=driver_id)
+            if locations.exists():
+                locations.filter(recorded_at__lt=ping.recorded_at).update(**values)
+            elif Driver.objects.using(alias).filter(pk=driver_id).exists():
+                DriverLocation.objects.using(alias).create(
+                    driver_id=driver_id, **values
+                )
+        return
+
+    table = DriverLocation._meta.db_table
+    columns = ["driver_id", *Ping._fields, "updated"]
+    values = ", ".join(
+        [f"(%s::integer, {', '.join(['%s::float8'] * 5)}, %s::boolean, {TIMESTAMPS})"]
+        * len(rows)
+    )
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns[1:])
+    with connection.cursor() as cursor:
+        # the join skips drivers deleted since their ping
+        cursor.execute(
+            f"""
+            INSERT INTO {table} ({", ".join(columns)})
+            SELECT v.* FROM (VALUES {values}) AS v ({", ".join(columns)})
+            JOIN {Driver._meta.db_table} AS d ON d.id = v.driver_id
+            ON CONFLICT (driver_id) DO UPDATE SET {updates}
+            WHERE {table}.recorded_at < EXCLUDED.recorded_at
+            """,
+            [value for driver_id, ping in rows for value in (driver_id, *ping, now)],
+        )
+
+
+def seen(recorded_at, received_at):
+    return min(recorded_at, received_at).timestamp()
+
+
+class DriverIndex:
+    def __init__(self, cell_size, ttl, refresh_interval):
+        self.grid = GridIndex(cell_size)
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.synced = None  # server time of the last sync
+        self.refreshed_at = 0.0
+        self.expired_at = 0.0
+
+    def update(self, driver_id, ping):
+        """Apply a ping received by this process."""
+        if ping.available:
+            self.grid.update(
+                driver_id,
+                ping.latitude,
+                ping.longitude,
+                seen(ping.recorded_at, ping.received_at),
+            )
+        else:
+            self.grid.remove(driver_id)
+
+    def nearest(self, latitude, longitude, k, radius):
+        if self.refreshed_at + self.refresh_interval < time.monotonic():
+            self.refresh()
+        return self.grid.nearest(
+            latitude, longitude, k, radius, seen_after=time.time() - self.ttl
+        )
+
+    def refresh(self):
+        if not self.lock.acquire(blocking=self.synced is None):
+            return  # another thread is syncing, the current grid will do
+        try:
+            now = timezone.now()
+            if self.synced is None:
+                since = now - timedelta(seconds=self.ttl)
+            else:
+                since = self.synced - REFRESH_OVERLAP
+            rows = DriverLocation.objects.filter(updated__gt=since).values_list(
+                "driver_id",
+                "latitude",
+                "longitude",
+                "recorded_at",
+                "received_at",
+                "available",
+                "driver__is_verified",
+            )
+            for row in rows.iterator(chunk_size=CHUNK_SIZE):
+                driver_id, latitude, longitude, *times, available, verified = row
+                if available and verified:
+                    self.grid.update(driver_id, latitude, longitude, seen(*times))
+                else:
+                    self.grid.remove(driver_id)
+            self.synced = now
+            self.refreshed_at = time.monotonic()
+            if self.expired_at + self.ttl < self.refreshed_at:
+                self.grid.expire(time.time() - self.ttl)
+                self.expired_at = self.refreshed_at
+        finally:
+            self.lock.release()
+
+
+tracker = LocationTracker(
+    max_size=settings.LOCATION_BUFFER_SIZE,
+    interval=settings.LOCATION_FLUSH_INTERVAL,
+)
+drivers = DriverIndex(
+    cell_size=settings.LOCATION_GRID_CELL,
+    ttl=settings.LOCATION_TTL,
+    refresh_interval=settings.LOCATION_INDEX_REFRESH,
+)
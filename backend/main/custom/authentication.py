@@ -0,0 +1,56 @@
+import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from main.custom import routers
+from main.custom.cache import cache
+from users import activity, revocation
+
+UserModel = get_user_model()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication loading the user, with its profiles, from the tiered
+    cache instead of querying it on every request, rejecting revoked tokens
+    and recording when the user was last seen.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if revocation.store.is_revoked(token[api_settings.JTI_CLAIM]):
+            raise InvalidToken(_("Token is revoked"))
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if settings.DATABASE_REPLICAS and routers.user_is_pinned(user_id):
+            routers.pin_to_primary()
+
+        def load_user():
+            # a lagging replica must not end up in the shared cache
+            try:
+                return (
+                    UserModel.objects.using(DEFAULT_DB_ALIAS)
+                    .select_related("driver_profile", "customer_profile")
+                    .get(**{api_settings.USER_ID_FIELD: user_id})
+                )
+            except UserModel.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        user = cache.get_or_set(f"user:{user_id}", load_user, tags=[f"user:{user_id}"])
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        activity.tracker.touch(user.pk)
+        # the cached instance is shared with later requests of this process
+        return copy.copy(user)
@@ -17,7 +17,6 @@ class CustomModelBackend(ModelBackend):
             return
         try:
             user = UserModel.objects.get(Q(phone_number=username) | Q(email=username))
-            print(user)
         except UserModel.DoesNotExist:
             # Run the default password hasher once to reduce the timing
             # difference between an existing and a nonexistent user (#20760).
@@ -0,0 +1,164 @@
+"""
+Two tier cache: a small per-process LRU in front of the shared Django cache.
+
+Entries are tagged (e.g. ``user:42``) and a tag is invalidated by bumping
+its version in the shared cache; shared entries remember the tag versions
+they were computed with and are ignored once those move on or are evicted.
+The LRU of the invalidating process is purged immediately, other processes
+see the change after at most LOCAL_CACHE_TTL seconds. That takes a cache
+shared by every process (memcached, see main.custom.checks), a per-process
+one keeps invalidations to the process making them.
+
+Misses are single-flight: one thread per process and one process per key
+(via a cache.add() lock) computes the value while the others wait for it.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from monitoring.metrics import CACHE_REQUESTS
+
+_MISSING = object()
+
+
+class LocalLRU:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires, value, tags)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, tags):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value, tags)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def invalidate(self, tags):
+        with self.lock:
+            stale = [
+                key
+                for key, (_, _, key_tags) in self.entries.items()
+                if not tags.isdisjoint(key_tags)
+            ]
+            for key in stale:
+                del self.entries[key]
+
+
+class TieredCache:
+    def __init__(self, alias="default", max_entries=1000, ttl=5, lock_timeout=10):
+        self.alias = alias
+        self.local = LocalLRU(max_entries, ttl)
+        self.lock_timeout = lock_timeout
+        self.locks = [threading.Lock() for _ in range(64)]
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, tags=()):
+        """Return the cached value for `key`, computing it with `default()` once."""
+        value = self.local.get(key)
+        if value is not _MISSING:
+            CACHE_REQUESTS.labels("local", "hit").inc()
+            return value
+        CACHE_REQUESTS.labels("local", "miss").inc()
+
+        with self.locks[hash(key) % len(self.locks)]:
+            value = self.local.get(key)
+            if value is _MISSING:
+                value, versions = self._get_shared(key, tags)
+                if value is _MISSING:
+                    value = self._fill(key, default, timeout, tags, versions)
+                self.local.set(key, value, frozenset(tags))
+        return value
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(self._key(key))
+
+    def invalidate_tags(self, *tags):
+        self.local.invalidate(set(tags))
+        version = time.time_ns()
+        self.shared.set_many({self._tag_key(tag): version for tag in tags}, None)
+
+    def _get_shared(self, key, tags):
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        found = self.shared.get_many([self._key(key), *tag_keys])
+        missing = [tag_key for tag_key in tag_keys if tag_key not in found]
+        if missing:
+            # never invalidated, or evicted: a fresh version, so entries
+            # computed under a lost one can't match again
+            version = time.time_ns()
+            for tag_key in missing:
+                self.shared.add(tag_key, version, None)
+            found.update(self.shared.get_many(missing))
+        versions = tuple(found.get(tag_key) for tag_key in tag_keys)
+        entry = found.get(self._key(key))
+        if entry is not None and None not in versions and entry[0] == versions:
+            CACHE_REQUESTS.labels("shared", "hit").inc()
+            return entry[1], versions
+        CACHE_REQUESTS.labels("shared", "miss").inc()
+        return _MISSING, versions
+
+    def _fill(self, key, default, timeout, tags, versions):
+        lock_key = self._key(key) + ":lock"
+        locked = self.shared.add(lock_key, 1, self.lock_timeout)
+        if not locked:
+            # another process is computing it, wait for its result
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value, versions = self._get_shared(key, tags)
+                if value is not _MISSING:
+                    return value
+        try:
+            value = default() if callable(default) else default
+            # versions read before computing: an invalidation racing with us
+            # leaves this entry stale on arrival
+            self.shared.set(self._key(key), (versions, value), timeout)
+        finally:
+            if locked:
+                self.shared.delete(lock_key)
+        return value
+
+    @staticmethod
+    def _key(key):
+        return "tiered:" + key
+
+    @staticmethod
+    def _tag_key(tag):
+        return "tiered-tag:" + tag
+
+
+cache = TieredCache(
+    settings.TIERED_CACHE_ALIAS,
+    max_entries=settings.LOCAL_CACHE_MAX_ENTRIES,
+    ttl=settings.LOCAL_CACHE_TTL,
+    lock_timeout=settings.CACHE_LOCK_TIMEOUT,
+)
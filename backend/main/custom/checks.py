@@ -0,0 +1,50 @@
+"""
+System checks for settings that only misbehave once several processes
+serve requests.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PER_PROCESS_CACHES = (LocMemCache, DummyCache)
+
+# setting naming a cache alias -> what goes wrong when it's per process
+SHARED_CACHE_SETTINGS = {
+    "THROTTLE_CACHE": "every worker counts requests on its own",
+    "TIERED_CACHE_ALIAS": (
+        "tag invalidations don't reach the other workers, which keep "
+        "authenticating deactivated users"
+    ),
+    "REPLICA_PIN_CACHE": (
+        "a user's pin is only seen by the worker that served the write, the "
+        "others read from replicas behind it"
+    ),
+}
+
+
+def is_per_process(alias):
+    return isinstance(caches[alias], PER_PROCESS_CACHES)
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    level, id = (
+        (Error, "main.E001")
+        if settings.SHARED_CACHE_REQUIRED
+        else (Warning, "main.W001")
+    )
+    messages = []
+    for name, consequence in SHARED_CACHE_SETTINGS.items():
+        alias = getattr(settings, name)
+        if is_per_process(alias):
+            messages.append(
+                level(
+                    f"{name} {alias!r} is per process, {consequence}.",
+                    hint="Point CACHE_URL at the memcached shared by the workers.",
+                    id=id,
+                )
+            )
+    return messages
@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+from main.custom import routers
+
+
+class MiddlewareChain:
+    """A middleware stack built the way BaseHandler.load_middleware does."""
+
+    def __init__(self, paths, get_response):
+        self.view_hooks = []
+        self.template_response_hooks = []
+        self.exception_hooks = []
+
+        handler = get_response
+        for path in reversed(paths):
+            try:
+                middleware = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(middleware, "process_view"):
+                self.view_hooks.insert(0, middleware.process_view)
+            if hasattr(middleware, "process_template_response"):
+                self.template_response_hooks.append(
+                    middleware.process_template_response
+                )
+            if hasattr(middleware, "process_exception"):
+                self.exception_hooks.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+        self.handler = handler
+
+
+class HostMiddlewareRouter:
+    """
+    Run the middleware stack configured in HOST_MIDDLEWARE for the host
+    django_hosts matched, e.g. a lean stack for the JWT-only client api and
+    sessions/CSRF/messages for the admin. Hosts not listed get
+    DEFAULT_HOST_MIDDLEWARE.
+
+    Stacks are built once at startup; the hooks of the stack's middleware
+    are forwarded from this middleware's own hooks, because the handler only
+    knows about the top-level MIDDLEWARE setting.
+    """
+
+    def __init__(self, get_response):
+        self.default_chain = MiddlewareChain(
+            settings.DEFAULT_HOST_MIDDLEWARE, get_response
+        )
+        self.chains = {
+            name: MiddlewareChain(paths, get_response)
+            for name, paths in settings.HOST_MIDDLEWARE.items()
+        }
+
+    def get_chain(self, request):
+        host = getattr(request, "host", None)
+        return self.chains.get(host.name if host else None, self.default_chain)
+
+    def __call__(self, request):
+        return self.get_chain(request).handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for hook in self.get_chain(request).view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response:
+                return response
+
+    def process_template_response(self, request, response):
+        for hook in self.get_chain(request).template_response_hooks:
+            response = hook(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        for hook in self.get_chain(request).exception_hooks:
+            response = hook(request, exception)
+            if response:
+                return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    Scope the read-your-writes pin of main.custom.routers to the request,
+    and pin the user's (and browser's) next requests to the primary for
+    REPLICA_PIN_SECONDS once the request has written.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tokens = routers.start_request()
+        if request.COOKIES.get(routers.PIN_COOKIE):
+            routers.pin_to_primary()
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_request(tokens)
+
+        if wrote:
+            response.set_cookie(
+                routers.PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                routers.pin_user(user.pk)
+        return response
@@ -1,8 +1,82 @@
+from functools import lru_cache
+
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import permissions
 from rest_framework.permissions import AllowAny
 
 
+_compiled_actions = {}
+
+
+def compile_action_permissions(action_permissions):
+    """
+    {permission class: actions} as {action: permission instance}, the first
+    class listing an action wins. Permissions are instantiated once, so they
+    must not keep per-request state, as DRF's own don't.
+    """
+    compiled = {}
+    for klass, actions in action_permissions.items():
+        permission = klass()
+        for action in actions:
+            compiled.setdefault(action, permission)
+    return compiled
+
+
+def get_action_permission(view):
+    if "action_permissions" in view.__dict__:
+        # set per instance through as_view(action_permissions=...)
+        return compile_action_permissions(view.action_permissions).get(view.action)
+    view_class = type(view)
+    try:
+        compiled = _compiled_actions[view_class]
+    except KeyError:
+        compiled = _compiled_actions[view_class] = compile_action_permissions(
+            getattr(view_class, "action_permissions", {})
+        )
+    return compiled.get(view.action)
+
+
+@lru_cache(maxsize=None)
+def resolve_owner_path(model, paths):
+    """The first of `paths` (tuples of foreign key names) valid from `model`."""
+    for path in paths:
+        current = model
+        try:
+            for name in path:
+                field = current._meta.get_field(name)
+                if not (field.many_to_one or field.one_to_one) or field.auto_created:
+                    raise FieldDoesNotExist(name)
+                current = field.related_model
+        except (AttributeError, FieldDoesNotExist):
+            # not a model, or not this path
+            continue
+        return path
+    return None
+
+
+def related_id(obj, path):
+    """
+    The value the last foreign key of `path` holds, following the earlier
+    ones from `obj` through the objects already loaded. The first hop that
+    isn't loaded is answered with a single values query instead of loading
+    the related rows.
+    """
+    for i, name in enumerate(path):
+        field = obj._meta.get_field(name)
+        value = getattr(obj, field.attname)
+        if value is None or i == len(path) - 1:
+            return value
+        if not field.is_cached(obj):
+            lookup = {field.target_field.attname: value}
+            return (
+                field.related_model._base_manager.filter(**lookup)
+                .values_list("__".join(path[i + 1 :]), flat=True)
+                .first()
+            )
+        obj = getattr(obj, name)
+
+
 class StaffUserRequiredMixin(LoginRequiredMixin):
     """Verify that the current user is authenticated and is super user."""
 
@@ -15,36 +89,39 @@ class StaffUserRequiredMixin(LoginRequiredMixin):
 class ActionBasedPermission(AllowAny):
     """
     Grant or deny access to a view, based on a mapping in view.action_permissions
+
+    The mapping is compiled to action -> permission instance once per view
+    class (see compile_action_permissions), so a check is a dict lookup.
     """
 
     def has_permission(self, request, view):
-        for klass, actions in getattr(view, "action_permissions", {}).items():
-            if view.action in actions:
-                return klass().has_permission(request, view)
-        return False
+        permission = get_action_permission(view)
+        return permission is not None and permission.has_permission(request, view)
 
     def has_object_permission(self, request, view, obj):
-        for klass, actions in getattr(view, "action_permissions", {}).items():
-            if view.action in actions:
-                return klass().has_object_permission(request, view, obj)
-        return False
+        permission = get_action_permission(view)
+        return permission is not None and permission.has_object_permission(
+            request, view, obj
+        )
 
 
 class IsPosterOrReadOnly(permissions.BasePermission):
     """
     Object-level permission to only allow owners of an object to edit it.
-    Assumes the model instance has an `poster` attribute.
+    Assumes the model instance has a `poster`, or an `ad` with a `poster`,
+    whose `user` owns it. Ownership is compared by id, see related_id.
     """
 
+    owner_paths = (("poster", "user"), ("ad", "poster", "user"))
+
     def has_object_permission(self, request, view, obj):
         # Read permissions are allowed to any request,
         # so we'll always allow GET, HEAD or OPTIONS requests.
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        # Instance must have an attribute named `owner`.
-        if hasattr(obj, 'poster'):
-            return obj.poster.user == request.user
-        elif hasattr(obj, 'ad') and hasattr(obj.ad, "poster"):
-            return obj.ad.poster.user == request.user
-        return False
+        path = resolve_owner_path(type(obj), self.owner_paths)
+        user_id = request.user.pk
+        if path is None or user_id is None:
+            return False
+        return related_id(obj, path) == user_id
@@ -0,0 +1,187 @@
+"""
+Send reads to the replicas in DATABASE_REPLICAS and everything else to the
+primary.
+
+Reads stay on the primary
+- inside a transaction,
+- for the rest of a request (or command) once it has written,
+- for REPLICA_PIN_SECONDS after the user wrote, via a shared cache key set
+  by ReplicaPinningMiddleware and looked up during authentication (plus a
+  cookie for browsers).
+
+A replica leaves the rotation while its replay lag exceeds REPLICA_MAX_LAG
+seconds or it can't be reached within REPLICA_TIMEOUT seconds. Each process
+checks the lag every REPLICA_LAG_CHECK_INTERVAL seconds from a background
+thread, requests only read the last answer.
+
+The pin has to live in a cache every worker shares, see main.custom.checks.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from monitoring.metrics import REPLICA_LAG
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "db_pin"
+
+# set once this request or command writes, and for pinned users
+_pinned = ContextVar("db_pinned", default=False)
+_wrote = ContextVar("db_wrote", default=False)
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def pin_to_primary():
+    _pinned.set(True)
+
+
+def pinned_to_primary():
+    return _pinned.get()
+
+
+def start_request():
+    """Forget the pin of the previous request on this thread."""
+    return _pinned.set(False), _wrote.set(False)
+
+
+def end_request(tokens):
+    wrote = _wrote.get()
+    pinned, wrote_token = tokens
+    _pinned.reset(pinned)
+    _wrote.reset(wrote_token)
+    return wrote
+
+
+def user_pin_key(user_id):
+    return f"db-pin:{user_id}"
+
+
+def pin_user(user_id):
+    caches[settings.REPLICA_PIN_CACHE].set(
+        user_pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS
+    )
+
+
+def user_is_pinned(user_id):
+    return bool(caches[settings.REPLICA_PIN_CACHE].get(user_pin_key(user_id)))
+
+
+class ReplicaMonitor:
+    """Replication lag of every replica, refreshed by a background thread."""
+
+    def __init__(self, aliases, max_lag, interval):
+        self.aliases = list(aliases)
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lock = threading.Lock()
+        # reads stay on the primary until the first check
+        self.healthy = []
+        self.pid = None
+
+    def get_healthy(self):
+        self._ensure_thread()
+        return self.healthy
+
+    def _ensure_thread(self):
+        # started lazily so it runs in the forked worker, not the master
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            thread = threading.Thread(
+                target=self._run, name="ReplicaMonitor", daemon=True
+            )
+            thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Checking the replicas failed")
+            time.sleep(self.interval)
+
+    def check(self):
+        healthy = []
+        for alias in self.aliases:
+            lag = self.get_lag(alias)
+            if lag is None:
+                continue
+            REPLICA_LAG.labels(alias).set(lag)
+            if lag <= self.max_lag:
+                healthy.append(alias)
+            else:
+                logger.warning(
+                    "Replica %s is %.1fs behind, not reading from it", alias, lag
+                )
+        self.healthy = healthy
+
+    @staticmethod
+    def get_lag(alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                # a replica that hangs is as unusable as one that's down
+                cursor.execute(
+                    "SET statement_timeout = %s", [settings.REPLICA_TIMEOUT * 1000]
+                )
+                cursor.execute(LAG_SQL)
+                (lag,) = cursor.fetchone()
+        except DatabaseError:
+            logger.warning("Replica %s is unreachable", alias, exc_info=True)
+            connection.close()
+            return None
+        if lag is None:
+            logger.warning("Replica %s is not in recovery, is it a replica?", alias)
+            return None
+        return float(lag)
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.monitor = ReplicaMonitor(
+            settings.DATABASE_REPLICAS,
+            settings.REPLICA_MAX_LAG,
+            settings.REPLICA_LAG_CHECK_INTERVAL,
+        )
+
+    def db_for_read(self, model, **hints):
+        if (
+            not self.monitor.aliases
+            or _pinned.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        healthy = self.monitor.get_healthy()
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # asked before every save/update/delete, later reads must see it
+        _pinned.set(True)
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,28 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from main.helpers import buffers
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner with the settings tests need in every environment."""
+
+    settings = {
+        # collectstatic doesn't run before the tests, there is no manifest to
+        # look the hashed names up in
+        "STATICFILES_STORAGE": "django.contrib.staticfiles.storage.StaticFilesStorage",
+        # their queries would run outside the test's transaction
+        "BACKGROUND_THREADS": False,
+    }
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.overridden_settings = override_settings(**self.settings)
+        self.overridden_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        # left behind by the tests, flushed at exit they would be written to
+        # the real database
+        buffers.discard_all()
+        self.overridden_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,91 @@
+"""
+Serializer fields formatting datetimes without astimezone() and strftime()
+per value.
+
+DRF's DateTimeField converts every value to the current timezone and formats
+it with strftime(DATETIME_FORMAT). DateTimeField here compiles the format to
+a %-template once, and looks the UTC offset up once per 15 minutes of UTC
+time (offsets only change on 15 minute boundaries), with identical output.
+Formats using other directives than %Y %m %d %H %M %S %f keep strftime.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from operator import attrgetter
+
+from django.db import models
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+DIRECTIVES = {
+    "Y": ("year", "%d"),
+    "m": ("month", "%02d"),
+    "d": ("day", "%02d"),
+    "H": ("hour", "%02d"),
+    "M": ("minute", "%02d"),
+    "S": ("second", "%02d"),
+    "f": ("microsecond", "%06d"),
+}
+OFFSET_STEP = timedelta(minutes=15)
+EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=32)
+def compile_format(format):
+    """(template, attrgetter) rendering `format` like strftime, or None."""
+    template, attributes = [], []
+    for literal, directive in re.findall(r"([^%]*)(%.?)?", format):
+        template.append(literal.replace("%", "%%"))
+        if not directive:
+            continue
+        if directive == "%%":
+            template.append("%%")
+        elif directive[1:] in DIRECTIVES:
+            attribute, spec = DIRECTIVES[directive[1:]]
+            template.append(spec)
+            attributes.append(attribute)
+        else:
+            return None
+    if not attributes:
+        return None
+    if len(attributes) == 1:
+        # attrgetter of a single attribute returns it bare
+        get = attrgetter(attributes[0])
+        return "".join(template), lambda value: (get(value),)
+    return "".join(template), attrgetter(*attributes)
+
+
+@lru_cache(maxsize=4096)
+def utcoffset(tz, step):
+    return (
+        datetime.fromtimestamp(step * OFFSET_STEP.total_seconds(), timezone.utc)
+        .astimezone(tz)
+        .utcoffset()
+    )
+
+
+class DateTimeField(serializers.DateTimeField):
+    def to_representation(self, value):
+        output_format = getattr(self, "format", api_settings.DATETIME_FORMAT)
+        compiled = (
+            isinstance(output_format, str)
+            and output_format.lower() != ISO_8601
+            and compile_format(output_format)
+        )
+        field_timezone = getattr(self, "timezone", self.default_timezone())
+        offset = value.utcoffset() if isinstance(value, datetime) else None
+        if not compiled or offset is None or field_timezone is None:
+            return super().to_representation(value)
+
+        utc = value.replace(tzinfo=None) - offset
+        local = utc + utcoffset(field_timezone, (utc - EPOCH) // OFFSET_STEP)
+        template, values = compiled
+        return template % values(local)
+
+
+class ModelSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.DateTimeField: DateTimeField,
+    }
@@ -0,0 +1,83 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip variants are still emitted
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that also writes precompressed .gz/.br siblings of every
+    hashed file, so nginx can serve them with gzip_static/brotli_static.
+
+    Hashed names are content addressed, so a variant that already exists is
+    never rebuilt and repeated collectstatic runs only compress new files.
+    """
+
+    compress_extensions = (
+        ".css",
+        ".js",
+        ".map",
+        ".json",
+        ".svg",
+        ".txt",
+        ".html",
+        ".xml",
+        ".ico",
+        ".eot",
+        ".ttf",
+        ".otf",
+    )
+    compress_min_size = 256
+    # skip variants that don't save at least 5%
+    compress_min_ratio = 0.95
+
+    def post_process(self, paths, dry_run=False, **options):
+        # files referencing others are re-hashed over several passes, only the
+        # name yielded last for each path survives on disk
+        hashed_names = {}
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run=dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names[name] = hashed_name
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for hashed_name in hashed_names.values():
+            self.compress(hashed_name)
+
+    def compress(self, name):
+        if not name.endswith(self.compress_extensions):
+            return
+        path = self.path(name)
+        variants = [(path + ".gz", self._gzip)]
+        if brotli is not None:
+            variants.append((path + ".br", self._brotli))
+        variants = [
+            (target, func) for target, func in variants if not os.path.exists(target)
+        ]
+        if not variants or os.path.getsize(path) < self.compress_min_size:
+            return
+
+        with open(path, "rb") as source:
+            content = source.read()
+        for target, func in variants:
+            compressed = func(content)
+            if len(compressed) < len(content) * self.compress_min_ratio:
+                with open(target, "wb") as output:
+                    output.write(compressed)
+
+    @staticmethod
+    def _gzip(content):
+        # fixed mtime keeps the output reproducible between builds
+        return gzip.compress(content, compresslevel=9, mtime=0)
+
+    @staticmethod
+    def _brotli(content):
+        return brotli.compress(content, quality=11)
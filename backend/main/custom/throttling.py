@@ -0,0 +1,120 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from monitoring.metrics import THROTTLED_REQUESTS
+
+# Tokens charged per request: a password hash costs an order of magnitude
+# more CPU than a signature check or an indexed read.
+HASH_COST = 10
+READ_COST = 1
+
+
+class CostThrottle(BaseThrottle):
+    """
+    Rate limit keyed by client IP and by the identifier being authenticated,
+    charging each request the view's `throttle_cost`.
+
+    There is no bucket shared by everyone: a credential stuffing burst would
+    exhaust it and lock legitimate users out along with the attacker.
+    Instead views setting `throttle_failures` also charge a small "failure"
+    bucket per IP, and give that charge back with forgive() once the
+    credentials turn out right. Only wrong passwords add up there, so an
+    attacker gets a few hashes per address while users logging in don't
+    spend any of it.
+
+    Throttles run before the view, so a flood is answered with 429 before any
+    password is hashed.
+    """
+
+    identifier_fields = ("username", "phone_number", "email")
+
+    def __init__(self):
+        self.cache = caches[settings.THROTTLE_CACHE]
+        self.wait_time = None
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE_ENABLED:
+            return True
+        cost = getattr(view, "throttle_cost", READ_COST)
+        for scope, ident in self.get_buckets(request, view):
+            capacity, rate = settings.THROTTLE_BUCKETS[scope]
+            key = f"throttle:{scope}:{ident}"
+            wait = self.consume(key, cost, capacity, rate)
+            if wait:
+                THROTTLED_REQUESTS.labels(scope).inc()
+                self.wait_time = wait
+                return False
+            if scope == "failure":
+                request.throttle_failure_charge = key, cost
+        return True
+
+    def forgive(self, request):
+        """Give back what `request` was charged for a possibly failed login."""
+        key, cost = getattr(request, "throttle_failure_charge", (None, 0))
+        if key is None:
+            return
+        capacity, rate = settings.THROTTLE_BUCKETS["failure"]
+        # the window charged, unless one began since
+        index = int(time.time() // (capacity / rate))
+        try:
+            self.cache.decr(f"{key}:{index}", cost)
+        except ValueError:
+            pass
+
+    def get_buckets(self, request, view):
+        ip = self.get_ident(request)
+        yield "ip", ip
+        if getattr(view, "throttle_failures", False):
+            yield "failure", ip
+        for field in self.identifier_fields:
+            value = request.data.get(field)
+            if isinstance(value, str) and value.strip():
+                value = value.strip().lower().encode()
+                yield "identifier", hashlib.sha1(value).hexdigest()
+                break
+
+    def consume(self, key, cost, capacity, rate):
+        """
+        Charge `cost` tokens to a sliding window of `capacity / rate` seconds
+        allowing `capacity` tokens, and return the seconds to wait when it
+        can't cover them.
+
+        Each window is a counter moved with the cache's atomic incr(), so
+        concurrent requests, in any process, never spend the same tokens.
+        The previous window counts in proportion to how much of it the
+        sliding window still overlaps.
+        """
+        window = capacity / rate
+        now = time.time()
+        index, elapsed = divmod(now, window)
+        current = f"{key}:{int(index)}"
+        # kept for the window after it, which weighs it
+        self.cache.add(current, 0, math.ceil(window * 2))
+        try:
+            spent = self.cache.incr(current, cost)
+        except ValueError:
+            # evicted since the add()
+            self.cache.add(current, cost, math.ceil(window * 2))
+            spent = cost
+        previous = self.cache.get(f"{key}:{int(index) - 1}", 0)
+        overlap = 1 - elapsed / window
+        if previous * overlap + spent <= capacity:
+            return 0
+
+        try:
+            # refused requests don't spend anything
+            self.cache.decr(current, cost)
+        except ValueError:
+            pass
+        if spent > capacity:
+            return window - elapsed
+        # until enough of the previous window has slid out
+        return max(window * (1 - (capacity - spent) / previous) - elapsed, 1)
+
+    def wait(self):
+        return self.wait_time
@@ -0,0 +1,172 @@
+"""
+Uploads streamed straight into their storage directory.
+
+Django's default handlers keep an upload in memory or spool it to
+FILE_UPLOAD_TEMP_DIR, and FileSystemStorage then copies it into MEDIA_ROOT.
+StreamingUploadHandler writes the chunks as they arrive to a temporary file
+inside the directory the upload will be saved in, so saving it is a rename
+(see FileSystemStorage._save and temporary_file_path()). Along the way it
+hashes the content, names the file after its SHA-256, sniffs the type from
+the first bytes and enforces the size and count limits, failing the request
+as soon as one is broken.
+"""
+
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.temp import NamedTemporaryFile
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    UnsupportedMediaType,
+    ValidationError,
+)
+
+# (offset, signature, content type, extension)
+SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (8, b"WEBP", "image/webp", ".webp"),
+    (4, b"ftypheic", "image/heic", ".heic"),
+    (4, b"ftypheix", "image/heic", ".heic"),
+    (4, b"ftypmif1", "image/heif", ".heif"),
+]
+HEADER_SIZE = max(offset + len(signature) for offset, signature, _, _ in SIGNATURES)
+
+
+def sniff(header):
+    """(content type, extension) of a file starting with `header`, or Nones."""
+    for offset, signature, content_type, extension in SIGNATURES:
+        if header[offset : offset + len(signature)] == signature:
+            return content_type, extension
+    return None, None
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Upload too large."
+    default_code = "upload_too_large"
+
+
+class StreamedUploadedFile(UploadedFile):
+    """An upload already written to its storage directory."""
+
+    def __init__(self, file, name, content_type, size, sha256):
+        super().__init__(file, name, content_type, size)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # renamed into place by the storage, nothing left to clean up
+            pass
+
+
+class StreamingUploadHandler(FileUploadHandler):
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        request=None,
+        directory="",
+        storage=default_storage,
+        max_size=None,
+        max_files=None,
+        content_types=None,
+    ):
+        super().__init__(request)
+        self.directory = storage.path(directory)
+        self.max_size = max_size or settings.UPLOAD_MAX_SIZE
+        self.max_files = max_files or settings.UPLOAD_MAX_FILES
+        self.content_types = content_types or settings.UPLOAD_CONTENT_TYPES
+        self.files = []
+        self.file = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if len(self.files) >= self.max_files:
+            self.abort(
+                ValidationError(
+                    {self.field_name: f"At most {self.max_files} files per request."}
+                )
+            )
+        os.makedirs(self.directory, exist_ok=True)
+        # deleted on close unless the storage has renamed it into place
+        self.file = NamedTemporaryFile(
+            prefix=".upload-", suffix=".part", dir=self.directory
+        )
+        self.sha256 = hashlib.sha256()
+        self.header = b""
+        self.sniffed = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.abort(
+                UploadTooLarge(
+                    f"{self.file_name} is larger than {self.max_size} bytes."
+                )
+            )
+        if self.sniffed is None:
+            self.header = (self.header + raw_data)[:HEADER_SIZE]
+            if len(self.header) == HEADER_SIZE:
+                self.check_type()
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.sniffed is None:
+            self.check_type()
+        self.file.flush()
+        self.file.seek(0)
+        content_type, extension = self.sniffed
+        sha256 = self.sha256.hexdigest()
+        uploaded = StreamedUploadedFile(
+            self.file, sha256 + extension, content_type, file_size, sha256
+        )
+        self.files.append(uploaded)
+        self.file = None
+        return uploaded
+
+    def check_type(self):
+        content_type, extension = sniff(self.header)
+        if content_type not in self.content_types:
+            self.abort(
+                UnsupportedMediaType(
+                    content_type or self.content_type,
+                    f"{self.file_name} is not one of {', '.join(self.content_types)}.",
+                )
+            )
+        self.sniffed = content_type, extension
+
+    def abort(self, exc):
+        # the parser only cleans up after StopUpload, which would leave the
+        # view with a silently truncated request
+        self.upload_interrupted()
+        raise exc
+
+    def upload_interrupted(self):
+        for file in self.files + [self.file]:
+            if file is not None:
+                file.close()
+        self.files = []
+        self.file = None
+
+
+class StreamingUploadMixin:
+    """Views whose uploads are streamed into `upload_directory` of the storage."""
+
+    upload_directory = ""
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [
+            StreamingUploadHandler(request, directory=self.upload_directory)
+        ]
+        return super().initialize_request(request, *args, **kwargs)
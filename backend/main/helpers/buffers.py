@@ -0,0 +1,111 @@
+"""
+In-memory write buffers flushed in batches by a background thread.
+
+A buffer is flushed when it holds `max_size` items or every `interval`
+seconds, whichever comes first, and once more when the process exits
+(atexit, and gunicorn's worker_exit hook for graceful worker restarts).
+Only a hard kill of the worker loses what was buffered since the last
+flush.
+
+Without BACKGROUND_THREADS (under tests) nothing is flushed on a timer: a
+full buffer is written by the caller of add(), anything else stays buffered
+until flush() is called.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import weakref
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_buffers = weakref.WeakSet()
+
+
+def flush_all():
+    for buffer in list(_buffers):
+        buffer.flush()
+
+
+atexit.register(flush_all)
+
+
+def discard_all():
+    for buffer in list(_buffers):
+        buffer.discard()
+
+
+class FlushingBuffer:
+    """Subclasses implement write(items), called with a whole batch."""
+
+    def __init__(self, max_size=500, interval=2, max_pending=None):
+        self.max_size = max_size
+        self.interval = interval
+        # items kept for retry while the database is unavailable
+        self.max_pending = max_pending or max_size * 20
+        self.items = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pid = None
+        _buffers.add(self)
+
+    def add(self, item):
+        with self.lock:
+            threaded = self._ensure_thread()
+            self.items.append(item)
+            full = len(self.items) >= self.max_size
+        if full and threaded:
+            self.wakeup.set()
+        elif full:
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                items, self.items = self.items, []
+            if not items:
+                return
+            try:
+                self.write(items)
+            except Exception:
+                logger.exception("Flushing %d items of %r failed", len(items), self)
+                with self.lock:
+                    items.extend(self.items)
+                    dropped = len(items) - self.max_pending
+                    if dropped > 0:
+                        logger.error("Dropping %d buffered items of %r", dropped, self)
+                        del items[:dropped]
+                    self.items = items
+
+    def discard(self):
+        with self.lock:
+            self.items = []
+
+    def write(self, items):
+        raise NotImplementedError
+
+    def _ensure_thread(self):
+        if not settings.BACKGROUND_THREADS:
+            return False
+        # started lazily so it runs in the forked worker, not the master
+        if self.pid == os.getpid():
+            return True
+        self.pid = os.getpid()
+        thread = threading.Thread(
+            target=self._run, name=f"{type(self).__name__}-flusher", daemon=True
+        )
+        thread.start()
+        return True
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            # this thread's connection never sees request_finished
+            close_old_connections()
+            self.flush()
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "django_hosts",
     "django_filters",
     "rest_framework",
@@ -52,10 +53,30 @@ INSTALLED_APPS = [
     "drf_yasg",
     "users.apps.UserConfig",
     "admin_panel",
+    "monitoring.apps.MonitoringConfig",
+    "audit.apps.AuditConfig",
+    "locations.apps.LocationsConfig",
+    "notifications.apps.NotificationsConfig",
 ]
 
 MIDDLEWARE = [
     "django_hosts.middleware.HostsRequestMiddleware",
+    "monitoring.middleware.MetricsMiddleware",
+    "main.custom.middleware.ReplicaPinningMiddleware",
+    "main.custom.middleware.HostMiddlewareRouter",
+    "django_hosts.middleware.HostsResponseMiddleware",
+]
+
+# per host stacks run by HostMiddlewareRouter, the client api authenticates
+# with JWT and never touches sessions, CSRF cookies or messages
+API_MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "monitoring.middleware.ProfilingMiddleware",
+]
+
+DEFAULT_HOST_MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -64,9 +85,19 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "django_hosts.middleware.HostsResponseMiddleware",
+    "monitoring.middleware.ProfilingMiddleware",
 ]
 
+HOST_MIDDLEWARE = {
+    "default": API_MIDDLEWARE,
+    "client-api": API_MIDDLEWARE,
+    "dj-api": DEFAULT_HOST_MIDDLEWARE,
+}
+
+# the admin checks only look at MIDDLEWARE, the admin host still gets
+# sessions, auth and messages through DEFAULT_HOST_MIDDLEWARE
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
+
 ROOT_URLCONF = "main.urls"
 ROOT_HOSTCONF = "main.urls.hosts"
 DEFAULT_HOST = "default"
@@ -91,18 +122,130 @@ TEMPLATES = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "main.custom.authentication.CachedJWTAuthentication",
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    # orjson, same output as DRF's JSONRenderer/JSONParser
+    "DEFAULT_RENDERER_CLASSES": (
+        "main.custom.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "main.custom.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    # main.custom.serializers.ModelSerializer formats it without strftime
     "DATETIME_FORMAT": "%m/%d/%Y %H:%M:%S",
+    # nginx is the only proxy in front of the app
+    "NUM_PROXIES": 1,
+}
+
+DATABASE_ROUTERS = ["main.custom.routers.ReplicaRouter"]
+# aliases in DATABASES that take reads, filled from DATABASE_REPLICA_HOSTS
+DATABASE_REPLICAS = []
+REPLICA_MAX_LAG = 5
+REPLICA_LAG_CHECK_INTERVAL = 2
+# seconds to connect to a replica and to answer the lag check
+REPLICA_TIMEOUT = 2
+# longer than REPLICA_MAX_LAG, so a pinned user can't read behind their write
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_CACHE = "default"
+
+# CACHE_URL=pymemcache://memcached:11211 (the compose files' memcached); locmem
+# is per process and only fit for runserver and tests, see main.custom.checks.
+# Bump CACHE_VERSION when the shape of cached values changes
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+CACHES["default"]["VERSION"] = env.int("CACHE_VERSION", default=1)
+# per-process caches fail the checks instead of warning, set in production
+SHARED_CACHE_REQUIRED = False
+
+# main.custom.cache: per-process LRU in front of the shared cache
+TIERED_CACHE_ALIAS = "default"
+LOCAL_CACHE_MAX_ENTRIES = 1000
+LOCAL_CACHE_TTL = 5
+CACHE_LOCK_TIMEOUT = 10
+
+# off to measure the backend without rate limiting
+THROTTLE_ENABLED = env.bool("THROTTLE_ENABLED", default=True)
+# has to be shared by every process, see main.custom.checks
+THROTTLE_CACHE = "default"
+# (tokens per window, tokens per second): sliding windows of capacity / rate
+# seconds, a password hash costs 10 tokens. "failure" only keeps the logins
+# that failed: 3 wrong passwords per IP, then one every 100 seconds
+THROTTLE_BUCKETS = {
+    "ip": (200, 2),
+    "failure": (30, 0.1),
+    "identifier": (50, 0.05),
 }
 
+# PBKDF2 hashes ~12 passwords a second per core, a full batch has to finish
+# well within gunicorn's 30 second worker timeout
+REGISTER_BATCH_MAX_SIZE = 100
+
+# per-process threads syncing state in the background, see main.custom.runner
+BACKGROUND_THREADS = True
+
+# users.revocation: per-process Bloom filter over RevokedToken, grows as needed,
+# built and synced by a background thread
+REVOCATION_FILTER_CAPACITY = 100_000
+REVOCATION_FILTER_ERROR_RATE = 0.01
+REVOCATION_SYNC_INTERVAL = 5
+# rows committed this long after their creation time are still picked up
+REVOCATION_SYNC_OVERLAP = 60
+REVOCATION_EXACT_SIZE = 10_000
+
+# users.activity: last_seen is written at most once per ACTIVITY_RESOLUTION
+# seconds per user and process, in batches
+ACTIVITY_RESOLUTION = 5 * 60
+ACTIVITY_BUFFER_SIZE = 1000
+ACTIVITY_FLUSH_INTERVAL = 10
+ACTIVITY_TRACKED_USERS = 100_000
+
+# audit.events: per-process buffer written in batches, whichever comes first
+AUDIT_BUFFER_SIZE = 500
+AUDIT_FLUSH_INTERVAL = 2
+# monthly partitions of audit_event, see manage_audit_partitions
+AUDIT_PARTITIONS_AHEAD = 2
+AUDIT_RETENTION_MONTHS = 12
+
+# locations.tracker: the latest ping per driver is written in batches,
+# drivers count as offline LOCATION_TTL seconds after their last one
+LOCATION_MAX_BATCH = 100
+LOCATION_BUFFER_SIZE = 2000
+LOCATION_FLUSH_INTERVAL = 2
+LOCATION_TTL = 2 * 60
+# per-process nearest-driver grid, cells of ~275 m, synced from the database
+LOCATION_GRID_CELL = 0.0025
+LOCATION_INDEX_REFRESH = 2
+LOCATION_NEAREST_MAX = 20
+LOCATION_NEAREST_RADIUS = 20_000
+
+# notifications: websockets served by main.asgi, fed across processes by
+# notifications.backends.PostgresBackend; LocalBackend only reaches sockets
+# of the publishing process
+NOTIFICATIONS_BACKEND = env(
+    "NOTIFICATIONS_BACKEND", default="notifications.backends.LocalBackend"
+)
+NOTIFICATIONS_PATH = "/ws/"
+NOTIFICATIONS_QUEUE_SIZE = 100
+# notifications.push: devices of the tokens FCM rejects are deactivated in
+# batches, prune_fcm_devices deletes them after FCM_INACTIVE_RETENTION_DAYS
+FCM_INVALID_TOKEN_BUFFER_SIZE = 500
+FCM_INVALID_TOKEN_FLUSH_INTERVAL = 10
+FCM_INACTIVE_RETENTION_DAYS = 30
+FCM_PRUNE_CHUNK_SIZE = 500
+FCM_PRUNE_PAUSE = 0.1
+
 REST_KNOX = {"TOKEN_TTL": None}  # tokens never expire
 
 WSGI_APPLICATION = "main.wsgi.application"
 
+# plain static storage and the like, see main.custom.runner
+TEST_RUNNER = "main.custom.runner.TestRunner"
+
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
 AUTHENTICATION_BACKENDS = [
@@ -142,9 +285,25 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = "staticfiles"
 STATICFILES_DIRS = ["templates/static/"]
+# hashed names + precompressed .gz/.br variants, served by nginx with far-future caching
+STATICFILES_STORAGE = "main.custom.storages.CompressedManifestStaticFilesStorage"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = "mediafiles"
+# media is served through users.views.serve_document, which authorizes the
+# request and hands the transfer to nginx's internal location
+MEDIA_ACCEL_REDIRECT = False
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+MEDIA_ACL_CACHE_TIMEOUT = 5 * 60
+# main.custom.uploads: per file limits, checked while the upload streams in;
+# nginx's client_max_body_size has to allow UPLOAD_MAX_FILES of them
+UPLOAD_MAX_SIZE = 15 * 1024 * 1024
+UPLOAD_MAX_FILES = 5
+UPLOAD_CONTENT_TYPES = ["image/jpeg", "image/png", "image/webp", "image/heic", "image/heif"]
+# users.uploads: resumable uploads, chunks stay well below client_max_body_size
+UPLOAD_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+UPLOAD_MAX_SESSIONS = 10
 
 # fcm django config
 FIREBASE_KEY = "firebase-admin.json"
@@ -164,10 +323,34 @@ FCM_DJANGO_SETTINGS = {
     # devices to which notifications cannot be sent,
     # are deleted upon receiving error response from FCM
     # default: False
+    # kept off, notifications.push deactivates them in batches and
+    # prune_fcm_devices deletes them in chunks
     "DELETE_INACTIVE_DEVICES": False,
 }
 
 
+# queries allowed to repeat with different parameters before a request is
+# flagged as N+1; per-route budgets are declared in the url confs
+QUERY_REPEAT_THRESHOLD = 3
+QUERY_BUDGET_STRICT = False
+
+# bearer token for the prometheus scraper, staff sessions are always allowed
+METRICS_TOKEN = env("METRICS_TOKEN", default=None)
+
+# monitoring.profiling: ?_profile=1 for staff on the admin host, an X-Profile
+# token from the RequestProfile admin, or a random share of all requests
+PROFILING_ENABLED = True
+PROFILE_SAMPLE_RATE = env.float("PROFILE_SAMPLE_RATE", default=0.0)
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+PROFILE_MAX_QUERIES = 200
+PROFILE_RETENTION_DAYS = 7
+
+# monitoring.slow_queries: queries at least this slow are logged per
+# fingerprint (None to disable), and a share of them EXPLAIN ANALYZEd
+SLOW_QUERY_THRESHOLD_MS = env.int("SLOW_QUERY_THRESHOLD_MS", default=200)
+SLOW_QUERY_EXPLAIN_RATE = 0.1
+SLOW_QUERY_EXPLAIN_INTERVAL = 60 * 60
+
 LOGIN_URL = 'admin:login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'admin:login'
@@ -1,4 +1,4 @@
-from .base import env
+from .base import MIDDLEWARE, REPLICA_TIMEOUT, env
 
 ALLOWED_HOSTS = ["*"]
 
@@ -14,3 +14,18 @@ DATABASES = {
         "PORT": 5432,
     }
 }
+
+# streaming replicas taking the reads, see main.custom.routers
+for number, host in enumerate(env.list("DATABASE_REPLICA_HOSTS", default=[]), 1):
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "OPTIONS": {"connect_timeout": REPLICA_TIMEOUT},
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+
+# runserver serves the sources as they are, nothing to hash
+STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+
+MIDDLEWARE = MIDDLEWARE + ["monitoring.middleware.QueryInspectionMiddleware"]
@@ -1,9 +1,17 @@
 import json
 
 from main.helpers.rds_secrets import get_rds_secret
+from .base import REPLICA_TIMEOUT, env
 
 ALLOWED_HOSTS = ["*"]
 
+MEDIA_ACCEL_REDIRECT = True
+
+# several gunicorn workers, the cache has to be shared by all of them
+CACHES = {"default": env.cache("CACHE_URL")}
+CACHES["default"]["VERSION"] = env.int("CACHE_VERSION", default=1)
+SHARED_CACHE_REQUIRED = True
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:1996",
     "http://127.0.0.1:1996",
@@ -21,3 +29,13 @@ DATABASES = {
         "PORT": rds_details.get("port"),
     }
 }
+
+# streaming replicas taking the reads, see main.custom.routers
+for number, host in enumerate(env.list("DATABASE_REPLICA_HOSTS", default=[]), 1):
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "OPTIONS": {"connect_timeout": REPLICA_TIMEOUT},
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
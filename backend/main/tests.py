@@ -0,0 +1,120 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.request import Request
+
+from main.custom.permissions import (
+    ActionBasedPermission,
+    IsPosterOrReadOnly,
+    compile_action_permissions,
+    related_id,
+    resolve_owner_path,
+)
+from users.models import Customer, Driver, DriverDocument, User
+
+
+class ActionView:
+    action_permissions = {
+        IsAdminUser: ["destroy"],
+        IsAuthenticated: ["list", "destroy"],
+        AllowAny: ["create"],
+    }
+
+    def __init__(self, action, **kwargs):
+        self.action = action
+        # as as_view(**kwargs) sets them
+        self.__dict__.update(kwargs)
+
+
+class DocumentOwnerPermission(IsPosterOrReadOnly):
+    owner_paths = (("poster", "user"), ("driver", "user"))
+
+
+class ActionBasedPermissionTest(TestCase):
+    def setUp(self):
+        self.request = Request(RequestFactory().get("/"))
+        self.request.user = User(id=1, phone_number="+15550008000")
+
+    def has_permission(self, view, user=None):
+        if user is not None:
+            self.request.user = user
+        return ActionBasedPermission().has_permission(self.request, view)
+
+    def test_compile(self):
+        compiled = compile_action_permissions(ActionView.action_permissions)
+        # the first class listing an action wins
+        self.assertIsInstance(compiled["destroy"], IsAdminUser)
+        self.assertIsInstance(compiled["list"], IsAuthenticated)
+        self.assertIsInstance(compiled["create"], AllowAny)
+        self.assertNotIn("retrieve", compiled)
+
+    def test_allow_and_deny_per_action(self):
+        self.assertTrue(self.has_permission(ActionView("list")))
+        self.assertFalse(self.has_permission(ActionView("destroy")))
+        self.assertFalse(self.has_permission(ActionView("list"), AnonymousUser()))
+        self.assertTrue(self.has_permission(ActionView("create")))
+
+    def test_action_without_permission_is_denied(self):
+        self.assertFalse(self.has_permission(ActionView("retrieve")))
+        self.assertFalse(self.has_permission(ActionView(None)))
+        self.assertFalse(
+            ActionBasedPermission().has_object_permission(
+                self.request, ActionView("retrieve"), object()
+            )
+        )
+
+    def test_per_instance_permissions(self):
+        view = ActionView("retrieve", action_permissions={AllowAny: ["retrieve"]})
+        self.assertTrue(self.has_permission(view))
+        # the class' compiled mapping is left alone
+        self.assertFalse(self.has_permission(ActionView("retrieve")))
+
+
+class OwnerPermissionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
+            phone_number="+15550008001", email="owner@example.com"
+        )
+        cls.other = User.objects.create_user(
+            phone_number="+15550008002", email="other@example.com"
+        )
+        cls.document = DriverDocument.objects.create(
+            driver=Driver.objects.create(user=cls.owner),
+            image="images/documents/permissions.png",
+        )
+
+    def has_object_permission(self, method, user, document):
+        request = Request(getattr(RequestFactory(), method)("/"))
+        request.user = user
+        return DocumentOwnerPermission().has_object_permission(request, None, document)
+
+    def test_resolve_owner_path(self):
+        paths = DocumentOwnerPermission.owner_paths
+        self.assertEqual(resolve_owner_path(DriverDocument, paths), ("driver", "user"))
+        # a reverse relation isn't a path to the owner
+        self.assertIsNone(resolve_owner_path(User, (("driver_profile", "user"),)))
+        self.assertIsNone(resolve_owner_path(Customer, paths))
+
+    def test_related_id_across_a_relation(self):
+        document = DriverDocument.objects.get(pk=self.document.pk)
+        # the driver isn't loaded, its user_id is read without loading it
+        with self.assertNumQueries(1):
+            self.assertEqual(related_id(document, ("driver", "user")), self.owner.pk)
+        document = DriverDocument.objects.select_related("driver").get(
+            pk=self.document.pk
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(related_id(document, ("driver", "user")), self.owner.pk)
+            self.assertEqual(related_id(document, ("driver",)), document.driver_id)
+
+    def test_owner_may_edit(self):
+        document = DriverDocument.objects.get(pk=self.document.pk)
+        self.assertTrue(self.has_object_permission("put", self.owner, document))
+        self.assertFalse(self.has_object_permission("put", self.other, document))
+        self.assertFalse(self.has_object_permission("put", AnonymousUser(), document))
+        self.assertTrue(self.has_object_permission("get", self.other, document))
+
+    def test_no_owner_path_is_denied(self):
+        customer = Customer.objects.create(user=self.owner)
+        self.assertFalse(self.has_object_permission("put", self.owner, customer))
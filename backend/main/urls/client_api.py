@@ -4,32 +4,51 @@ from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 from rest_framework.routers import DefaultRouter
 
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from monitoring.queries import query_budget
 from users.api import (
     RegisterAPI,
+    RegisterBatchAPI,
     UserViewset,
+    UploadSessionViewset,
     LoginAPI,
+    LogoutAPI,
+    TokenObtainPairAPI,
+    TokenRefreshAPI,
 )
+from users.views import serve_document
+from locations.api import LocationAPI, NearestDriversAPI
 
 router = DefaultRouter()
 urlpatterns = []
 
 # -------------- auth app view sets --------------
 urlpatterns += [
-    path("register/", RegisterAPI.as_view()),
-    path("login/", LoginAPI.as_view()),
-    path("user/", UserViewset.as_view({"get": "retrieve"})),
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path("register/", query_budget(4)(RegisterAPI.as_view())),
+    path("register/batch/", query_budget(4)(RegisterBatchAPI.as_view())),
+    path("login/", query_budget(3)(LoginAPI.as_view())),
+    path("logout/", query_budget(4)(LogoutAPI.as_view())),
+    # +1 for the token's revocation check until the filter is loaded
+    path("user/", query_budget(2)(UserViewset.as_view({"get": "retrieve"}))),
+    path('token/', query_budget(1)(TokenObtainPairAPI.as_view()), name='token_obtain_pair'),
+    path('token/refresh/', query_budget(2)(TokenRefreshAPI.as_view()), name='token_refresh'),
 ]
 router.register("users", UserViewset)
+router.register("uploads", UploadSessionViewset, basename="upload-session")
 # -------------- auth app view sets --------------
 
+# -------------- locations app views --------------
+urlpatterns += [
+    path("locations/", query_budget(2)(LocationAPI.as_view())),
+    # +1 for the periodic index sync
+    path("locations/nearest/", query_budget(3)(NearestDriversAPI.as_view())),
+]
+# -------------- locations app views --------------
+
 urlpatterns += router.urls
 
+# the schema only changes with a deploy
+SCHEMA_CACHE_TIMEOUT = 60 * 60
+
 schema_view = get_schema_view(
     openapi.Info(
         title="API Docs",
@@ -43,17 +62,20 @@ schema_view = get_schema_view(
 )
 
 urlpatterns += [
+    path("media/<path:path>", serve_document, name="media"),
     re_path(
         r"^swagger(?P<format>\.json|\.yaml)$",
-        schema_view.without_ui(cache_timeout=0),
+        schema_view.without_ui(cache_timeout=SCHEMA_CACHE_TIMEOUT),
         name="schema-json",
     ),
     re_path(
         r"^swagger/$",
-        schema_view.with_ui("swagger", cache_timeout=0),
+        schema_view.with_ui("swagger", cache_timeout=SCHEMA_CACHE_TIMEOUT),
         name="schema-swagger-ui",
     ),
     re_path(
-        r"^redoc/$", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"
+        r"^redoc/$",
+        schema_view.with_ui("redoc", cache_timeout=SCHEMA_CACHE_TIMEOUT),
+        name="schema-redoc",
     ),
 ]
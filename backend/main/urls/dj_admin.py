@@ -5,9 +5,12 @@ from django.contrib.auth import views as auth_views
 
 import users.views as users_views
 import admin_panel.views as admin_views
+import monitoring.views as monitoring_views
 
 
 urlpatterns = [
     path("", admin_views.Dashboard.as_view(), name="dashboard"),
+    path("media/<path:path>", users_views.serve_document, name="media"),
+    path("metrics/", monitoring_views.metrics, name="metrics"),
     path("", admin.site.urls),
 ]
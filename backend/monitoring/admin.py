@@ -0,0 +1,144 @@
+import zlib
+
+from django.conf import settings
+from django.contrib import admin
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+
+from . import profiling
+from .models import RequestProfile, SlowQuery
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Profiles taken by monitoring.profiling, newest first. token/ hands out a
+    value for the X-Profile header, <id>/download/ the pstats dump.
+    """
+
+    list_display = [
+        "created",
+        "method",
+        "path",
+        "status",
+        "duration_ms",
+        "query_count",
+        "query_ms",
+        "trigger",
+        "user_id",
+    ]
+    list_filter = ["trigger", "method"]
+    search_fields = ["path", "route"]
+    ordering = ("-created",)
+    exclude = ["stats", "summary", "queries"]
+    readonly_fields = ["download", "profile", "sql"]
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.resolver_match.url_name.endswith("_changelist"):
+            queryset = queryset.defer("stats", "summary", "queries")
+        return queryset
+
+    def get_urls(self):
+        return [
+            path(
+                "token/",
+                self.admin_site.admin_view(self.token_view),
+                name="monitoring_requestprofile_token",
+            ),
+            path(
+                "<uuid:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="monitoring_requestprofile_download",
+            ),
+        ] + super().get_urls()
+
+    def token_view(self, request):
+        return JsonResponse(
+            {
+                "header": "X-Profile",
+                "token": profiling.make_token(request.user),
+                "expires_in": settings.PROFILE_TOKEN_MAX_AGE,
+            }
+        )
+
+    def download_view(self, request, pk):
+        record = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(
+            zlib.decompress(record.stats), content_type="application/octet-stream"
+        )
+        response["Content-Disposition"] = f'attachment; filename="{pk}.prof"'
+        return response
+
+    @admin.display(description="pstats dump")
+    def download(self, obj):
+        url = reverse("admin:monitoring_requestprofile_download", args=[obj.pk])
+        return format_html('<a href="{}">{}.prof</a>', url, obj.pk)
+
+    @admin.display(description="profile")
+    def profile(self, obj):
+        return format_html("<pre>{}</pre>", obj.summary)
+
+    @admin.display(description="queries")
+    def sql(self, obj):
+        rows = format_html_join(
+            "\n",
+            "<tr><td>{}</td><td><code>{}</code></td></tr>",
+            ((query["ms"], query["sql"]) for query in obj.queries),
+        )
+        return format_html("<table>{}</table>", rows)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """
+    The slow-query log, worst offenders (by total time) first. Rows are
+    aggregated by monitoring.slow_queries, sort by calls or max_ms to find
+    the frequent or the pathological ones.
+    """
+
+    list_display = [
+        "fingerprint_head",
+        "alias",
+        "calls",
+        "total_ms",
+        "mean",
+        "max_ms",
+        "last_seen",
+        "explained",
+    ]
+    list_filter = ["alias"]
+    search_fields = ["fingerprint"]
+    ordering = ("-total_ms",)
+    exclude = ["plan"]
+    readonly_fields = ["explain_output"]
+
+    @admin.display(description="query")
+    def fingerprint_head(self, obj):
+        return obj.fingerprint[:120]
+
+    @admin.display(description="mean ms")
+    def mean(self, obj):
+        return f"{obj.mean_ms:.1f}"
+
+    @admin.display(boolean=True, ordering="explained_at")
+    def explained(self, obj):
+        return bool(obj.plan)
+
+    @admin.display(description="plan")
+    def explain_output(self, obj):
+        return format_html("<pre>{}</pre>", obj.plan)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+class MonitoringConfig(AppConfig):
+    name = "monitoring"
+
+    def ready(self):
+        if settings.SLOW_QUERY_THRESHOLD_MS is not None:
+            from .slow_queries import install
+
+            connection_created.connect(install, dispatch_uid="monitoring.slow_queries")
@@ -0,0 +1,76 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+
+from main.custom.middleware import MiddlewareChain
+from monitoring.middleware import MetricsMiddleware
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request overhead of the metrics middleware and of the "
+        "middleware stack of every host."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=100000)
+        parser.add_argument("--path", default="/user/")
+        parser.add_argument("--urlconf", default="main.urls.client_api")
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        match = resolve(options["path"], urlconf=options["urlconf"])
+        response = HttpResponse(b"{}")
+
+        def view(_):
+            return response
+
+        def get_request():
+            request = RequestFactory().get(options["path"])
+            request.resolver_match = match
+            return request
+
+        baseline = self.run(view, get_request, iterations)
+        self.report("baseline", baseline, 0)
+        self.report(
+            "metrics",
+            self.run(MetricsMiddleware(view), get_request, iterations),
+            baseline,
+        )
+
+        chains = {"(default)": settings.DEFAULT_HOST_MIDDLEWARE}
+        chains.update(settings.HOST_MIDDLEWARE)
+        for host, paths in chains.items():
+            chain = self.build_chain(paths, view)
+            self.report(
+                host, self.run(chain.handler, get_request, iterations), baseline
+            )
+
+    @staticmethod
+    def build_chain(paths, view):
+        # view hooks run after the stack's request phase, like BaseHandler does
+        def get_response(request):
+            for hook in chain.view_hooks:
+                hook(request, view, (), {})
+            return view(request)
+
+        chain = MiddlewareChain(paths, get_response)
+        return chain
+
+    def report(self, name, duration, baseline):
+        self.stdout.write(
+            f"{name:<12} {duration:8.2f} us/request  (+{duration - baseline:.2f})"
+        )
+
+    @staticmethod
+    def run(handler, get_request, iterations):
+        # requests are built up front, middleware may cache things on them
+        requests = [get_request() for _ in range(iterations)]
+        start = perf_counter()
+        for request in requests:
+            handler(request)
+        return (perf_counter() - start) / iterations * 1e6
@@ -0,0 +1,165 @@
+import json
+import random
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from fcm_django.models import FCMDevice
+
+from monitoring.plans import SEQ_SCAN, explain
+from users.models import Customer, Driver, DriverDocument, User
+
+SNAPSHOT = Path(__file__).resolve().parents[2] / "query_plans.json"
+SEED_PREFIX = "+1777"
+
+
+def key_queries():
+    """name -> (queryset, tables that must not be scanned sequentially)"""
+    user = User.objects.filter(phone_number__startswith=SEED_PREFIX).first()
+    user_id = user.pk if user else 0
+    phone_number = user.phone_number if user else SEED_PREFIX
+    return {
+        "pending_drivers": (
+            Driver.objects.filter(is_verified__isnull=True).order_by("-created")[:25],
+            ["users_driver"],
+        ),
+        "pending_customers": (
+            Customer.objects.filter(is_verified__isnull=True).order_by("-created")[:25],
+            ["users_customer"],
+        ),
+        "verified_drivers": (
+            Driver.objects.filter(is_verified=True).order_by("-created")[:25],
+            ["users_driver"],
+        ),
+        "verified_customers": (
+            Customer.objects.filter(is_verified=True).order_by("-created")[:25],
+            ["users_customer"],
+        ),
+        "login_lookup": (
+            User.objects.filter(Q(phone_number=phone_number) | Q(email=phone_number)),
+            ["users_user"],
+        ),
+        "user_devices": (
+            FCMDevice.objects.filter(user_id=user_id, active=True).values_list(
+                "registration_id", flat=True
+            ),
+            ["fcm_django_fcmdevice"],
+        ),
+        "document_owner": (
+            DriverDocument.objects.filter(
+                image="images/documents/missing.png"
+            ).values_list("driver__user_id", flat=True),
+            ["users_driverdocument"],
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the key queries against a realistic volume and fail when one "
+        "of them scans a table sequentially or its plan differs from the "
+        "snapshot in monitoring/query_plans.json. Seeded rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=100_000,
+            help="users to create before explaining, 0 to use the existing data",
+        )
+        parser.add_argument(
+            "--update", action="store_true", help="rewrite the plan snapshot"
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+            plans = {
+                name: (explain(queryset), tables)
+                for name, (queryset, tables) in key_queries().items()
+            }
+            transaction.set_rollback(True)
+
+        snapshots = json.loads(SNAPSHOT.read_text()) if SNAPSHOT.exists() else {}
+        expected = snapshots.get(connection.vendor, {})
+        failures = []
+        for name, (scans, tables) in plans.items():
+            shape = [str(scan) for scan in scans]
+            self.stdout.write(f"{name}: {'; '.join(shape)}")
+            for scan in scans:
+                if scan.node == SEQ_SCAN and scan.table in tables:
+                    failures.append(f"{name}: {scan}")
+            if name in expected and expected[name] != shape and not options["update"]:
+                failures.append(
+                    f"{name}: plan changed from {'; '.join(expected[name])}"
+                )
+
+        if options["update"]:
+            snapshots[connection.vendor] = {
+                name: [str(scan) for scan in scans]
+                for name, (scans, _) in plans.items()
+            }
+            SNAPSHOT.write_text(json.dumps(snapshots, indent=2, sort_keys=True) + "\n")
+            self.stdout.write(f"Wrote {SNAPSHOT}")
+        if failures:
+            raise CommandError("Query plans degraded:\n" + "\n".join(failures))
+
+    def seed(self, count):
+        self.stdout.write(f"Seeding {count} users...")
+        User.objects.bulk_create(
+            (
+                User(
+                    full_name=f"Plan {i}",
+                    phone_number=f"{SEED_PREFIX}{i:09d}",
+                    email=f"plan{i}@example.com",
+                    password="!",
+                )
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
+        user_ids = list(
+            User.objects.filter(phone_number__startswith=SEED_PREFIX).values_list(
+                "id", flat=True
+            )
+        )
+
+        def is_verified():
+            # most profiles are settled, a few wait for review
+            return random.choices([True, False, None], [90, 5, 5])[0]
+
+        drivers = user_ids[::3]
+        customers = [id for n, id in enumerate(user_ids) if n % 3]
+        Driver.objects.bulk_create(
+            (Driver(user_id=id, is_verified=is_verified()) for id in drivers),
+            batch_size=5000,
+        )
+        Customer.objects.bulk_create(
+            (Customer(user_id=id, is_verified=is_verified()) for id in customers),
+            batch_size=5000,
+        )
+        FCMDevice.objects.bulk_create(
+            (
+                FCMDevice(
+                    user_id=id,
+                    registration_id=f"plan-{id}-{n}",
+                    type="android",
+                    active=random.random() < 0.9,
+                )
+                for id in user_ids
+                for n in range(2)
+            ),
+            batch_size=5000,
+        )
+        for id in drivers[:: max(1, len(drivers) // 1000)]:
+            DriverDocument.objects.create(
+                driver=Driver.objects.get(user_id=id),
+                image=f"images/documents/plan-{id}.png",
+            )
+        if connection.vendor == "postgresql":
+            # plan against statistics that include the seeded rows
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.custom.routers import ReplicaMonitor
+
+
+class Command(BaseCommand):
+    help = "Show the replication lag of every replica and whether it takes reads."
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas configured, set DATABASE_REPLICA_HOSTS.")
+        for alias in settings.DATABASE_REPLICAS:
+            lag = ReplicaMonitor.get_lag(alias)
+            if lag is None:
+                status = "out of rotation (unreachable or not a replica)"
+            elif lag > settings.REPLICA_MAX_LAG:
+                status = f"out of rotation ({lag:.2f}s behind)"
+            else:
+                status = f"in rotation ({lag:.2f}s behind)"
+            self.stdout.write(f"{alias}: {status}")
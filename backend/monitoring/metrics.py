@@ -0,0 +1,74 @@
+"""
+Prometheus metrics shared by the whole project.
+
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn in production) every worker
+writes its samples to mmap'd files in that directory and the scrape view
+merges them, otherwise the default in-process registry is used.
+"""
+
+import os
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client import multiprocess
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUESTS = Counter(
+    "django_http_requests_total",
+    "Requests by host, route, method and status.",
+    ["host", "route", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "django_http_request_duration_seconds",
+    "Request latency including middleware.",
+    ["host", "route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+QUERY_COUNT = Histogram(
+    "django_http_db_queries",
+    "SQL queries executed per request.",
+    ["host", "route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+QUERY_LATENCY = Histogram(
+    "django_http_db_duration_seconds",
+    "Time spent in SQL per request.",
+    ["host", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "django_http_response_size_bytes",
+    "Response body size, streaming responses excluded.",
+    ["host", "route"],
+    buckets=SIZE_BUCKETS,
+)
+THROTTLED_REQUESTS = Counter(
+    "django_throttled_requests_total",
+    "Requests rejected with 429, by exhausted bucket.",
+    ["bucket"],
+)
+CACHE_REQUESTS = Counter(
+    "django_tiered_cache_requests_total",
+    "Tiered cache lookups by tier and result, for hit ratios.",
+    ["tier", "result"],
+)
+PUSH_INVALID_TOKENS = Counter(
+    "fcm_invalid_tokens_total",
+    "Device tokens FCM rejected as unregistered or invalid on a push.",
+)
+REPLICA_LAG = Gauge(
+    "django_db_replica_lag_seconds",
+    "Replay lag of each read replica, as last checked by a worker.",
+    ["alias"],
+    multiprocess_mode="max",
+)
+
+
+def get_registry():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
@@ -0,0 +1,108 @@
+import logging
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import profiling
+from .metrics import (
+    QUERY_COUNT,
+    QUERY_LATENCY,
+    REQUEST_LATENCY,
+    REQUESTS,
+    RESPONSE_SIZE,
+)
+from .queries import (
+    QueryBudgetExceeded,
+    QueryCounter,
+    QueryRecorder,
+    get_query_budget,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL count/time, status and response size per route.
+
+    Routes are labelled with the url pattern rather than the path, so the
+    number of series stays bounded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        # execute_wrapper() without the context manager overhead
+        wrapped = connections.all()
+        for connection in wrapped:
+            connection.execute_wrappers.append(queries)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = perf_counter() - start
+            for connection in wrapped:
+                connection.execute_wrappers.remove(queries)
+
+        host = request.host.name if hasattr(request, "host") else ""
+        match = request.resolver_match
+        route = match.route if match else "<unresolved>"
+        REQUEST_LATENCY.labels(host, route, request.method).observe(duration)
+        REQUESTS.labels(host, route, request.method, response.status_code).inc()
+        QUERY_COUNT.labels(host, route).observe(queries.count)
+        QUERY_LATENCY.labels(host, route).observe(queries.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(host, route).observe(len(response.content))
+        return response
+
+
+class QueryInspectionMiddleware:
+    """
+    Development aid reporting requests that exceed their route's query budget
+    or repeat a statement with different parameters (N+1). Problems are
+    logged, or raised when QUERY_BUDGET_STRICT is on.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        response["X-Query-Count"] = recorder.count
+        budget = get_query_budget(request.resolver_match, request.method)
+        problems = recorder.problems(budget, settings.QUERY_REPEAT_THRESHOLD)
+        if problems:
+            message = f"{request.method} {request.path}: " + "; ".join(problems)
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests monitoring.profiling picks. Runs last in the host
+    stacks, so the admin's session user is known.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE
+
+    def __call__(self, request):
+        trigger = profiling.get_trigger(request, self.sample_rate)
+        if trigger is None:
+            return self.get_response(request)
+        return profiling.profile(request, self.get_response, *trigger)
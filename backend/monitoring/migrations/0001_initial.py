@@ -0,0 +1,47 @@
+# Generated by Django 3.2.10 on 2026-10-19 17:40
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True, db_index=True)),
+                (
+                    "trigger",
+                    models.CharField(
+                        choices=[("staff", "Staff"), ("sampled", "Sampled")],
+                        max_length=10,
+                    ),
+                ),
+                ("user_id", models.BigIntegerField(blank=True, null=True)),
+                ("method", models.CharField(max_length=10)),
+                ("path", models.CharField(max_length=255)),
+                ("route", models.CharField(blank=True, max_length=255)),
+                ("status", models.PositiveSmallIntegerField()),
+                ("duration_ms", models.FloatField()),
+                ("query_count", models.PositiveIntegerField()),
+                ("query_ms", models.FloatField()),
+                ("stats", models.BinaryField()),
+                ("summary", models.TextField()),
+                ("queries", models.JSONField(default=list)),
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+import uuid
+
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """A profiled request, recorded by monitoring.profiling."""
+
+    STAFF = "staff"
+    SAMPLED = "sampled"
+    TRIGGER_CHOICES = [(STAFF, "Staff"), (SAMPLED, "Sampled")]
+
+    # handed out in the X-Profile-Id header before the row is written
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    route = models.CharField(max_length=255, blank=True)
+    status = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    query_ms = models.FloatField()
+    # zlib compressed marshal dump, the format of pstats.dump_stats()
+    stats = models.BinaryField()
+    summary = models.TextField()
+    queries = models.JSONField(default=list)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+class SlowQuery(models.Model):
+    """Queries over SLOW_QUERY_THRESHOLD_MS, one row per fingerprint."""
+
+    # sha1 of the fingerprint, which may be longer than an index allows
+    digest = models.CharField(max_length=40, unique=True)
+    fingerprint = models.TextField()
+    alias = models.CharField(max_length=30)
+    calls = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(db_index=True)
+    # EXPLAIN (ANALYZE, BUFFERS) of a sampled execution
+    plan = models.TextField(blank=True)
+    explained_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "slow queries"
+
+    def __str__(self):
+        return self.fingerprint[:100]
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.calls if self.calls else 0
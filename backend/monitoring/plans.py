@@ -0,0 +1,87 @@
+"""
+Query plans reduced to a comparable shape: one "<node> on <table> [using
+<index>]" line per scan, for PostgreSQL (EXPLAIN FORMAT JSON) and SQLite
+(EXPLAIN QUERY PLAN).
+"""
+
+import json
+import re
+
+from django.db import connections, transaction
+
+SEQ_SCAN = "Seq Scan"
+
+_SQLITE_SCAN = re.compile(
+    r"\b(?P<kind>SCAN|SEARCH) (?:TABLE )?(?P<table>\w+)"
+    r"(?: AS \w+)?(?: USING (?:COVERING |INTEGER PRIMARY KEY)?(?:INDEX (?P<index>\w+))?)?"
+)
+
+
+class Scan:
+    def __init__(self, node, table, index=None):
+        self.node = node
+        self.table = table
+        self.index = index
+
+    def __str__(self):
+        text = f"{self.node} on {self.table}"
+        return f"{text} using {self.index}" if self.index else text
+
+
+def explain_json(queryset):
+    """The top node of PostgreSQL's EXPLAIN (FORMAT JSON) for `queryset`."""
+    # QuerySet.explain() flattens the parsed JSON with str(), run it directly
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def explain(queryset):
+    """The scans of the plan the database picks for `queryset`."""
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        return list(_postgres_scans(explain_json(queryset)))
+    if vendor == "sqlite":
+        return list(_sqlite_scans(queryset.explain()))
+    raise NotImplementedError(f"no plan parser for {vendor}")
+
+
+def _postgres_scans(node):
+    if "Relation Name" in node:
+        yield Scan(node["Node Type"], node["Relation Name"], node.get("Index Name"))
+    for child in node.get("Plans", ()):
+        yield from _postgres_scans(child)
+
+
+def _sqlite_scans(text):
+    for line in text.splitlines():
+        match = _SQLITE_SCAN.search(line)
+        if match is None:
+            continue
+        if match["kind"] == "SCAN" and " USING " not in line:
+            yield Scan(SEQ_SCAN, match["table"])
+        else:
+            yield Scan("Index Scan", match["table"], match["index"])
+
+
+def explain_analyze(alias, sql, params):
+    """
+    The plan of a SELECT `sql` as text, PostgreSQL runs it for the actual
+    timings and buffer counts. Rolled back in case it touches anything.
+    """
+    connection = connections[alias]
+    if connection.vendor == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+    else:
+        prefix = "EXPLAIN QUERY PLAN "
+    with transaction.atomic(using=alias):
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+        transaction.set_rollback(True, using=alias)
+    # sqlite rows are (id, parent, notused, detail)
+    return "\n".join(str(row[-1]) for row in rows)
@@ -0,0 +1,164 @@
+"""
+On-demand profiles of single requests.
+
+A request is profiled when
+- a staff user on the admin host adds ?_profile=1,
+- it carries an X-Profile header holding a token signed for a staff user
+  (handed out by the RequestProfile admin, valid PROFILE_TOKEN_MAX_AGE
+  seconds), which also works for the JWT-only client api, or
+- it is picked at random, at PROFILE_SAMPLE_RATE.
+
+cProfile covers the view, serializers and rendering, an execute_wrapper the
+SQL with its timings. The profile id is returned in X-Profile-Id and the
+profile is written in the background by ProfileBuffer; the admin shows the
+summary and the queries and serves the pstats dump for snakeviz & co.
+Requests that aren't profiled cost two dict lookups, plus a random() when
+sampling is on.
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import zlib
+from datetime import timedelta
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import connections
+from django.utils import timezone
+
+from main.helpers.buffers import FlushingBuffer
+from .models import RequestProfile
+
+HEADER = "HTTP_X_PROFILE"
+FLAG = "_profile"
+TOKEN_SALT = "monitoring.profiling"
+SUMMARY_LINES = 60
+
+
+def make_token(user):
+    return signing.dumps(user.pk, salt=TOKEN_SALT)
+
+
+def token_user_id(token):
+    """The id of the staff user `token` was signed for, or None."""
+    try:
+        user_id = signing.loads(
+            token, salt=TOKEN_SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+    staff = get_user_model().objects.filter(pk=user_id, is_active=True, is_staff=True)
+    return user_id if staff.exists() else None
+
+
+def get_trigger(request, sample_rate):
+    """(trigger, staff user id) when `request` should be profiled, else None."""
+    token = request.META.get(HEADER)
+    if token:
+        user_id = token_user_id(token)
+        if user_id is not None:
+            return RequestProfile.STAFF, user_id
+    if FLAG in request.META.get("QUERY_STRING", ""):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_staff and FLAG in request.GET:
+            # the admin changelist would take it for a lookup
+            request.GET = request.GET.copy()
+            del request.GET[FLAG]
+            return RequestProfile.STAFF, user.pk
+    if sample_rate and random.random() < sample_rate:
+        return RequestProfile.SAMPLED, None
+    return None
+
+
+class SQLRecorder:
+    """execute_wrapper keeping the first statements with their timings."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.queries = []
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if len(self.queries) < self.limit:
+                self.queries.append(
+                    {"sql": sql[:2000], "ms": round(duration * 1000, 3)}
+                )
+
+
+def profile(request, get_response, trigger, user_id):
+    queries = SQLRecorder(settings.PROFILE_MAX_QUERIES)
+    wrapped = connections.all()
+    for connection in wrapped:
+        connection.execute_wrappers.append(queries)
+    profiler = cProfile.Profile()
+    start = perf_counter()
+    profiler.enable()
+    try:
+        response = get_response(request)
+    finally:
+        profiler.disable()
+        duration = perf_counter() - start
+        for connection in wrapped:
+            connection.execute_wrappers.remove(queries)
+
+    user = getattr(request, "user", None)
+    if user_id is None and user is not None and user.is_authenticated:
+        user_id = user.pk
+    match = request.resolver_match
+    record = RequestProfile(
+        trigger=trigger,
+        user_id=user_id,
+        method=request.method,
+        path=request.get_full_path()[:255],
+        route=(match.route if match else "")[:255],
+        status=response.status_code,
+        duration_ms=duration * 1000,
+        query_count=queries.count,
+        query_ms=queries.duration * 1000,
+        queries=queries.queries,
+    )
+    buffer.add((record, profiler))
+    response["X-Profile-Id"] = str(record.pk)
+    return response
+
+
+def summarize(profiler):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_LINES)
+    return stream.getvalue()
+
+
+class ProfileBuffer(FlushingBuffer):
+    """
+    Writes profiles off the request, dumping and summarizing the stats here
+    too, and drops the ones older than PROFILE_RETENTION_DAYS.
+    """
+
+    def write(self, items):
+        records = []
+        for record, profiler in items:
+            if not record.stats:
+                profiler.create_stats()
+                record.stats = zlib.compress(marshal.dumps(profiler.stats))
+                record.summary = summarize(profiler)
+            records.append(record)
+        RequestProfile.objects.bulk_create(records)
+        cutoff = timezone.now() - timedelta(days=settings.PROFILE_RETENTION_DAYS)
+        RequestProfile.objects.filter(created__lt=cutoff).delete()
+
+
+buffer = ProfileBuffer(max_size=20, interval=2, max_pending=100)
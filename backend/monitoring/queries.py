@@ -0,0 +1,101 @@
+import re
+from collections import Counter
+from time import perf_counter
+
+# Django hands the driver the SQL with %s placeholders, so two queries that
+# differ only in their parameters already share the same text; IN lists and
+# inlined literals are collapsed on top of that.
+_IN_LIST = re.compile(r"\bIN \((?:%s, )*%s\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """Normalize `sql` so queries differing only in parameter values compare equal."""
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def query_budget(budget):
+    """
+    Declare the maximum number of queries a route may run, e.g.
+    ``path("user/", query_budget(2)(UserViewset.as_view(...)))``.
+    """
+
+    def decorator(view):
+        view.query_budget = budget
+        return view
+
+    return decorator
+
+
+def get_query_budget(resolver_match, method):
+    """
+    Budget declared on the route, falling back to a `query_budget` attribute
+    on the view class, which may map viewset actions to budgets.
+    """
+    if resolver_match is None:
+        return None
+    view = resolver_match.func
+    budget = getattr(view, "query_budget", None)
+    if budget is None:
+        budget = getattr(getattr(view, "cls", None), "query_budget", None)
+    if isinstance(budget, dict):
+        return budget.get(getattr(view, "actions", {}).get(method.lower()))
+    return budget
+
+
+class QueryCounter:
+    """execute_wrapper that counts queries and the time spent running them."""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += perf_counter() - start
+
+
+class QueryRecorder:
+    """execute_wrapper keeping every statement, to spot N+1 patterns."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        # savepoints stand in for BEGIN/COMMIT inside a TestCase's transaction
+        if not sql.startswith(_SAVEPOINT_STATEMENTS):
+            self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def repeated(self, threshold):
+        """Fingerprints executed at least `threshold` times, with their counts."""
+        counts = Counter(fingerprint(sql) for sql in self.queries)
+        return {sql: count for sql, count in counts.items() if count >= threshold}
+
+    def problems(self, budget, threshold):
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"{self.count} queries, budget is {budget}")
+        for sql, count in self.repeated(threshold).items():
+            problems.append(f"{count} queries differing only in parameters: {sql}")
+        return problems
@@ -0,0 +1,179 @@
+"""
+Slow-query log.
+
+SlowQueryLogger is installed as an execute_wrapper on every connection when
+it connects (see MonitoringConfig.ready), so it covers requests, commands
+and background threads alike. Queries taking SLOW_QUERY_THRESHOLD_MS or more
+are fingerprinted (monitoring.queries.fingerprint) and handed to
+SlowQueryBuffer, which aggregates them per fingerprint into SlowQuery rows.
+A SLOW_QUERY_EXPLAIN_RATE share of slow SELECTs keeps its parameters, and
+the flusher thread runs EXPLAIN (ANALYZE, BUFFERS) for them, at most once
+per fingerprint every SLOW_QUERY_EXPLAIN_INTERVAL seconds. Fast queries cost
+two perf_counter() calls.
+"""
+
+import hashlib
+import logging
+import random
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from main.helpers.buffers import FlushingBuffer
+from .models import SlowQuery
+from .plans import explain_analyze
+from .queries import fingerprint
+
+logger = logging.getLogger(__name__)
+
+EXPLAINED_FINGERPRINTS = 1000
+
+# set while SlowQueryBuffer writes, its own UPDATEs and INSERTs aren't logged
+writing = threading.local()
+
+
+def digest(fingerprint):
+    return hashlib.sha1(fingerprint.encode()).hexdigest()
+
+
+def explainable(sql):
+    # ANALYZE runs the statement, only plain reads are worth that
+    return sql.lstrip()[:6].upper() == "SELECT" and " FOR UPDATE" not in sql
+
+
+class SlowQueryLogger:
+    """execute_wrapper handing queries over the threshold to the buffer."""
+
+    def __init__(self, threshold_ms, explain_rate, explain_interval):
+        self.threshold = threshold_ms / 1000
+        self.explain_rate = explain_rate
+        self.explain_interval = explain_interval
+        # fingerprint -> monotonic() of its last sampled plan, in this process
+        self.explained = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            if (
+                duration >= self.threshold
+                and not sql.startswith("EXPLAIN")
+                and not getattr(writing, "active", False)
+            ):
+                self.record(context["connection"].alias, sql, params, many, duration)
+
+    def record(self, alias, sql, params, many, duration):
+        normalized = fingerprint(sql)
+        key = digest(normalized)
+        sample = None
+        if (
+            not many
+            and random.random() < self.explain_rate
+            and explainable(sql)
+            and self.should_explain(key)
+        ):
+            sample = tuple(params or ())
+        buffer.add((key, normalized, alias, duration * 1000, sample, sql))
+
+    def should_explain(self, key):
+        now = monotonic()
+        with self.lock:
+            last = self.explained.get(key)
+            if last is not None and now - last < self.explain_interval:
+                return False
+            self.explained[key] = now
+            self.explained.move_to_end(key)
+            if len(self.explained) > EXPLAINED_FINGERPRINTS:
+                self.explained.popitem(last=False)
+        return True
+
+
+def install(connection, **kwargs):
+    """connection_created receiver, also called again on reconnects."""
+    if not any(isinstance(w, SlowQueryLogger) for w in connection.execute_wrappers):
+        connection.execute_wrappers.append(wrapper)
+
+
+class SlowQueryBuffer(FlushingBuffer):
+    def write(self, items):
+        writing.active = True
+        try:
+            self.write_aggregated(items)
+        finally:
+            writing.active = False
+
+    def write_aggregated(self, items):
+        now = timezone.now()
+        aggregated = {}
+        for key, normalized, alias, duration, sample, sql in items:
+            entry = aggregated.setdefault(
+                key,
+                {"fingerprint": normalized, "alias": alias, "calls": 0, "total": 0},
+            )
+            entry["calls"] += 1
+            entry["total"] += duration
+            entry["max"] = max(entry.get("max", 0), duration)
+            if sample is not None:
+                entry["sample"] = sql, sample
+
+        for key, entry in aggregated.items():
+            self.upsert(key, entry, now)
+        for key, entry in aggregated.items():
+            if "sample" in entry:
+                self.explain(key, entry["alias"], *entry["sample"], now)
+
+    @staticmethod
+    def upsert(key, entry, now):
+        changes = {
+            "calls": F("calls") + entry["calls"],
+            "total_ms": F("total_ms") + entry["total"],
+            "max_ms": Greatest("max_ms", entry["max"]),
+            "last_seen": now,
+        }
+        if SlowQuery.objects.filter(digest=key).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                SlowQuery.objects.create(
+                    digest=key,
+                    fingerprint=entry["fingerprint"],
+                    alias=entry["alias"],
+                    calls=entry["calls"],
+                    total_ms=entry["total"],
+                    max_ms=entry["max"],
+                    last_seen=now,
+                )
+        except IntegrityError:
+            # another worker created it in the meantime
+            SlowQuery.objects.filter(digest=key).update(**changes)
+
+    @staticmethod
+    def explain(key, alias, sql, params, now):
+        # other workers may have sampled the same fingerprint
+        recent = now - timedelta(seconds=settings.SLOW_QUERY_EXPLAIN_INTERVAL)
+        if SlowQuery.objects.filter(digest=key, explained_at__gte=recent).exists():
+            return
+        try:
+            plan = explain_analyze(alias, sql, params)
+        except DatabaseError:
+            logger.exception("EXPLAIN of slow query %s failed", key)
+            return
+        SlowQuery.objects.filter(digest=key).update(plan=plan, explained_at=now)
+
+
+buffer = SlowQueryBuffer(max_size=100, interval=5, max_pending=1000)
+wrapper = SlowQueryLogger(
+    settings.SLOW_QUERY_THRESHOLD_MS,
+    settings.SLOW_QUERY_EXPLAIN_RATE,
+    settings.SLOW_QUERY_EXPLAIN_INTERVAL,
+)
@@ -0,0 +1,34 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .queries import QueryRecorder, get_query_budget
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin checking requests against the query budget declared on
+    their route, and failing on statements repeated with different
+    parameters (N+1)::
+
+        response = self.assertQueryBudget("get", "/user/", HTTP_HOST=...)
+    """
+
+    query_repeat_threshold = None
+
+    def assertQueryBudget(self, method, path, *args, **kwargs):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = getattr(self.client, method.lower())(path, *args, **kwargs)
+
+        # response.resolver_match re-resolves against ROOT_URLCONF, which
+        # doesn't know about django_hosts, so use the handled request's match
+        budget = get_query_budget(response.wsgi_request.resolver_match, method)
+        threshold = self.query_repeat_threshold or settings.QUERY_REPEAT_THRESHOLD
+        problems = recorder.problems(budget, threshold)
+        if problems:
+            self.fail(f"{method.upper()} {path}: " + "; ".join(problems))
+        return response
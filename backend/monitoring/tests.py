@@ -0,0 +1,84 @@
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from . import slow_queries
+from .models import SlowQuery
+
+
+@skipUnless(
+    connection.vendor == "postgresql",
+    "the plan snapshot and the partial indexes are PostgreSQL's",
+)
+class QueryPlanTest(TestCase):
+    def test_key_queries_keep_their_plans(self):
+        # enough rows for the planner to prefer the indexes, as with 100k
+        try:
+            call_command("check_query_plans", seed=20_000, stdout=StringIO())
+        except CommandError as error:
+            self.fail(error)
+
+
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        self.buffer = slow_queries.SlowQueryBuffer()
+        patcher = mock.patch.object(slow_queries, "buffer", self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.logger = slow_queries.SlowQueryLogger(
+            threshold_ms=0, explain_rate=1, explain_interval=60
+        )
+
+    def test_aggregates_by_fingerprint(self):
+        sql = "SELECT id FROM users_user WHERE id = 1"
+        self.logger.record("default", sql, None, False, 0.3)
+        self.logger.record("default", sql.replace("1", "2"), None, False, 0.5)
+        self.logger.record("default", "SELECT 1", None, False, 0.1)
+        with mock.patch.object(slow_queries, "explain_analyze", return_value=""):
+            self.buffer.flush()
+            self.logger.record("default", sql, None, False, 0.2)
+            self.buffer.flush()
+        self.assertQuerysetEqual(
+            SlowQuery.objects.order_by("fingerprint").values_list(
+                "fingerprint", "calls", "total_ms", "max_ms"
+            ),
+            [
+                ("SELECT ?", 1, 100, 100),
+                ("SELECT id FROM users_user WHERE id = ?", 3, 1000, 500),
+            ],
+            transform=tuple,
+        )
+
+    def test_explains_once_per_interval(self):
+        sql = "SELECT id FROM users_user WHERE id = %s"
+        with mock.patch.object(slow_queries, "monotonic", side_effect=[0, 30, 61]):
+            for pk in range(3):
+                self.logger.record("default", sql, [pk], False, 0.3)
+        self.assertEqual([item[4] for item in self.buffer.items], [(0,), None, (2,)])
+
+    def test_explains_once_per_interval_across_workers(self):
+        sql = "SELECT id FROM users_user WHERE id = %s"
+        key = slow_queries.digest(slow_queries.fingerprint(sql))
+        SlowQuery.objects.create(
+            digest=key,
+            fingerprint=sql,
+            alias="default",
+            last_seen=timezone.now(),
+            plan="Seq Scan",
+            explained_at=timezone.now(),
+        )
+        self.logger.record("default", sql, [1], False, 0.3)
+        with mock.patch.object(slow_queries, "explain_analyze") as explain:
+            self.buffer.flush()
+        explain.assert_not_called()
+        self.assertEqual(SlowQuery.objects.get().plan, "Seq Scan")
+
+    def test_skips_its_own_writes(self):
+        with connection.execute_wrapper(self.logger):
+            self.buffer.write([("key", "SELECT ?", "default", 300, None, "SELECT 1")])
+        self.assertEqual(self.buffer.items, [])
+        self.assertEqual(SlowQuery.objects.get().calls, 1)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from .metrics import get_registry
+
+
+def metrics(request):
+    """Prometheus scrape endpoint, open to staff or the METRICS_TOKEN bearer."""
+    user = getattr(request, "user", None)
+    token = settings.METRICS_TOKEN
+    authorized = bool(token) and constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    )
+    if not authorized and not (user and user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
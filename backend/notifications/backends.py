@@ -0,0 +1,109 @@
+"""
+Transports carrying notifications from the process publishing them (a
+gunicorn worker handling a request) to the processes holding websockets.
+
+publish() is called from synchronous Django code, listen() runs in the event
+loop of an ASGI process and hands every message to `deliver(channel, text)`.
+"""
+
+import asyncio
+import logging
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 1
+# NOTIFY payloads are limited to 8000 bytes
+MAX_PAYLOAD = 7999
+
+
+class BaseBackend:
+    def publish(self, channel, text):
+        raise NotImplementedError
+
+    async def listen(self, deliver):
+        raise NotImplementedError
+
+
+class LocalBackend(BaseBackend):
+    """
+    Stand-in delivering within the process, for runserver, tests and an
+    ASGI server handling both the requests and the websockets.
+    """
+
+    def __init__(self):
+        self.listeners = []
+
+    def publish(self, channel, text):
+        # publishers run in other threads than the event loops
+        for loop, deliver in list(self.listeners):
+            loop.call_soon_threadsafe(deliver, channel, text)
+
+    async def listen(self, deliver):
+        listener = asyncio.get_running_loop(), deliver
+        self.listeners.append(listener)
+        try:
+            await asyncio.Future()  # until cancelled
+        finally:
+            self.listeners.remove(listener)
+
+
+class PostgresBackend(BaseBackend):
+    """
+    LISTEN/NOTIFY on a PostgreSQL channel. Notifications sent inside a
+    transaction are only delivered once it commits. Messages published while
+    a listener reconnects are lost, clients resync on their next request.
+    """
+
+    def __init__(self, alias="default", pg_channel="notifications"):
+        self.alias = alias
+        self.pg_channel = pg_channel
+
+    def publish(self, channel, text):
+        payload = f"{channel} {text}"
+        if len(payload.encode()) > MAX_PAYLOAD:
+            raise ValueError(f"Notification for {channel} exceeds {MAX_PAYLOAD} bytes")
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.pg_channel, payload])
+
+    async def listen(self, deliver):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                connection = await loop.run_in_executor(None, self.connect)
+            except Exception:
+                logger.exception("Connecting the %s listener failed", self.pg_channel)
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+            readable = asyncio.Event()
+            loop.add_reader(connection.fileno(), readable.set)
+            try:
+                while True:
+                    await readable.wait()
+                    readable.clear()
+                    connection.poll()
+                    while connection.notifies:
+                        channel, _, text = connection.notifies.pop(0).payload.partition(
+                            " "
+                        )
+                        deliver(channel, text)
+            except Exception:
+                logger.exception("Lost the %s listener", self.pg_channel)
+            finally:
+                loop.remove_reader(connection.fileno())
+                connection.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def connect(self):
+        # a connection of its own, Django's are per thread and transactional
+        import psycopg2
+        from psycopg2 import sql
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        wrapper = connections[self.alias]
+        connection = psycopg2.connect(**wrapper.get_connection_params())
+        connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with connection.cursor() as cursor:
+            cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.pg_channel)))
+        return connection
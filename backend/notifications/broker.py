@@ -0,0 +1,123 @@
+"""
+Real-time notifications to the websockets of a user.
+
+notify() publishes an event to the "user:<id>" channel through the backend
+named by NOTIFICATIONS_BACKEND once the current transaction commits. Every
+ASGI process runs one Broker, listening to the backend from its event loop
+and fanning messages out to the Subscriptions of its own connections. The
+message is serialized once, whatever the number of receivers.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+class Subscription:
+    """Messages waiting for one connection, overflowing past `size` of them."""
+
+    __slots__ = ("messages", "ready", "size", "overflowed")
+
+    def __init__(self, size):
+        self.messages = deque()
+        self.ready = asyncio.Event()
+        self.size = size
+        self.overflowed = False
+
+    def push(self, text):
+        if len(self.messages) >= self.size:
+            # a client this far behind resyncs on its next request
+            self.overflowed = True
+            self.messages.clear()
+        else:
+            self.messages.append(text)
+        self.ready.set()
+
+    async def get(self):
+        """The pending messages, waiting for some; None once overflowed."""
+        await self.ready.wait()
+        self.ready.clear()
+        if self.overflowed:
+            return None
+        messages = list(self.messages)
+        self.messages.clear()
+        return messages
+
+
+class Broker:
+    def __init__(self, backend, queue_size=100):
+        self.backend = backend
+        self.queue_size = queue_size
+        # channel -> subscriptions of this process
+        self.subscriptions = {}
+        self.listener = None
+
+    def __len__(self):
+        return sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+
+    def start(self):
+        # with the first connection, in the loop of the ASGI server
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.get_running_loop().create_task(
+                self.backend.listen(self.deliver)
+            )
+            self.listener.add_done_callback(self._stopped)
+
+    @staticmethod
+    def _stopped(task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Notification listener failed", exc_info=task.exception())
+
+    def subscribe(self, channel):
+        self.start()
+        subscription = Subscription(self.queue_size)
+        self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, channel, subscription):
+        subscriptions = self.subscriptions.get(channel)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[channel]
+
+    def deliver(self, channel, text):
+        for subscription in self.subscriptions.get(channel, ()):
+            subscription.push(text)
+
+
+def notify(user_id, event, **data):
+    """Send `event` with `data` to the connected clients of the user."""
+    text = json.dumps(
+        {"event": event, "data": data, "created": timezone.now()},
+        cls=DjangoJSONEncoder,
+    )
+    channel = user_channel(user_id)
+
+    def publish():
+        try:
+            broker.backend.publish(channel, text)
+        except Exception:
+            # best effort, the request already succeeded
+            logger.exception("Publishing %s to %s failed", event, channel)
+
+    transaction.on_commit(publish)
+
+
+broker = Broker(
+    import_string(settings.NOTIFICATIONS_BACKEND)(),
+    queue_size=settings.NOTIFICATIONS_QUEUE_SIZE,
+)
@@ -0,0 +1,101 @@
+import asyncio
+import time
+import tracemalloc
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from notifications.backends import LocalBackend
+from notifications.broker import Broker, user_channel
+from notifications import websocket
+
+
+class Connection:
+    """In-memory ASGI websocket counting what the server sends."""
+
+    def __init__(self, bench):
+        self.bench = bench
+        self.incoming = asyncio.Queue()
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send(self, message):
+        self.bench.sent += 1
+        if self.bench.sent >= self.bench.expected:
+            self.bench.done.set()
+
+
+class Command(BaseCommand):
+    help = (
+        "Open the given numbers of notification sockets in one process, "
+        "without the network and the handshake, and measure the memory per "
+        "connection and how long a message to every user takes to go out, "
+        "through LocalBackend as a publisher thread would send it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--connections", type=int, nargs="+", default=[1000, 10_000, 50_000]
+        )
+        parser.add_argument("--rounds", type=int, default=3)
+
+    def handle(self, *args, **options):
+        for count in options["connections"]:
+            asyncio.run(self.bench(count, options["rounds"]))
+
+    async def bench(self, count, rounds):
+        broker = Broker(LocalBackend(), queue_size=100)
+        websocket.broker, previous = broker, websocket.broker
+        self.sent, self.expected, self.done = 0, 0, asyncio.Event()
+        expires = time.time() + 3600
+        try:
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            start = perf_counter()
+            connections = [Connection(self) for _ in range(count)]
+            tasks = [
+                asyncio.ensure_future(
+                    websocket.serve(
+                        connection.receive, connection.send, user_channel(i), expires
+                    )
+                )
+                for i, connection in enumerate(connections)
+            ]
+            # the sockets subscribe, then the listener they started registers
+            while len(broker) < count or not broker.backend.listeners:
+                await asyncio.sleep(0)
+            connect = perf_counter() - start
+            memory = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+
+            timings = []
+            loop = asyncio.get_running_loop()
+            for _ in range(rounds):
+                self.sent, self.expected = 0, count
+                self.done.clear()
+                start = perf_counter()
+                # published from a thread, like a request handler would
+                await loop.run_in_executor(None, self.publish, broker, count)
+                await self.done.wait()
+                timings.append(perf_counter() - start)
+
+            self.stdout.write(
+                f"{count:>7} connections  open {connect / count * 1e6:6.1f} us each  "
+                f"{memory / count / 1024:5.1f} KiB each  "
+                f"message to every user {min(timings) * 1000:8.1f} ms "
+                f"({min(timings) / count * 1e6:.1f} us per message)"
+            )
+
+            for connection in connections:
+                connection.incoming.put_nowait({"type": "websocket.disconnect"})
+            await asyncio.gather(*tasks)
+            broker.listener.cancel()
+        finally:
+            websocket.broker = previous
+
+    @staticmethod
+    def publish(broker, count):
+        text = '{"event": "bench", "data": {}}'
+        for i in range(count):
+            broker.backend.publish(user_channel(i), text)
@@ -0,0 +1,88 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from fcm_django.models import FCMDevice
+
+from notifications.models import InactiveDevice
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the FCM devices inactive for longer than "
+        "FCM_INACTIVE_RETENTION_DAYS, a short transaction per chunk, and "
+        "report the tokens reclaimed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.FCM_INACTIVE_RETENTION_DAYS
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=settings.FCM_PRUNE_CHUNK_SIZE
+        )
+        # between chunks, for replicas and concurrent writers to catch up
+        parser.add_argument("--pause", type=float, default=settings.FCM_PRUNE_PAUSE)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        chunk_size = options["chunk_size"]
+        tracked = self.track(now, chunk_size)
+        forgotten = self.forget(chunk_size)
+
+        cutoff = now - timedelta(days=options["days"])
+        expired = InactiveDevice.objects.filter(
+            deactivated_at__lte=cutoff, device__active=False
+        )
+        deleted = 0
+        while True:
+            ids = list(expired.values_list("device_id", flat=True)[:chunk_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                _, counts = FCMDevice.objects.filter(id__in=ids, active=False).delete()
+            deleted += counts.get(FCMDevice._meta.label, 0)
+            time.sleep(options["pause"])
+
+        self.stdout.write(
+            f"Started the retention of {tracked} untracked inactive devices."
+        )
+        self.stdout.write(f"Stopped the retention of {forgotten} reactivated devices.")
+        self.stdout.write(
+            f"Reclaimed {deleted} device tokens inactive since before "
+            f"{cutoff:%Y-%m-%d}."
+        )
+
+    @staticmethod
+    def track(now, chunk_size):
+        """
+        Record inactive devices deactivated outside of notifications.push,
+        e.g. by FCMDevice.send_message, as deactivated now.
+        """
+        untracked = FCMDevice.objects.filter(active=False).exclude(
+            id__in=InactiveDevice.objects.values("device_id")
+        )
+        tracked = 0
+        while True:
+            ids = list(untracked.values_list("id", flat=True)[:chunk_size])
+            if not ids:
+                return tracked
+            InactiveDevice.objects.bulk_create(
+                [InactiveDevice(device_id=id, deactivated_at=now) for id in ids],
+                ignore_conflicts=True,
+            )
+            tracked += len(ids)
+
+    @staticmethod
+    def forget(chunk_size):
+        """Stop tracking the devices reactivated, by hand or by the admin."""
+        reactivated = InactiveDevice.objects.filter(device__active=True)
+        forgotten = 0
+        while True:
+            ids = list(reactivated.values_list("device_id", flat=True)[:chunk_size])
+            if not ids:
+                return forgotten
+            forgotten += reactivated.filter(device_id__in=ids).delete()[0]
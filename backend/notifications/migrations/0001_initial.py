@@ -0,0 +1,60 @@
+# Generated by Django 3.2.10 on 2026-10-19 17:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# fcm_django's table has neither, notifications.push deactivates by token and
+# prune_fcm_devices looks for inactive devices. Built concurrently on
+# PostgreSQL, devices are written on every login, which is why the migration
+# isn't atomic.
+FCM_DEVICE_INDEXES = {
+    "fcm_django_fcmdevice_registration_id_idx": "(registration_id)",
+    "fcm_django_fcmdevice_inactive_idx": "(id) WHERE NOT active",
+}
+
+
+def concurrently(schema_editor):
+    return "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+
+
+def create_fcm_device_indexes(apps, schema_editor):
+    for name, definition in FCM_DEVICE_INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX {concurrently(schema_editor)}IF NOT EXISTS {name} "
+            f"ON fcm_django_fcmdevice {definition}"
+        )
+
+
+def drop_fcm_device_indexes(apps, schema_editor):
+    for name in FCM_DEVICE_INDEXES:
+        schema_editor.execute(
+            f"DROP INDEX {concurrently(schema_editor)}IF EXISTS {name}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+    atomic = False
+
+    dependencies = [("fcm_django", "0008_auto_20211224_1205")]
+
+    operations = [
+        migrations.CreateModel(
+            name="InactiveDevice",
+            fields=[
+                (
+                    "device",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="fcm_django.fcmdevice",
+                    ),
+                ),
+                ("deactivated_at", models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.RunPython(create_fcm_device_indexes, drop_fcm_device_indexes),
+    ]
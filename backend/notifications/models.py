@@ -0,0 +1,18 @@
+from django.db import models
+from fcm_django.models import FCMDevice
+
+
+class InactiveDevice(models.Model):
+    """
+    When a device stopped receiving pushes, FCMDevice doesn't record it.
+    prune_fcm_devices deletes the devices inactive for longer than
+    FCM_INACTIVE_RETENTION_DAYS.
+    """
+
+    device = models.OneToOneField(
+        FCMDevice, primary_key=True, related_name="+", on_delete=models.CASCADE
+    )
+    deactivated_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.device_id} since {self.deactivated_at:%Y-%m-%d}"
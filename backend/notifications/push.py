@@ -0,0 +1,113 @@
+"""
+Push notifications through FCM.
+
+send() works like FCMDeviceQuerySet.send_message, except for the tokens FCM
+rejects as unregistered or invalid: instead of an UPDATE per send, they are
+handed to `invalid_tokens`, which deactivates their devices in batches and
+records when (see InactiveDevice). DELETE_INACTIVE_DEVICES stays off, the
+devices are deleted later and in small chunks by prune_fcm_devices.
+"""
+
+import logging
+from copy import copy
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from fcm_django.models import MAX_MESSAGES_PER_BATCH, FCMDevice
+from firebase_admin import messaging
+from firebase_admin.exceptions import InvalidArgumentError
+
+from main.helpers.buffers import FlushingBuffer
+from monitoring.metrics import PUSH_INVALID_TOKENS
+from .models import InactiveDevice
+
+logger = logging.getLogger(__name__)
+
+# tokens per UPDATE, registration_id IN (...) lists stay short
+CHUNK_SIZE = 500
+
+
+def is_dead_token(exception):
+    """
+    Whether FCM rejected the token itself. Unlike fcm_django, not on any
+    InvalidArgumentError, a malformed message would deactivate every device.
+    """
+    if isinstance(
+        exception, (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+    ):
+        return True
+    return isinstance(exception, InvalidArgumentError) and (
+        "registration token" in str(exception)
+    )
+
+
+def send(devices, message, **kwargs):
+    """
+    Send `message` to the active devices of the `devices` queryset, kwargs
+    go to messaging.send_all. Returns the messaging.BatchResponse.
+    """
+    tokens = list(devices.filter(active=True).values_list("registration_id", flat=True))
+    responses = []
+    for i in range(0, len(tokens), MAX_MESSAGES_PER_BATCH):
+        messages = []
+        for token in tokens[i : i + MAX_MESSAGES_PER_BATCH]:
+            # the caller's message keeps its own token
+            addressed = copy(message)
+            addressed.token = token
+            messages.append(addressed)
+        responses.extend(messaging.send_all(messages, **kwargs).responses)
+
+    for token, response in zip(tokens, responses):
+        if is_dead_token(response.exception):
+            invalid_tokens.add(token)
+            PUSH_INVALID_TOKENS.inc()
+    return messaging.BatchResponse(responses)
+
+
+def send_to_user(user_id, message, **kwargs):
+    return send(FCMDevice.objects.filter(user_id=user_id), message, **kwargs)
+
+
+def send_to_user_on_commit(user_id, message, **kwargs):
+    """send_to_user() once the transaction commits, failures are only logged."""
+
+    def push():
+        try:
+            send_to_user(user_id, message, **kwargs)
+        except Exception:
+            # best effort, the request already succeeded
+            logger.exception("Pushing to the devices of user %s failed", user_id)
+
+    transaction.on_commit(push)
+
+
+class InvalidTokenBuffer(FlushingBuffer):
+    def write(self, tokens):
+        now = timezone.now()
+        # the same token is often rejected for several messages
+        tokens = list(dict.fromkeys(tokens))
+        for i in range(0, len(tokens), CHUNK_SIZE):
+            self.deactivate(tokens[i : i + CHUNK_SIZE], now)
+
+    @staticmethod
+    def deactivate(tokens, now):
+        with transaction.atomic():
+            ids = list(
+                FCMDevice.objects.filter(
+                    registration_id__in=tokens, active=True
+                ).values_list("id", flat=True)
+            )
+            if not ids:
+                return
+            FCMDevice.objects.filter(id__in=ids).update(active=False)
+            InactiveDevice.objects.bulk_create(
+                [InactiveDevice(device_id=id, deactivated_at=now) for id in ids],
+                ignore_conflicts=True,
+            )
+
+
+invalid_tokens = InvalidTokenBuffer(
+    max_size=settings.FCM_INVALID_TOKEN_BUFFER_SIZE,
+    interval=settings.FCM_INVALID_TOKEN_FLUSH_INTERVAL,
+)
@@ -0,0 +1,155 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from fcm_django.models import FCMDevice
+from firebase_admin import messaging
+from firebase_admin.exceptions import InvalidArgumentError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import User
+from . import push, websocket
+from .models import InactiveDevice
+
+
+class WebsocketAuthenticationTest(TransactionTestCase):
+    def connect(self, token):
+        received = [{"type": "websocket.connect"}]
+        sent = []
+
+        async def receive():
+            return received.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "websocket",
+            "path": settings.NOTIFICATIONS_PATH,
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+        }
+        async_to_sync(websocket.application)(scope, receive, send)
+        return sent
+
+    def test_invalid_token(self):
+        sent = self.connect("not-a-token")
+        self.assertEqual(
+            sent, [{"type": "websocket.close", "code": websocket.CLOSE_UNAUTHORIZED}]
+        )
+
+    def test_database_error_closes_the_socket(self):
+        user = User.objects.create_user(phone_number="+15550007000")
+        token = RefreshToken.for_user(user).access_token
+        with mock.patch.object(
+            websocket.authentication,
+            "get_user",
+            side_effect=OperationalError("server closed the connection"),
+        ):
+            sent = self.connect(token)
+        self.assertEqual(
+            sent, [{"type": "websocket.close", "code": websocket.CLOSE_SERVER_ERROR}]
+        )
+
+
+class PushTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone_number="+15550007001")
+        for token in ("alive", "unregistered", "malformed-message", "inactive"):
+            FCMDevice.objects.create(
+                user=cls.user,
+                registration_id=token,
+                type="android",
+                active=token != "inactive",
+            )
+
+    def setUp(self):
+        self.invalid_tokens = push.InvalidTokenBuffer()
+        patcher = mock.patch.object(push, "invalid_tokens", self.invalid_tokens)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def send_all(messages, **kwargs):
+        exceptions = {
+            "unregistered": messaging.UnregisteredError("Requested entity not found"),
+            "malformed-message": InvalidArgumentError("Invalid JSON payload"),
+        }
+        return messaging.BatchResponse(
+            [
+                messaging.SendResponse(
+                    {"name": message.token}, exceptions.get(message.token)
+                )
+                for message in messages
+            ]
+        )
+
+    def test_deactivates_rejected_tokens(self):
+        message = messaging.Message(data={"event": "test"})
+        with mock.patch.object(
+            messaging, "send_all", side_effect=self.send_all
+        ) as send:
+            response = push.send_to_user(self.user.pk, message)
+        sent = send.call_args.args[0]
+        self.assertCountEqual(
+            [message.token for message in sent],
+            ["alive", "unregistered", "malformed-message"],
+        )
+        self.assertIsNone(message.token)
+        self.assertEqual(response.failure_count, 2)
+
+        # in a batch, not on the request path
+        self.assertEqual(self.invalid_tokens.items, ["unregistered"])
+        self.invalid_tokens.flush()
+        self.assertQuerysetEqual(
+            FCMDevice.objects.filter(active=False).order_by("registration_id"),
+            ["inactive", "unregistered"],
+            transform=lambda device: device.registration_id,
+        )
+        self.assertEqual(
+            InactiveDevice.objects.get().device.registration_id, "unregistered"
+        )
+
+    def test_prune(self):
+        now = timezone.now()
+        devices = {device.registration_id: device for device in FCMDevice.objects.all()}
+        InactiveDevice.objects.bulk_create(
+            [
+                InactiveDevice(
+                    device=devices["unregistered"],
+                    deactivated_at=now - timedelta(days=31),
+                ),
+                # reactivated since
+                InactiveDevice(
+                    device=devices["alive"], deactivated_at=now - timedelta(days=31)
+                ),
+            ]
+        )
+        FCMDevice.objects.filter(registration_id="unregistered").update(active=False)
+
+        stdout = StringIO()
+        call_command("prune_fcm_devices", days=30, chunk_size=1, pause=0, stdout=stdout)
+        self.assertQuerysetEqual(
+            FCMDevice.objects.order_by("registration_id"),
+            ["alive", "inactive", "malformed-message"],
+            transform=lambda device: device.registration_id,
+        )
+        # untracked until now, its retention starts
+        self.assertEqual(
+            InactiveDevice.objects.get().device.registration_id, "inactive"
+        )
+        self.assertEqual(
+            stdout.getvalue().splitlines(),
+            [
+                "Started the retention of 1 untracked inactive devices.",
+                "Stopped the retention of 1 reactivated devices.",
+                f"Reclaimed 1 device tokens inactive since before "
+                f"{now - timedelta(days=30):%Y-%m-%d}.",
+            ],
+        )
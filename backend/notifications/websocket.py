@@ -0,0 +1,123 @@
+"""
+The notification websocket, an ASGI application mounted by main.asgi.
+
+Clients authenticate with the access token they use for the API, in an
+Authorization header or, for browsers which can't set one, as the
+subprotocols "bearer", "<token>". The socket only pushes the events of the
+user (see notifications.broker.notify), anything the client sends is
+ignored. It is closed when the token expires, clients reconnect with a
+fresh one and refresh their state with GET /user/.
+"""
+
+import asyncio
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from main.custom.authentication import CachedJWTAuthentication
+from .broker import broker, user_channel
+
+logger = logging.getLogger(__name__)
+
+BEARER = "bearer"
+
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_TOKEN_EXPIRED = 4403
+CLOSE_NOT_FOUND = 4404
+# the client fell NOTIFICATIONS_QUEUE_SIZE messages behind
+CLOSE_OVERFLOW = 4408
+CLOSE_SERVER_ERROR = 1011
+
+authentication = CachedJWTAuthentication()
+
+
+def get_raw_token(scope):
+    """(token, subprotocol to accept) of the handshake, or Nones."""
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            token = authentication.get_raw_token(value)
+            return (token.decode() if token else None), None
+    subprotocols = scope.get("subprotocols") or []
+    if len(subprotocols) == 2 and subprotocols[0] == BEARER:
+        return subprotocols[1], BEARER
+    return None, None
+
+
+@sync_to_async
+def authenticate(raw_token):
+    """(user id, expiry timestamp) of an access token."""
+    # no request_started/finished here to retire broken or aged connections,
+    # as in channels' database_sync_to_async
+    close_old_connections()
+    try:
+        token = authentication.get_validated_token(raw_token)
+        user = authentication.get_user(token)
+    finally:
+        close_old_connections()
+    return user.pk, token["exp"]
+
+
+async def application(scope, receive, send):
+    if (await receive())["type"] != "websocket.connect":
+        return
+    if scope["path"] != settings.NOTIFICATIONS_PATH:
+        await send({"type": "websocket.close", "code": CLOSE_NOT_FOUND})
+        return
+    raw_token, subprotocol = get_raw_token(scope)
+    try:
+        if raw_token is None:
+            raise InvalidToken("No token")
+        user_id, expires = await authenticate(raw_token)
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        await send({"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+        return
+    except DatabaseError:
+        logger.warning("Authenticating a websocket failed", exc_info=True)
+        await send({"type": "websocket.close", "code": CLOSE_SERVER_ERROR})
+        return
+
+    await send({"type": "websocket.accept", "subprotocol": subprotocol})
+    await serve(receive, send, user_channel(user_id), expires)
+
+
+async def serve(receive, send, channel, expires):
+    subscription = broker.subscribe(channel)
+    reader = asyncio.ensure_future(read(receive))
+    writer = asyncio.ensure_future(write(send, subscription))
+    try:
+        done, _ = await asyncio.wait(
+            [reader, writer],
+            timeout=max(0, expires - time.time()),
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if reader in done or (writer in done and writer.exception()):
+            return  # disconnected
+        if writer in done:
+            code = CLOSE_OVERFLOW
+        else:
+            code = CLOSE_TOKEN_EXPIRED
+        await send({"type": "websocket.close", "code": code})
+    finally:
+        broker.unsubscribe(channel, subscription)
+        reader.cancel()
+        writer.cancel()
+
+
+async def read(receive):
+    while (await receive())["type"] != "websocket.disconnect":
+        pass
+
+
+async def write(send, subscription):
+    """Send messages until the subscription overflows."""
+    while True:
+        messages = await subscription.get()
+        if messages is None:
+            return
+        for text in messages:
+            await send({"type": "websocket.send", "text": text})
@@ -0,0 +1,138 @@
+"""
+Last-seen and last-login tracking without a write per request.
+
+touch() remembers when this process last queued a user and queues them
+again only once that is ACTIVITY_RESOLUTION seconds old, on a new day, or
+on login. The queue is flushed by a background thread (see
+main.helpers.buffers): entries of the same user are coalesced and written
+as one UPDATE ... FROM (VALUES ...) per chunk, and the days users were seen
+on go to DailyActivity for the dashboard's daily active user counts. The
+UPDATE sends no post_save, so the flush invalidates the cached users itself.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from main.custom.cache import cache
+from main.helpers.buffers import FlushingBuffer
+from .models import DailyActivity, User
+
+CHUNK_SIZE = 1000
+
+
+class ActivityTracker(FlushingBuffer):
+    def __init__(self, resolution, tracked_users, **kwargs):
+        super().__init__(**kwargs)
+        self.resolution = timedelta(seconds=resolution)
+        self.tracked_users = tracked_users
+        # user id -> when this process last queued them, least recent first
+        self.queued = OrderedDict()
+        self.queued_lock = threading.Lock()
+
+    def touch(self, user_id, login=False):
+        now = timezone.now()
+        with self.queued_lock:
+            last = self.queued.get(user_id)
+            if (
+                not login
+                and last is not None
+                and now - last < self.resolution
+                and timezone.localdate(last) == timezone.localdate(now)
+            ):
+                return
+            self.queued[user_id] = now
+            self.queued.move_to_end(user_id)
+            while len(self.queued) > self.tracked_users:
+                self.queued.popitem(last=False)
+        self.add((user_id, now, login))
+
+    def write(self, items):
+        seen, logins, days = {}, {}, set()
+        for user_id, at, login in items:
+            seen[user_id] = max(at, seen.get(user_id, at))
+            if login:
+                logins[user_id] = max(at, logins.get(user_id, at))
+            days.add((timezone.localdate(at), user_id))
+        rows = [(user_id, at, logins.get(user_id)) for user_id, at in seen.items()]
+
+        alias = router.db_for_write(User)
+        with transaction.atomic(using=alias):
+            for start in range(0, len(rows), CHUNK_SIZE):
+                update_activity(alias, rows[start : start + CHUNK_SIZE])
+            # users deleted since would fail the whole insert
+            existing = set(
+                User.objects.using(alias)
+                .filter(pk__in=seen.keys())
+                .values_list("pk", flat=True)
+            )
+            DailyActivity.objects.using(alias).bulk_create(
+                (
+                    DailyActivity(day=day, user_id=user_id)
+                    for day, user_id in days
+                    if user_id in existing
+                ),
+                batch_size=CHUNK_SIZE,
+                ignore_conflicts=True,
+            )
+        cache.invalidate_tags(*(f"user:{user_id}" for user_id in seen))
+
+
+def update_activity(alias, rows):
+    """
+    Move last_seen, and last_login where given, of the (user id, seen,
+    login) rows forward; they never go back.
+    """
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        for user_id, seen, login in rows:
+            users = User.objects.using(alias).filter(pk=user_id)
+            users.filter(Q(last_seen__isnull=True) | Q(last_seen__lt=seen)).update(
+                last_seen=seen
+            )
+            if login is not None:
+                users.filter(
+                    Q(last_login__isnull=True) | Q(last_login__lt=login)
+                ).update(last_login=login)
+        return
+
+    values = ", ".join(["(%s, %s::timestamptz, %s::timestamptz)"] * len(rows))
+    with connection.cursor() as cursor:
+        # GREATEST ignores NULLs, so a missing login keeps the stored one
+        cursor.execute(
+            f"""
+            UPDATE {User._meta.db_table} AS u
+            SET last_seen = GREATEST(u.last_seen, v.seen),
+                last_login = GREATEST(u.last_login, v.login)
+            FROM (VALUES {values}) AS v (id, seen, login)
+            WHERE u.id = v.id
+            """,
+            [value for row in rows for value in row],
+        )
+
+
+def daily_active_users(days=7):
+    """[(day, active users)] of the last `days` days, today last."""
+    first = timezone.localdate() - timedelta(days=days - 1)
+    counts = dict(
+        DailyActivity.objects.filter(day__gte=first)
+        .values_list("day")
+        .annotate(Count("id"))
+    )
+    return [
+        (first + timedelta(days=offset), counts.get(first + timedelta(days=offset), 0))
+        for offset in range(days)
+    ]
+
+
+tracker = ActivityTracker(
+    resolution=settings.ACTIVITY_RESOLUTION,
+    tracked_users=settings.ACTIVITY_TRACKED_USERS,
+    max_size=settings.ACTIVITY_BUFFER_SIZE,
+    interval=settings.ACTIVITY_FLUSH_INTERVAL,
+)
@@ -1,11 +1,39 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
+from main.custom.paginations import EstimatedCountPaginator
 from .models import User, Driver, Customer, DriverDocument, CustomerDocument
+from .search import search_users
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelists over large tables: estimated counts, no unfiltered COUNT(*)
+    next to the filtered one, and an indexed ordering, so a page walks the
+    index up to its last row instead of sorting the table. Pages are still
+    fetched with OFFSET, the deeper the page the more rows are skipped.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ("-pk",)
+
+
+class RankedSearchChangeList(ChangeList):
+    """
+    Keeps the order of ranked search results, which ChangeList would only
+    append to the admin's ordering, unless a column was sorted.
+    """
+
+    def get_ordering(self, request, queryset):
+        if ORDER_VAR not in self.params and "search_rank" in queryset.query.annotations:
+            return self._get_deterministic_ordering(list(queryset.query.order_by))
+        return super().get_ordering(request, queryset)
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(LargeTableAdmin, BaseUserAdmin):
     add_fieldsets = (
         (None, {"fields": ("phone_number", "password")}),
         (
@@ -15,8 +43,9 @@ class UserAdmin(BaseUserAdmin):
     )
 
     ordering = ("phone_number",)
-    list_display = ["id", "phone_number", "date_joined", "last_login"]
-    search_fields = ("phone_number", "first_name", "last_name", "email")
+    list_display = ["id", "phone_number", "date_joined", "last_login", "last_seen"]
+    # searched by users.search, full_name covers first_name and last_name
+    search_fields = ("phone_number", "full_name", "email")
 
     # readonly_fields = ["email", "phone_number", "last_login", "date_joined"]
     exclude = ["username"]
@@ -38,10 +67,49 @@ class UserAdmin(BaseUserAdmin):
                 )
             },
         ),
-        (_("Important dates"), {"fields": ("last_login", "date_joined")}),
+        (
+            _("Important dates"),
+            {"fields": ("last_login", "last_seen", "date_joined")},
+        ),
     )
 
-admin.site.register(Customer)
-admin.site.register(Driver)
-admin.site.register(DriverDocument)
-admin.site.register(CustomerDocument)
+    def get_changelist(self, request, **kwargs):
+        return RankedSearchChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset = search_users(queryset, search_term)
+        # annotated on PostgreSQL only
+        if "search_rank" in queryset.query.annotations:
+            queryset = queryset.order_by("-search_rank", *self.ordering)
+        return queryset, False
+
+
+class ProfileAdmin(LargeTableAdmin):
+    list_display = ["id", "user", "is_verified", "created"]
+    list_filter = ["is_verified"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+
+
+@admin.register(Driver)
+class DriverAdmin(ProfileAdmin):
+    pass
+
+
+@admin.register(Customer)
+class CustomerAdmin(ProfileAdmin):
+    pass
+
+
+@admin.register(DriverDocument)
+class DriverDocumentAdmin(LargeTableAdmin):
+    list_display = ["id", "driver", "image"]
+    list_select_related = ["driver__user"]
+    raw_id_fields = ["driver"]
+
+
+@admin.register(CustomerDocument)
+class CustomerDocumentAdmin(LargeTableAdmin):
+    list_display = ["id", "customer", "image"]
+    list_select_related = ["customer__user"]
+    raw_id_fields = ["customer"]
@@ -1,15 +1,24 @@
+from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 from fcm_django.models import FCMDevice
-from rest_framework import generics, permissions, status
+from rest_framework import generics, mixins, permissions, status, viewsets
 from rest_framework.decorators import action, api_view
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from rest_framework.parsers import MultiPartParser, FileUploadParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from audit import events
+from main.custom.throttling import HASH_COST, READ_COST, CostThrottle
+from main.custom.uploads import StreamingUploadMixin
 from main.custom.viewsets import ContextModelViewSet
-from .models import Customer, Driver, User
+from notifications.broker import notify
+from . import activity, revocation, uploads
+from .models import DOCUMENT_DIR, Customer, Driver, UploadSession, User
 from .serializers import (
     UserSerializer,
     RegisterSerializer,
@@ -18,6 +27,10 @@ from .serializers import (
     DriverSerializer,
     CustomerSerializer,
     DocumentUploadSerializer,
+    LogoutSerializer,
+    RevocableTokenRefreshSerializer,
+    AuditedTokenObtainPairSerializer,
+    UploadSessionSerializer,
 )
 
 
@@ -41,25 +54,27 @@ def is_auth(request):
     return Response({"msg": False})
 
 
+def get_verification_profile(user, role):
+    """The "D"river or "C"ustomer profile of `user`, pending verification again."""
+    model_class = Driver if role == "D" else Customer
+    instance, _ = model_class.objects.get_or_create(user=user)
+    if instance.is_verified is False:
+        instance.is_verified = None
+        instance.save(update_fields=["is_verified"])
+    return instance
+
+
 def verification_request(request, user=None):
     if not user:
         user = request.user
     role = request.data.get("role")
     if not role or role[0].upper() not in ["D", "C"]:
         raise ValidationError({"role": "role required or not properly defined."})
-    else:
-        role = role[0].upper()
-        if role == "D":
-            model_class = Driver
-        elif role == "C":
-            model_class = Customer
-        else:
-            raise ValidationError({"role": "role required or not properly defined."})
+    role = role[0].upper()
 
-    instance, _ = model_class.objects.get_or_create(user=user)
-    if instance.is_verified is False:
-        instance.is_verified = None
-        instance.save(update_fields=["is_verified"])
+    instance = get_verification_profile(user, role)
+    events.log("profile.verification_request", actor=user, request=request, role=role)
+    notify(user.pk, "profile.verification", role=role, verified=None)
 
     documents = request.FILES.getlist("documents")
 
@@ -69,7 +84,16 @@ def verification_request(request, user=None):
                 data={"role": role, "profile_id": instance.id, "file": file}
             )
             if file_serializer.is_valid():
-                file_serializer.save()
+                document = file_serializer.save()
+                events.log(
+                    "document.upload",
+                    actor=user,
+                    request=request,
+                    role=role,
+                    document_id=document.pk,
+                    name=document.image.name,
+                )
+                notify(user.pk, "document.upload", role=role, document_id=document.pk)
             else:
                 return 0
         return 1
@@ -78,30 +102,30 @@ def verification_request(request, user=None):
 
 class RegisterAPI(generics.GenericAPIView):
     serializer_class = RegisterSerializer
+    throttle_classes = [CostThrottle]
+    throttle_cost = HASH_COST
 
     def post(self, request, *args, **kwargs):
         with transaction.atomic():
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
+            # password is hashed before the single INSERT
             user = serializer.save()
-
-            # setting created user's password
-            password_serializer = PasswordSerializer(data=request.data)
-            if password_serializer.is_valid():
-                user.set_password(password_serializer.data["password"])
-                user.save()
-            else:
-                raise ValidationError(password_serializer.errors)
+            events.log("auth.register", actor=user, request=request)
+            # a flush before the commit wouldn't find the user yet
+            transaction.on_commit(lambda: activity.tracker.touch(user.pk, login=True))
 
             #verification_request(request, user)
 
-            request.data._mutable = True
+            if hasattr(request.data, "_mutable"):
+                request.data._mutable = True
             fcm_device_id = request.data.pop('fcm_id', None)
             fcm_device_type = request.data.pop('device_type', None)
 
             if fcm_device_id and fcm_device_type:
                 create_fcm_device(user, fcm_device_id, fcm_device_type)
-            request.data._mutable = False
+            if hasattr(request.data, "_mutable"):
+                request.data._mutable = False
 
             refresh = RefreshToken.for_user(user)
 
@@ -116,15 +140,47 @@ class RegisterAPI(generics.GenericAPIView):
             )
 
 
+class RegisterBatchAPI(generics.GenericAPIView):
+    """Register a list of users at once, for partner onboarding."""
+
+    serializer_class = RegisterSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            users = serializer.save()
+        events.log(
+            "auth.register_batch", request=request, user_ids=[user.id for user in users]
+        )
+        return Response(
+            [{"id": user.id, "phone_number": user.phone_number} for user in users],
+            status=status.HTTP_201_CREATED,
+        )
+
+
 class LoginAPI(generics.GenericAPIView):
     serializer_class = LoginSerializer
+    throttle_classes = [CostThrottle]
+    throttle_cost = HASH_COST
+    throttle_failures = True
 
     #    permission_classes = [permissions.AllowAny,]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        if not serializer.is_valid():
+            events.log(
+                "auth.login_failed",
+                request=request,
+                username=request.data.get("username"),
+            )
+            raise ValidationError(serializer.errors)
         user = serializer.validated_data
+        CostThrottle().forgive(request)
+        events.log("auth.login", actor=user, request=request)
+        activity.tracker.touch(user.pk, login=True)
 
         if hasattr(request.data, "_mutable"):
             request.data._mutable = True
@@ -149,10 +205,71 @@ class LoginAPI(generics.GenericAPIView):
         )
 
 
-class UserViewset(ContextModelViewSet):
+class TokenObtainPairAPI(TokenObtainPairView):
+    serializer_class = AuditedTokenObtainPairSerializer
+    throttle_classes = [CostThrottle]
+    throttle_cost = HASH_COST
+    throttle_failures = True
+
+    def post(self, request, *args, **kwargs):
+        try:
+            response = super().post(request, *args, **kwargs)
+        except AuthenticationFailed:
+            events.log(
+                "auth.login_failed",
+                request=request,
+                username=request.data.get(User.USERNAME_FIELD),
+            )
+            raise
+        CostThrottle().forgive(request)
+        return response
+
+
+class TokenRefreshAPI(TokenRefreshView):
+    serializer_class = RevocableTokenRefreshSerializer
+    throttle_classes = [CostThrottle]
+    throttle_cost = READ_COST
+
+
+class LogoutAPI(generics.GenericAPIView):
+    """Revoke the given refresh token and the access token of the request."""
+
+    serializer_class = LogoutSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        refresh = serializer.validated_data["refresh"]
+        if refresh[api_settings.USER_ID_CLAIM] != getattr(
+            request.user, api_settings.USER_ID_FIELD
+        ):
+            raise ValidationError({"refresh": "Token belongs to another user."})
+
+        revocation.store.revoke_token(refresh)
+        if request.auth is not None:
+            revocation.store.revoke_token(request.auth)
+        events.log("auth.logout", request=request)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UserViewset(StreamingUploadMixin, ContextModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = UserSerializer
-    queryset = User.objects.all()
+    # UserSerializer.get_role looks at the driver profile
+    queryset = User.objects.select_related("driver_profile")
+    upload_directory = DOCUMENT_DIR
+    # per action, see monitoring.queries.get_query_budget; +1 for the
+    # token's revocation check until the filter is loaded
+    query_budget = {
+        "list": 3,
+        "retrieve": 2,
+        "update": 3,
+        "partial_update": 3,
+        "set_password": 3,
+        # an INSERT per document
+        "request": 4 + settings.UPLOAD_MAX_FILES,
+    }
 
     def get_object(self):
         return self.request.user
@@ -164,6 +281,7 @@ class UserViewset(ContextModelViewSet):
         if serializer.is_valid():
             user.set_password(serializer.data["password"])
             user.save()
+            events.log("auth.password_change", actor=user, request=request)
             return Response({"status": "password set"})
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -175,11 +293,12 @@ class UserViewset(ContextModelViewSet):
         return Response({"request": "A verification request has been made."})
 
 
-class DriverViewset(ContextModelViewSet):
+class DriverViewset(StreamingUploadMixin, ContextModelViewSet):
     permission_classes = []
     queryset = Driver.objects.all()
     serializer_class = DriverSerializer
     parser_classes = (MultiPartParser, FileUploadParser)
+    upload_directory = DOCUMENT_DIR
 
     def get_object(self):
         return self.request.user
@@ -191,3 +310,82 @@ class CustomerViewset(ContextModelViewSet):
 
     def get_object(self):
         return self.request.user
+
+
+class UploadSessionViewset(
+    mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+):
+    """
+    Resumable document uploads, see users.uploads: create a session with the
+    size of the file, PATCH the bytes in chunks with an Upload-Offset header,
+    GET the session to find where to resume, then POST finalize/.
+    """
+
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+    query_budget = {"create": 4, "retrieve": 3, "partial_update": 5, "finalize": 6}
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(
+            user=self.request.user, expires_at__gt=timezone.now()
+        )
+
+    def perform_create(self, serializer):
+        if self.get_queryset().count() >= settings.UPLOAD_MAX_SESSIONS:
+            raise ValidationError(
+                {"detail": f"At most {settings.UPLOAD_MAX_SESSIONS} open uploads."}
+            )
+        serializer.save(user=self.request.user, expires_at=uploads.expiry())
+
+    def partial_update(self, request, pk=None):
+        session = self.get_object()
+        try:
+            offset = int(request.headers["Upload-Offset"])
+        except (KeyError, ValueError):
+            raise ValidationError({"Upload-Offset": "A byte offset is required."})
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+        if not length:
+            raise ValidationError({"detail": "The chunk is empty."})
+        # the body is streamed into the file, request.data is never parsed
+        session = uploads.write_chunk(session, offset, request.stream, length)
+        return Response(
+            self.get_serializer(session).data,
+            headers={"Upload-Offset": str(session.offset)},
+        )
+
+    @action(detail=True, methods=["post"])
+    def finalize(self, request, pk=None):
+        try:
+            with transaction.atomic():
+                # a concurrent finalize waits, then finds the session gone (404)
+                session = generics.get_object_or_404(
+                    self.get_queryset().select_for_update(), pk=pk
+                )
+                file = uploads.assemble(session)
+                instance = get_verification_profile(request.user, session.role)
+                serializer = DocumentUploadSerializer(
+                    data={"role": session.role, "profile_id": instance.id, "file": file}
+                )
+                serializer.is_valid(raise_exception=True)
+                document = serializer.save()
+                session.delete()
+        except uploads.ChecksumMismatch:
+            uploads.discard(session)
+            raise
+        events.log(
+            "document.upload",
+            request=request,
+            role=session.role,
+            document_id=document.pk,
+            name=document.image.name,
+        )
+        notify(
+            request.user.pk,
+            "document.upload",
+            role=session.role,
+            document_id=document.pk,
+        )
+        return Response(
+            {"id": document.pk, "image": document.image.name},
+            status=status.HTTP_201_CREATED,
+        )
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class UserConfig(AppConfig):
     name = "users"
+
+    def ready(self):
+        from . import signals  # noqa
+        from main.custom import checks  # noqa
@@ -0,0 +1,130 @@
+import statistics
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Customer, Driver, DriverDocument, User
+
+SEED_PREFIX = "+1999"
+PAGES = [
+    "/users/user/",
+    "/users/user/?p=100",
+    "/users/user/?q=ram",
+    "/users/driver/",
+    "/users/driver/?is_verified__exact=1",
+    "/users/driver/?is_verified__isnull=True",
+    "/users/customer/",
+    "/users/driverdocument/",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the admin changelists of users, profiles and documents over "
+        "seeded rows, which are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=5_000_000, help="0 uses the existing data"
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--host", default="dj-admin.localhost")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["users"]:
+                self.seed(options["users"])
+            admin = User.objects.create_superuser(
+                email="changelist-bench@example.com",
+                phone_number=f"{SEED_PREFIX}admin",
+            )
+            client = Client(HTTP_HOST=options["host"])
+            client.force_login(admin)
+
+            for page in PAGES:
+                timings = []
+                for _ in range(options["repeat"]):
+                    with CaptureQueriesContext(connection) as queries:
+                        start = perf_counter()
+                        response = client.get(page)
+                        timings.append(perf_counter() - start)
+                    assert response.status_code == 200, (page, response.status_code)
+                self.stdout.write(
+                    f"{page:<42} median {statistics.median(timings) * 1000:7.1f} ms  "
+                    f"max {max(timings) * 1000:7.1f} ms  {len(queries)} queries"
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        self.stdout.write(f"Seeding {count} users with profiles and documents...")
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO users_user (
+                        password, is_superuser, first_name, last_name, is_staff,
+                        is_active, date_joined, full_name, phone_number
+                    )
+                    SELECT '!', false, 'Ram', 'Shrestha', false, true, now(),
+                        'Ram Shrestha ' || i, %s || lpad(i::text, 9, '0')
+                    FROM generate_series(0, %s - 1) AS i
+                    """,
+                    [SEED_PREFIX, count],
+                )
+                for table, remainder in (("users_driver", 0), ("users_customer", 1)):
+                    cursor.execute(
+                        f"""
+                        INSERT INTO {table} (user_id, is_verified, created)
+                        SELECT id, (ARRAY[true, true, true, false, NULL])[id %% 5 + 1],
+                            now() - id * interval '1 second'
+                        FROM users_user
+                        WHERE phone_number LIKE %s AND id %% 2 = %s
+                        """,
+                        [f"{SEED_PREFIX}%", remainder],
+                    )
+                cursor.execute("""
+                    INSERT INTO users_driverdocument (driver_id, image)
+                    SELECT id, 'images/documents/bench-' || id || '.png'
+                    FROM users_driver
+                    """)
+                cursor.execute("ANALYZE")
+            return
+
+        User.objects.bulk_create(
+            (
+                User(
+                    password="!",
+                    full_name=f"Ram Shrestha {i}",
+                    phone_number=f"{SEED_PREFIX}{i:09d}",
+                )
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
+        ids = User.objects.filter(phone_number__startswith=SEED_PREFIX).values_list(
+            "id", flat=True
+        )
+        states = [True, True, True, False, None]
+        Driver.objects.bulk_create(
+            (
+                Driver(user_id=id, is_verified=states[id % 5])
+                for id in ids
+                if id % 2 == 0
+            ),
+            batch_size=5000,
+        )
+        Customer.objects.bulk_create(
+            (Customer(user_id=id, is_verified=states[id % 5]) for id in ids if id % 2),
+            batch_size=5000,
+        )
+        DriverDocument.objects.bulk_create(
+            (
+                DriverDocument(driver_id=id, image=f"images/documents/bench-{id}.png")
+                for id in Driver.objects.values_list("id", flat=True)
+            ),
+            batch_size=5000,
+        )
@@ -0,0 +1,122 @@
+import io
+import random
+import statistics
+from datetime import date, timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from main.custom.parsers import ORJSONParser
+from main.custom.renderers import ORJSONRenderer
+from users.models import Driver, User
+from users.serializers import DriverSerializer, UserSerializer
+
+FIRST_NAMES = ["Ram", "Sita", "Hari", "Gita", "राम", "सीता", "Bikash", "Anita"]
+LAST_NAMES = ["Shrestha", "Sharma", "Gurung", "श्रेष्ठ", "Tamang", "Thapa"]
+
+
+class BaselineUserSerializer(UserSerializer):
+    """The serializers as they were, with DRF's DateTimeField."""
+
+    serializer_field_mapping = serializers.ModelSerializer.serializer_field_mapping
+
+
+class BaselineDriverSerializer(serializers.ModelSerializer):
+    user = BaselineUserSerializer()
+
+    class Meta:
+        model = Driver
+        fields = "__all__"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare serializing, rendering and parsing UserSerializer and "
+        "DriverSerializer payloads with DRF's JSON classes and the orjson ones, "
+        "and check that both produce the same bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--objects", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        drivers = self.build(options["objects"])
+        users = [driver.user for driver in drivers]
+        self.repeat = options["repeat"]
+
+        for name, serializer, baseline, instances in (
+            ("users", UserSerializer, BaselineUserSerializer, users),
+            ("drivers", DriverSerializer, BaselineDriverSerializer, drivers),
+        ):
+            self.stdout.write(f"{len(instances)} {name}")
+            old = self.compare(
+                "serialize",
+                lambda: baseline(instances, many=True).data,
+                lambda: serializer(instances, many=True).data,
+            )
+            data = old[0]
+            if old[0] != old[1]:
+                raise CommandError(f"{name}: serializer output differs")
+            rendered = self.compare(
+                "render",
+                lambda: JSONRenderer().render(data),
+                lambda: ORJSONRenderer().render(data),
+            )
+            if rendered[0] != rendered[1]:
+                raise CommandError(f"{name}: rendered bytes differ")
+            self.stdout.write(f"  {len(rendered[0]) / 1024:.0f} KiB, identical")
+            parsed = self.compare(
+                "parse",
+                lambda: JSONParser().parse(io.BytesIO(rendered[0])),
+                lambda: ORJSONParser().parse(io.BytesIO(rendered[0])),
+            )
+            if parsed[0] != parsed[1]:
+                raise CommandError(f"{name}: parsed data differs")
+
+    def compare(self, stage, baseline, candidate):
+        results, medians = [], []
+        for function in (baseline, candidate):
+            timings = []
+            for _ in range(self.repeat):
+                start = perf_counter()
+                result = function()
+                timings.append(perf_counter() - start)
+            results.append(result)
+            medians.append(statistics.median(timings))
+        self.stdout.write(
+            f"  {stage:<10} drf {medians[0] * 1000:7.2f} ms  "
+            f"orjson {medians[1] * 1000:7.2f} ms  {medians[0] / medians[1]:5.1f}x"
+        )
+        return results
+
+    @staticmethod
+    def build(count):
+        """Unsaved drivers with their users, like a page of a list endpoint."""
+        random.seed(0)
+        now = timezone.now()
+        drivers = []
+        for i in range(count):
+            first, last = random.choice(FIRST_NAMES), random.choice(LAST_NAMES)
+            user = User(
+                id=i + 1,
+                full_name=f"{first} {last}",
+                email=f"user{i}@example.com" if i % 3 else None,
+                gender=random.choice(["M", "F", "D", None]),
+                date_of_birth=date(1970, 1, 1)
+                + timedelta(days=random.randrange(15000)),
+                phone_number=f"+97798{i:08d}",
+            )
+            drivers.append(
+                Driver(
+                    id=i + 1,
+                    user=user,
+                    is_verified=random.choice([True, False, None]),
+                    created=now - timedelta(seconds=random.randrange(10**8)),
+                )
+            )
+        return drivers
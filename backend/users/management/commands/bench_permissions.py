@@ -0,0 +1,106 @@
+from time import perf_counter
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.request import Request
+
+from main.custom.permissions import ActionBasedPermission, IsPosterOrReadOnly
+from users.models import Driver, DriverDocument, User
+
+
+class BaselineActionBasedPermission(AllowAny):
+    """ActionBasedPermission as it was, instantiating per check."""
+
+    def has_permission(self, request, view):
+        for klass, actions in getattr(view, "action_permissions", {}).items():
+            if view.action in actions:
+                return klass().has_permission(request, view)
+        return False
+
+
+class DocumentOwnerPermission(IsPosterOrReadOnly):
+    owner_paths = (("driver", "user"),)
+
+
+class BaselineDocumentOwnerPermission(IsPosterOrReadOnly):
+    """IsPosterOrReadOnly as it was, comparing the loaded users."""
+
+    def has_object_permission(self, request, view, obj):
+        return obj.driver.user == request.user
+
+
+class BenchView:
+    action_permissions = {
+        IsAdminUser: ["destroy"],
+        IsAuthenticated: ["list", "retrieve", "update", "partial_update"],
+        AllowAny: ["create"],
+    }
+
+    def __init__(self, action):
+        self.action = action
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-request cost of ActionBasedPermission and of the "
+        "owner check of IsPosterOrReadOnly with their previous versions. "
+        "The rows created for the owner check are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=100000)
+        parser.add_argument("--objects", type=int, default=200)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        request = Request(RequestFactory().put("/"))
+        request.user = User(id=1, phone_number="+15550000000")
+        view = BenchView("partial_update")
+
+        for name, permission in (
+            ("baseline", BaselineActionBasedPermission()),
+            ("compiled", ActionBasedPermission()),
+        ):
+            start = perf_counter()
+            for _ in range(iterations):
+                permission.has_permission(request, view)
+            duration = (perf_counter() - start) / iterations * 1e6
+            self.stdout.write(f"action   {name:<10} {duration:6.2f} us/check")
+
+        with transaction.atomic():
+            self.bench_owner(options["objects"])
+            transaction.set_rollback(True)
+
+    def bench_owner(self, count):
+        owner = User.objects.create(phone_number="+15559999999", password="!")
+        driver = Driver.objects.create(user=owner)
+        document = DriverDocument.objects.create(
+            driver=driver, image="images/documents/bench.png"
+        )
+        request = Request(RequestFactory().put("/"))
+        for user in (owner, AnonymousUser()):
+            request.user = user
+            for name, permission in (
+                ("baseline", BaselineDocumentOwnerPermission()),
+                ("ids", DocumentOwnerPermission()),
+            ):
+                # fresh instances, as a detail view would fetch them
+                documents = [
+                    DriverDocument.objects.get(pk=document.pk) for _ in range(count)
+                ]
+                with CaptureQueriesContext(connection) as queries:
+                    start = perf_counter()
+                    allowed = [
+                        permission.has_object_permission(request, None, document)
+                        for document in documents
+                    ]
+                    duration = (perf_counter() - start) / count * 1e6
+                who = "owner" if user.is_authenticated else "anonymous"
+                self.stdout.write(
+                    f"owner    {name:<10} {duration:6.1f} us/check  "
+                    f"{len(queries) / count:.0f} queries  {who} allowed={all(allowed)}"
+                )
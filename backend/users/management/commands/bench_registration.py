@@ -0,0 +1,50 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.serializers import RegisterSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure registrations per second on one core, one by one and batched. "
+        "Everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=200)
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        registrations = [
+            {
+                "full_name": f"bench user {i}",
+                "phone_number": f"+999{i:09d}",
+                "email": f"bench{i}@example.com",
+                "password": "bench-password",
+            }
+            for i in range(count)
+        ]
+
+        def single():
+            for data in registrations:
+                serializer = RegisterSerializer(data=data)
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+
+        def batch():
+            serializer = RegisterSerializer(data=registrations, many=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+        for name, run in (("single", single), ("batch", batch)):
+            with transaction.atomic():
+                start = perf_counter()
+                run()
+                elapsed = perf_counter() - start
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"{name:<7} {count / elapsed:8.1f} registrations/s "
+                f"({elapsed / count * 1000:.2f} ms each)"
+            )
@@ -0,0 +1,97 @@
+import statistics
+from time import perf_counter
+
+from django.contrib import admin
+from django.contrib.admin import ModelAdmin
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from users.models import User
+
+SEED_PREFIX = "+1888"
+TERMS = ["ram", "kumar shrestha", "gmail.com", "+1 888-000 0001", "9990"]
+PAGE_SIZE = 100
+
+
+class IContainsAdmin(ModelAdmin):
+    """The admin search this replaced, as the baseline."""
+
+    search_fields = ("phone_number", "first_name", "last_name", "email")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure UserAdmin search (first page and count) against the previous "
+        "icontains search, over seeded users that are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2_000_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options["users"])
+            searches = {
+                "trigram": admin.site._registry[User],
+                "icontains": IContainsAdmin(User, admin.site),
+            }
+            for term in TERMS:
+                for name, model_admin in searches.items():
+                    timings = []
+                    for _ in range(options["repeat"]):
+                        start = perf_counter()
+                        queryset, _ = model_admin.get_search_results(
+                            None, User.objects.all(), term
+                        )
+                        if "search_rank" in queryset.query.annotations:
+                            queryset = queryset.order_by("-search_rank")
+                        count = queryset.count()
+                        list(queryset[:PAGE_SIZE])
+                        timings.append(perf_counter() - start)
+                    self.stdout.write(
+                        f"{term!r:<18} {name:<10} {count:>8} results  "
+                        f"median {statistics.median(timings) * 1000:8.1f} ms  "
+                        f"max {max(timings) * 1000:8.1f} ms"
+                    )
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        self.stdout.write(f"Seeding {count} users...")
+        first_names = ["Ram", "Sita", "Hari", "Gita", "Kumar", "Anita", "Bikash"]
+        last_names = ["Shrestha", "Sharma", "Gurung", "Tamang", "Rai", "Thapa"]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO users_user (
+                        password, is_superuser, first_name, last_name, is_staff,
+                        is_active, date_joined, email, full_name, phone_number
+                    )
+                    SELECT '!', false, f, l, false, true, now(),
+                        lower(f) || i || '@' || (ARRAY['gmail.com', 'example.com'])[i %% 2 + 1],
+                        f || ' ' || l, %s || lpad(i::text, 9, '0')
+                    FROM generate_series(0, %s - 1) AS i,
+                        LATERAL (SELECT (%s::text[])[i %% 7 + 1] AS f,
+                                        (%s::text[])[i %% 6 + 1] AS l) AS names
+                    """,
+                    [SEED_PREFIX, count, first_names, last_names],
+                )
+                cursor.execute("ANALYZE users_user")
+            return
+
+        users = []
+        for i in range(count):
+            first, last = first_names[i % 7], last_names[i % 6]
+            domain = ["gmail.com", "example.com"][i % 2]
+            users.append(
+                User(
+                    password="!",
+                    first_name=first,
+                    last_name=last,
+                    full_name=f"{first} {last}",
+                    email=f"{first.lower()}{i}@{domain}",
+                    phone_number=f"{SEED_PREFIX}{i:09d}",
+                )
+            )
+        User.objects.bulk_create(users, batch_size=5000)
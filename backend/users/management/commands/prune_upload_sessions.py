@@ -0,0 +1,45 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users import uploads
+from users.models import DOCUMENT_DIR, UploadSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired upload sessions with their part files, and part files "
+        "whose session is gone."
+    )
+
+    def handle(self, *args, **options):
+        expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+        count = 0
+        for session in expired.iterator():
+            uploads.discard(session)
+            count += 1
+        self.stdout.write(f"Deleted {count} expired upload sessions.")
+
+        # left behind when a session went with its user
+        directory = default_storage.path(DOCUMENT_DIR)
+        if not os.path.isdir(directory):
+            return
+        live = {
+            f".session-{pk}.part"
+            for pk in UploadSession.objects.values_list("pk", flat=True)
+        }
+        cutoff = time.time() - settings.UPLOAD_SESSION_TTL
+        removed = 0
+        for entry in os.scandir(directory):
+            if (
+                entry.name.startswith(".session-")
+                and entry.name not in live
+                and entry.stat().st_mtime < cutoff
+            ):
+                os.remove(entry.path)
+                removed += 1
+        self.stdout.write(f"Removed {removed} orphaned part files.")
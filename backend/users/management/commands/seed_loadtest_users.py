@@ -0,0 +1,43 @@
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from users.models import User
+
+PHONE_PREFIX = "+1555"
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the users the load test logs in with (see loadtest/). They share "
+        "one password, hashed once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=1000)
+        parser.add_argument("--password", default="loadtest-password")
+        parser.add_argument(
+            "--reset", action="store_true", help="delete existing load test users"
+        )
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            deleted = User.objects.filter(
+                phone_number__startswith=PHONE_PREFIX
+            ).delete()
+            self.stdout.write(f"Deleted {deleted[0]} objects.")
+
+        password = make_password(options["password"])
+        users = []
+        for i in range(options["count"]):
+            user = User(
+                full_name=f"load test {i}",
+                phone_number=f"{PHONE_PREFIX}{i:07d}",
+                password=password,
+            )
+            user.set_full_name()
+            users.append(user)
+        User.objects.bulk_create(users, batch_size=1000, ignore_conflicts=True)
+        self.stdout.write(
+            f"{options['count']} load test users {PHONE_PREFIX}0000000.. "
+            f"with password {options['password']!r}."
+        )
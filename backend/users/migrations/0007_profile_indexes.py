@@ -0,0 +1,123 @@
+# Generated by Django 3.2.10 on 2026-10-19 17:15
+
+from django.db import migrations, models
+import users.models
+
+# Built concurrently on PostgreSQL so the tables stay writable on large
+# installs, which is why the migration isn't atomic. The model state is
+# changed separately, the names are the ones Django gives these indexes.
+PROFILE_INDEXES = {
+    "users_customerdocument_image_19e32aff": "users_customerdocument (image)",
+    "users_driverdocument_image_93802e92": "users_driverdocument (image)",
+    "customer_verified_created_idx": "users_customer (is_verified, created DESC)",
+    "customer_pending_created_idx": (
+        "users_customer (created DESC) WHERE is_verified IS NULL"
+    ),
+    "driver_verified_created_idx": "users_driver (is_verified, created DESC)",
+    "driver_pending_created_idx": (
+        "users_driver (created DESC) WHERE is_verified IS NULL"
+    ),
+}
+POSTGRESQL_INDEXES = {
+    # what db_index adds to varchar columns for LIKE lookups
+    "users_customerdocument_image_19e32aff_like": (
+        "users_customerdocument (image varchar_pattern_ops)"
+    ),
+    "users_driverdocument_image_93802e92_like": (
+        "users_driverdocument (image varchar_pattern_ops)"
+    ),
+    # devices are looked up by user to send notifications; the index covers
+    # the registration id so those lookups never touch the heap
+    "fcm_device_user_active_idx": (
+        "fcm_django_fcmdevice (user_id) INCLUDE (registration_id) WHERE active"
+    ),
+}
+
+
+def indexes(schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        return {**PROFILE_INDEXES, **POSTGRESQL_INDEXES}
+    return PROFILE_INDEXES
+
+
+def concurrently(schema_editor):
+    return "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+
+
+def create_profile_indexes(apps, schema_editor):
+    for name, definition in indexes(schema_editor).items():
+        schema_editor.execute(
+            f"CREATE INDEX {concurrently(schema_editor)}IF NOT EXISTS {name} "
+            f"ON {definition}"
+        )
+
+
+def drop_profile_indexes(apps, schema_editor):
+    for name in indexes(schema_editor):
+        schema_editor.execute(
+            f"DROP INDEX {concurrently(schema_editor)}IF EXISTS {name}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("users", "0006_revokedtoken"),
+        ("fcm_django", "0008_auto_20211224_1205"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="customerdocument",
+                    name="image",
+                    field=models.ImageField(
+                        db_index=True, upload_to=users.models.get_user_document_path
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="driverdocument",
+                    name="image",
+                    field=models.ImageField(
+                        db_index=True, upload_to=users.models.get_user_document_path
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name="customer",
+                    index=models.Index(
+                        fields=["is_verified", "-created"],
+                        name="customer_verified_created_idx",
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name="customer",
+                    index=models.Index(
+                        condition=models.Q(("is_verified__isnull", True)),
+                        fields=["-created"],
+                        name="customer_pending_created_idx",
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name="driver",
+                    index=models.Index(
+                        fields=["is_verified", "-created"],
+                        name="driver_verified_created_idx",
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name="driver",
+                    index=models.Index(
+                        condition=models.Q(("is_verified__isnull", True)),
+                        fields=["-created"],
+                        name="driver_pending_created_idx",
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_profile_indexes, drop_profile_indexes),
+            ],
+        ),
+    ]
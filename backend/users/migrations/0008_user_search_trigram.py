@@ -0,0 +1,44 @@
+# Generated by Django 3.2.10 on 2026-10-19 18:05
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# built concurrently so the users table stays writable on large installs,
+# which is why the migration isn't atomic
+TRIGRAM_INDEXES = {
+    "users_user_full_name_trgm": "full_name gin_trgm_ops",
+    "users_user_email_trgm": "email gin_trgm_ops",
+    # matches users.search.phone_digits()
+    "users_user_phone_digits_trgm": (
+        "(REGEXP_REPLACE(phone_number, '\\D', '', 'g')) gin_trgm_ops"
+    ),
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON users_user USING gin ({column})"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [("users", "0007_profile_indexes")]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 3.2.10 on 2026-10-19 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("users", "0010_uploadsession")]
+
+    operations = [
+        migrations.AlterField(
+            model_name="revokedtoken",
+            name="created",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -1,7 +1,9 @@
 import os
+import uuid
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
-from django.db import models, transaction
+from django.core.files.storage import default_storage
+from django.db import models
 
 
 class UserManager(BaseUserManager):
@@ -43,6 +45,8 @@ class User(AbstractUser):
 
     phone_number = models.CharField(unique=True, max_length=20, db_index=True)
     date_of_birth = models.DateField(null=True, blank=True)
+    # written in batches by users.activity, to ACTIVITY_RESOLUTION
+    last_seen = models.DateTimeField(null=True, blank=True)
 
     USERNAME_FIELD = "phone_number"
     REQUIRED_FIELDS = []
@@ -55,8 +59,7 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "User"
 
-    @transaction.atomic
-    def save(self, *args, **kwargs):
+    def set_full_name(self):
         if not self.full_name:
             self.first_name = self.first_name.capitalize()
             self.last_name = self.last_name.capitalize()
@@ -64,6 +67,9 @@ class User(AbstractUser):
         else:
             self.full_name = self.full_name.capitalize()
 
+    def save(self, *args, **kwargs):
+        # bulk_create() skips save(), batch inserts call set_full_name() themselves
+        self.set_full_name()
         super(User, self).save(*args, **kwargs)
 
 
@@ -74,6 +80,20 @@ class Driver(models.Model):
     is_verified = models.BooleanField(blank=True, null=True)
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # verified/rejected lists, newest first
+            models.Index(
+                fields=["is_verified", "-created"], name="driver_verified_created_idx"
+            ),
+            # the pending queue is a small slice of the table
+            models.Index(
+                fields=["-created"],
+                condition=models.Q(is_verified__isnull=True),
+                name="driver_pending_created_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.user.full_name
 
@@ -85,29 +105,110 @@ class Customer(models.Model):
     is_verified = models.BooleanField(blank=True, null=True)
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # verified/rejected lists, newest first
+            models.Index(
+                fields=["is_verified", "-created"], name="customer_verified_created_idx"
+            ),
+            # the pending queue is a small slice of the table
+            models.Index(
+                fields=["-created"],
+                condition=models.Q(is_verified__isnull=True),
+                name="customer_pending_created_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.user.full_name
 
 
+# uploads are streamed into this directory, see main.custom.uploads
+DOCUMENT_DIR = "images/documents/"
+
+
 def get_user_document_path(_, filename):
-    return os.path.join("images/documents/", filename)
+    return os.path.join(DOCUMENT_DIR, filename)
 
 
 class DriverDocument(models.Model):
     driver: Driver = models.ForeignKey(
         Driver, on_delete=models.CASCADE, related_name="documents"
     )
-    image = models.ImageField(upload_to=get_user_document_path)
+    # looked up by path when serving media
+    image = models.ImageField(upload_to=get_user_document_path, db_index=True)
 
     def __str__(self):
-        return self.driver
+        return self.image.name
 
 
 class CustomerDocument(models.Model):
     customer: Customer = models.ForeignKey(
         Customer, on_delete=models.CASCADE, related_name="documents"
     )
-    image = models.ImageField(upload_to=get_user_document_path)
+    # looked up by path when serving media
+    image = models.ImageField(upload_to=get_user_document_path, db_index=True)
+
+    def __str__(self):
+        return self.image.name
+
+
+class UploadSession(models.Model):
+    """A resumable document upload, written in chunks by users.uploads."""
+
+    ROLE_CHOICES = [("D", "Driver"), ("C", "Customer")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, related_name="upload_sessions", on_delete=models.CASCADE
+    )
+    role = models.CharField(max_length=1, choices=ROLE_CHOICES)
+    size = models.PositiveIntegerField()
+    offset = models.PositiveIntegerField(default=0)
+    # optional checksum from the client, verified on finalize
+    sha256 = models.CharField(max_length=64, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    # moved forward by every chunk
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.offset}/{self.size} bytes by {self.user_id}"
+
+    @property
+    def path(self):
+        # next to the documents, so finalizing is a rename
+        return default_storage.path(
+            os.path.join(DOCUMENT_DIR, f".session-{self.pk}.part")
+        )
+
+
+class RevokedToken(models.Model):
+    """Revoked JWT ids, mirrored into every process by users.revocation."""
+
+    id = models.BigAutoField(primary_key=True)
+    jti = models.CharField(max_length=255, unique=True)
+    # rows are useless once the token would have expired anyway
+    expires_at = models.DateTimeField(db_index=True)
+    # users.revocation syncs by it
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class DailyActivity(models.Model):
+    """The days a user was seen on, for daily active user counts."""
+
+    id = models.BigAutoField(primary_key=True)
+    day = models.DateField()
+    user = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "user"], name="users_dailyactivity_day_user_uniq"
+            )
+        ]
 
     def __str__(self):
-        return self.customer
+        return f"{self.user_id} on {self.day}"
@@ -0,0 +1,233 @@
+"""
+Revoked JWT ids.
+
+Revocations are stored in the RevokedToken table and mirrored into a
+per-process Bloom filter. A background thread, started when the worker
+boots, builds it and syncs it incrementally every REVOCATION_SYNC_INTERVAL
+seconds; requests never load rows. Until the first build is done tokens are
+checked against the table, one query each. Ids and creation times are
+assigned before commit, so a row can become visible after later ones: every
+sync re-reads the rows created in the last REVOCATION_SYNC_OVERLAP seconds
+before the newest one seen. A token missing from the filter is not revoked,
+which is the answer for nearly every request and needs no I/O. Filter hits
+are confirmed against the table and the answer is kept in a small exact
+LRU, so false positives cost one query per process.
+
+The filter only grows. Once it outgrows its capacity the thread builds a
+new one from the live rows next to it and swaps it in; prune_revoked_tokens
+removes expired rows.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone as dj_timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # double hashing over one 128 bit digest (Kirsch-Mitzenmacher)
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+
+class RevocationStore:
+    def __init__(
+        self,
+        capacity=100_000,
+        error_rate=0.01,
+        sync_interval=5,
+        exact_size=10_000,
+        sync_overlap=60,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.exact_size = exact_size
+        self.sync_overlap = timedelta(seconds=sync_overlap)
+        # guards the filter's bits and the exact LRU
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        # None until the first build is done
+        self.filter = None
+        # newest creation time loaded, and the jtis loaded within the overlap
+        self.watermark = None
+        self.recent = {}
+        self.exact = OrderedDict()  # jti -> revoked, for filter hits
+        self.pid = None
+
+    def is_revoked(self, jti):
+        self.start()
+        bloom = self.filter
+        if bloom is None:
+            # still loading
+            return RevokedToken.objects.filter(jti=jti).exists()
+        if jti not in bloom:
+            return False
+
+        with self.lock:
+            revoked = self.exact.get(jti)
+            if revoked is not None:
+                self.exact.move_to_end(jti)
+                return revoked
+        revoked = RevokedToken.objects.filter(jti=jti).exists()
+        self._remember(jti, revoked)
+        return revoked
+
+    def revoke(self, jti, expires_at):
+        """Revoke `jti` until `expires_at`, effective in this process immediately."""
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            pass  # already revoked
+        # a filter being built gets it from the exact LRU when swapped in
+        self._remember(jti, True)
+        with self.lock:
+            if self.filter is not None:
+                self.filter.add(jti)
+
+    def revoke_token(self, token):
+        """Revoke a simplejwt token instance."""
+        expires_at = datetime.fromtimestamp(token["exp"], tz=timezone.utc)
+        self.revoke(token[api_settings.JTI_CLAIM], expires_at)
+
+    def start(self):
+        """Start syncing from a background thread, once per process."""
+        # started in the forked worker, not the master
+        if self.pid == os.getpid() or not settings.BACKGROUND_THREADS:
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            thread = threading.Thread(
+                target=self._run, name="RevocationStore", daemon=True
+            )
+            thread.start()
+
+    def _run(self):
+        while True:
+            # this thread's connection never sees request_finished
+            close_old_connections()
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Syncing revoked tokens failed")
+            time.sleep(self.sync_interval)
+
+    def sync(self):
+        with self.sync_lock:
+            if self.filter is None or len(self.filter) >= self.capacity:
+                self._rebuild()
+            else:
+                self._load(
+                    RevokedToken.objects.filter(
+                        created__gte=self.watermark - self.sync_overlap
+                    ),
+                    self.filter,
+                    self.lock,
+                )
+
+    def _rebuild(self):
+        live = RevokedToken.objects.filter(expires_at__gt=dj_timezone.now())
+        count = live.count()
+        while count * 2 > self.capacity:
+            self.capacity *= 2
+        # the current filter keeps answering while the new one fills up
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        self.watermark = dj_timezone.now()
+        self.recent = {}
+        self._load(live, bloom, nullcontext())
+        with self.lock:
+            # revoked by this process since the rows were read
+            for jti, revoked in self.exact.items():
+                if revoked:
+                    bloom.add(jti)
+            self.filter = bloom
+
+    def _load(self, queryset, bloom, lock):
+        # rows older than this won't be read again, no need to remember them
+        overlap_start = self.watermark - self.sync_overlap
+        rows = queryset.values_list("jti", "created")
+        for jti, created in rows.iterator(chunk_size=10_000):
+            if jti in self.recent:
+                continue  # read by an earlier, overlapping sync
+            if created >= overlap_start:
+                self.recent[jti] = created
+            with lock:
+                bloom.add(jti)
+                if jti in self.exact:
+                    # a false positive confirmed earlier has been revoked since
+                    self.exact[jti] = True
+            self.watermark = max(self.watermark, created)
+
+        overlap_start = self.watermark - self.sync_overlap
+        self.recent = {
+            jti: created
+            for jti, created in self.recent.items()
+            if created >= overlap_start
+        }
+
+    def _remember(self, jti, revoked):
+        with self.lock:
+            self.exact[jti] = revoked
+            self.exact.move_to_end(jti)
+            while len(self.exact) > self.exact_size:
+                self.exact.popitem(last=False)
+
+
+store = RevocationStore(
+    capacity=settings.REVOCATION_FILTER_CAPACITY,
+    error_rate=settings.REVOCATION_FILTER_ERROR_RATE,
+    sync_interval=settings.REVOCATION_SYNC_INTERVAL,
+    exact_size=settings.REVOCATION_EXACT_SIZE,
+    sync_overlap=settings.REVOCATION_SYNC_OVERLAP,
+)
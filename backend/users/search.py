@@ -0,0 +1,84 @@
+"""
+User search backed by pg_trgm GIN indexes (see migration 0008).
+
+Every word of the term has to match the full name or email as a substring
+(`ILIKE`, which the trigram indexes serve, unlike the `UPPER() LIKE` Django
+emits for icontains). A term that looks like a phone number is reduced to
+its digits and matched against the digits of the stored numbers, so
+"+977 984-1234567", "9841234567" and "984 123" all find the same user.
+On PostgreSQL results are ranked by trigram similarity.
+"""
+
+import re
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import CharField, F, FloatField, Func, Q, Value
+from django.db.models.functions import Greatest
+from django.db.models.lookups import IContains
+
+PHONE_TERM = re.compile(r"^\+?[\d\s().\-]+$")
+MIN_PHONE_DIGITS = 3
+
+
+@CharField.register_lookup
+class ILike(IContains):
+    """icontains as a plain ILIKE, which pg_trgm indexes can serve."""
+
+    lookup_name = "ilike"
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs_sql} ILIKE {rhs_sql}", lhs_params + rhs_params
+
+    def get_rhs_op(self, connection, rhs):
+        # other backends keep their icontains
+        return connection.operators[IContains.lookup_name] % rhs
+
+
+def phone_digits(expression):
+    # the same expression the users_user_phone_digits_trgm index is built on
+    return Func(
+        expression,
+        Value(r"\D"),
+        Value(""),
+        Value("g"),
+        function="REGEXP_REPLACE",
+        output_field=CharField(),
+    )
+
+
+def normalize_phone(term):
+    """The digits of `term` when it looks like a phone number, else None."""
+    if not PHONE_TERM.match(term):
+        return None
+    digits = re.sub(r"\D", "", term)
+    return digits if len(digits) >= MIN_PHONE_DIGITS else None
+
+
+def search_users(queryset, term):
+    term = term.strip()
+    if not term:
+        return queryset
+    postgres = connections[queryset.db].vendor == "postgresql"
+
+    digits = normalize_phone(term)
+    if digits is not None:
+        if not postgres:
+            return queryset.filter(phone_number__contains=digits)
+        queryset = queryset.annotate(
+            phone_digits=phone_digits(F("phone_number"))
+        ).filter(phone_digits__contains=digits)
+        rank = TrigramSimilarity("phone_digits", digits)
+    else:
+        for word in term.split():
+            queryset = queryset.filter(Q(full_name__ilike=word) | Q(email__ilike=word))
+        if not postgres:
+            return queryset
+        rank = Greatest(
+            TrigramSimilarity("full_name", term),
+            TrigramSimilarity("email", term),
+            output_field=FloatField(),
+        )
+    return queryset.annotate(search_rank=rank)
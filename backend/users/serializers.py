@@ -1,18 +1,144 @@
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import User, Driver, Customer, DriverDocument, CustomerDocument
+from audit import events
+from main.custom.serializers import ModelSerializer
+from . import activity, revocation
+from .models import (
+    User,
+    Driver,
+    Customer,
+    DriverDocument,
+    CustomerDocument,
+    UploadSession,
+)
 
+UNIQUE_FIELDS = ("phone_number", "email")
 
-class RegisterSerializer(serializers.ModelSerializer):
+
+def unique_errors(registrations):
+    """
+    Errors for every registration reusing a phone number or email, either
+    already registered or earlier in the same batch, found with one query.
+    """
+    values = {
+        field: {data[field] for data in registrations if data.get(field)}
+        for field in UNIQUE_FIELDS
+    }
+    condition = Q()
+    for field, field_values in values.items():
+        if field_values:
+            condition |= Q(**{f"{field}__in": field_values})
+    taken = {field: set() for field in UNIQUE_FIELDS}
+    if condition:
+        for row in User.objects.filter(condition).values_list(*UNIQUE_FIELDS):
+            for field, value in zip(UNIQUE_FIELDS, row):
+                taken[field].add(value)
+
+    errors = []
+    for data in registrations:
+        item_errors = {}
+        for field in UNIQUE_FIELDS:
+            value = data.get(field)
+            if value and value in taken[field]:
+                label = User._meta.get_field(field).verbose_name
+                item_errors[field] = [f"User with this {label} already exists."]
+            elif value:
+                taken[field].add(value)
+        errors.append(item_errors)
+    return errors
+
+
+class RegisterListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) > settings.REGISTER_BATCH_MAX_SIZE:
+            raise ValidationError(
+                {
+                    "non_field_errors": [
+                        f"At most {settings.REGISTER_BATCH_MAX_SIZE} registrations per batch."
+                    ]
+                }
+            )
+        # raised from here, errors keep the per item layout of child errors
+        validated = super().to_internal_value(data)
+        errors = unique_errors(validated)
+        if any(errors):
+            raise ValidationError(errors)
+        return validated
+
+    def create(self, validated_data):
+        users = [self.child.build_user(data) for data in validated_data]
+        try:
+            with transaction.atomic():
+                return User.objects.bulk_create(users, batch_size=500)
+        except IntegrityError:
+            # registered concurrently, since the check in validation
+            errors = unique_errors(validated_data)
+            if not any(errors):
+                raise
+            raise ValidationError(errors)
+
+
+class RegisterSerializer(ModelSerializer):
     class Meta:
         model = User
         fields = ("id", "full_name", "phone_number", "password", "gender", "date_of_birth", "email")
-        extra_kwargs = {"password": {"write_only": True}}
+        extra_kwargs = {
+            "password": {"write_only": True},
+            # checked together in validate() with a single query
+            "phone_number": {"validators": []},
+            "email": {"validators": []},
+        }
+        list_serializer_class = RegisterListSerializer
 
+    @staticmethod
+    def validate_email(value):
+        # email is unique, but any number of users may go without one
+        return value or None
+
+    def validate(self, attrs):
+        # batches are checked at once by RegisterListSerializer
+        if not isinstance(self.parent, serializers.ListSerializer):
+            errors = unique_errors([attrs])[0]
+            if errors:
+                raise ValidationError(errors)
+        return attrs
+
+    @staticmethod
+    def build_user(validated_data):
+        """Unsaved user with its password hashed, ready for a single INSERT."""
+        password = validated_data.pop("password")
+        user = User(**validated_data)
+        user.set_password(password)
+        user.set_full_name()
+        return user
 
-class PasswordSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        user = self.build_user(validated_data)
+        try:
+            with transaction.atomic():
+                user.save(force_insert=True)
+        except IntegrityError:
+            # registered concurrently, since the check in validate()
+            errors = unique_errors([validated_data])[0]
+            if not errors:
+                raise
+            raise ValidationError(errors)
+        return user
+
+
+class PasswordSerializer(ModelSerializer):
     password = serializers.CharField()
 
     class Meta:
@@ -32,7 +158,43 @@ class LoginSerializer(serializers.Serializer):
         raise serializers.ValidationError("Incorrect Credentials")
 
 
-class UserSerializer(serializers.ModelSerializer):
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # super() accepted the token, so it decodes
+        refresh = RefreshToken(attrs["refresh"])
+        if revocation.store.is_revoked(refresh[api_settings.JTI_CLAIM]):
+            raise InvalidToken("Token is revoked")
+        events.log(
+            "auth.token_refresh",
+            actor=refresh[api_settings.USER_ID_CLAIM],
+            request=self.context.get("request"),
+        )
+        return data
+
+
+class AuditedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        activity.tracker.touch(self.user.pk, login=True)
+        events.log(
+            "auth.token_obtain", actor=self.user, request=self.context.get("request")
+        )
+        return data
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    @staticmethod
+    def validate_refresh(value):
+        try:
+            return RefreshToken(value)
+        except TokenError as e:
+            raise ValidationError(e.args[0])
+
+
+class UserSerializer(ModelSerializer):
     role = serializers.SerializerMethodField()
 
     @staticmethod
@@ -54,7 +216,7 @@ class UserSerializer(serializers.ModelSerializer):
         ]
 
 
-class DriverSerializer(serializers.ModelSerializer):
+class DriverSerializer(ModelSerializer):
     user = UserSerializer()
 
     class Meta:
@@ -62,7 +224,7 @@ class DriverSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(ModelSerializer):
     user = UserSerializer()
 
     class Meta:
@@ -88,3 +250,27 @@ class DocumentUploadSerializer(serializers.Serializer):  # noqa
             )
         else:
             raise ValidationError({"role": "role required or not properly defined."})
+
+
+class UploadSessionSerializer(ModelSerializer):
+    role = serializers.CharField()
+
+    class Meta:
+        model = UploadSession
+        fields = ["id", "role", "size", "sha256", "offset", "expires_at"]
+        read_only_fields = ["offset", "expires_at"]
+
+    @staticmethod
+    def validate_role(value):
+        role = value[:1].upper()
+        if role not in ("D", "C"):
+            raise ValidationError("role has to be driver or customer.")
+        return role
+
+    @staticmethod
+    def validate_size(value):
+        if not 0 < value <= settings.UPLOAD_MAX_SIZE:
+            raise ValidationError(
+                f"size has to be between 1 and {settings.UPLOAD_MAX_SIZE} bytes."
+            )
+        return value
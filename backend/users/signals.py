@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from main.custom.cache import cache
+from .models import Customer, Driver, User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    cache.invalidate_tags(f"user:{instance.pk}")
+
+
+@receiver([post_save, post_delete], sender=Driver)
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_profile(sender, instance, **kwargs):
+    # cached users carry their profiles
+    cache.invalidate_tags(f"user:{instance.user_id}", "verification")
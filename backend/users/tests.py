@@ -0,0 +1,433 @@
+import io
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from main.custom.cache import cache as tiered_cache
+from main.custom.throttling import HASH_COST, CostThrottle
+from monitoring.testing import QueryBudgetMixin
+from . import activity, revocation, uploads
+from .models import RevokedToken, UploadSession, User
+from .serializers import RegisterSerializer
+
+PASSWORD = "correct-horse-9"
+# the signature and a little more, enough to pass as a PNG
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 56
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ClientAPIQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """The client API stays within the query budgets declared on its routes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            phone_number="+15550001000", password=PASSWORD, full_name="Budget"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # throttle buckets and cached users, requests start cold
+        cache.clear()
+        tiered_cache.local.clear()
+        # without its thread the revocation filter isn't loaded and tokens
+        # are checked against the table, the most the budgets allow for
+        patcher = mock.patch.object(revocation.store, "filter", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.refresh = RefreshToken.for_user(self.user)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {self.refresh.access_token}"}
+
+    def test_register(self):
+        response = self.assertQueryBudget(
+            "post",
+            "/register/",
+            {"phone_number": "+15550001001", "password": PASSWORD, "full_name": "New"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_register_batch(self):
+        self.user.is_staff = True
+        self.user.save(update_fields=["is_staff"])
+        registrations = [
+            {"phone_number": f"+1555000{i:04d}", "password": PASSWORD}
+            for i in range(2000, 2020)
+        ]
+        response = self.assertQueryBudget(
+            "post",
+            "/register/batch/",
+            registrations,
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_login(self):
+        response = self.assertQueryBudget(
+            "post",
+            "/login/",
+            {"username": self.user.phone_number, "password": PASSWORD},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_token(self):
+        response = self.assertQueryBudget(
+            "post",
+            "/token/",
+            {"phone_number": self.user.phone_number, "password": PASSWORD},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_refresh(self):
+        response = self.assertQueryBudget(
+            "post",
+            "/token/refresh/",
+            {"refresh": str(self.refresh)},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout(self):
+        response = self.assertQueryBudget(
+            "post",
+            "/logout/",
+            {"refresh": str(self.refresh)},
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 204)
+
+    def test_user(self):
+        response = self.assertQueryBudget("get", "/user/", **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+    def test_users(self):
+        User.objects.bulk_create(
+            User(phone_number=f"+1555000{i:04d}") for i in range(3000, 3020)
+        )
+        response = self.assertQueryBudget("get", "/users/", **self.auth)
+        self.assertEqual(response.status_code, 200)
+        response = self.assertQueryBudget("get", f"/users/{self.user.pk}/", **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_user(self):
+        response = self.assertQueryBudget(
+            "patch",
+            f"/users/{self.user.pk}/",
+            {"full_name": "Renamed"},
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_set_password(self):
+        response = self.assertQueryBudget(
+            "post",
+            f"/users/{self.user.pk}/set_password/",
+            {"password": "another-horse-9"},
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_verification_request(self):
+        documents = [
+            SimpleUploadedFile(f"document-{number}.png", PNG, "image/png")
+            for number in range(3)
+        ]
+        # one INSERT per document, at most UPLOAD_MAX_FILES of them
+        self.query_repeat_threshold = settings.UPLOAD_MAX_FILES + 1
+        response = self.assertQueryBudget(
+            "post",
+            "/users/request/",
+            {"role": "driver", "documents": documents},
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_upload_session(self):
+        response = self.assertQueryBudget(
+            "post",
+            "/uploads/",
+            {"role": "driver", "size": len(PNG)},
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 201)
+        path = f"/uploads/{response.json()['id']}/"
+
+        response = self.assertQueryBudget(
+            "patch",
+            path,
+            PNG,
+            content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET="0",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.assertQueryBudget("get", path, **self.auth)
+        self.assertEqual(response.json()["offset"], len(PNG))
+
+        response = self.assertQueryBudget("post", path + "finalize/", **self.auth)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(UploadSession.objects.exists())
+
+
+class CostThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_requests_share_the_window(self):
+        throttle = CostThrottle()
+        allowed = []
+
+        def request():
+            allowed.append(not throttle.consume("throttle:ip:test", 10, 200, 2))
+
+        threads = [threading.Thread(target=request) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(allowed), 20)
+        self.assertGreater(throttle.consume("throttle:ip:test", 10, 200, 2), 0)
+
+    def test_only_failed_logins_use_up_the_failure_bucket(self):
+        User.objects.create_user(phone_number="+15550002000", password=PASSWORD)
+        capacity, _ = settings.THROTTLE_BUCKETS["failure"]
+
+        def login(username, password, ip):
+            return self.client.post(
+                "/login/",
+                {"username": username, "password": password},
+                HTTP_X_FORWARDED_FOR=ip,
+            ).status_code
+
+        for _ in range(capacity // HASH_COST + 1):
+            self.assertEqual(login("+15550002000", PASSWORD, "198.51.100.1"), 200)
+        # another account each time, as in credential stuffing
+        statuses = [
+            login(f"+1555000210{number}", PASSWORD, "198.51.100.2")
+            for number in range(capacity // HASH_COST + 1)
+        ]
+        self.assertEqual(statuses[-1], 429)
+        self.assertNotIn(429, statuses[:-1])
+
+
+class RegisterRaceTest(TestCase):
+    """A registration losing the race for its phone number gets a 400."""
+
+    def test_single(self):
+        serializer = RegisterSerializer(
+            data={"phone_number": "+15550003000", "password": PASSWORD}
+        )
+        self.assertTrue(serializer.is_valid())
+        User.objects.create_user(phone_number="+15550003000")
+        with self.assertRaises(ValidationError) as raised:
+            serializer.save()
+        self.assertIn("phone_number", raised.exception.detail)
+
+    def test_batch(self):
+        serializer = RegisterSerializer(
+            data=[
+                {"phone_number": "+15550003001", "password": PASSWORD},
+                {"phone_number": "+15550003002", "password": PASSWORD},
+            ],
+            many=True,
+        )
+        self.assertTrue(serializer.is_valid())
+        User.objects.create_user(phone_number="+15550003002")
+        with self.assertRaises(ValidationError) as raised:
+            serializer.save()
+        self.assertEqual(raised.exception.detail[0], {})
+        self.assertIn("phone_number", raised.exception.detail[1])
+        self.assertFalse(User.objects.filter(phone_number="+15550003001").exists())
+
+
+class RegisterBlankEmailTest(TestCase):
+    """Registrations without an email don't take the blank one from each other."""
+
+    def test_blank_email(self):
+        for phone_number in ("+15550003003", "+15550003004"):
+            serializer = RegisterSerializer(
+                data={"phone_number": phone_number, "password": PASSWORD, "email": ""}
+            )
+            self.assertTrue(serializer.is_valid())
+            self.assertIsNone(serializer.save().email)
+
+        serializer = RegisterSerializer(
+            data=[
+                {"phone_number": "+15550003005", "password": PASSWORD, "email": ""},
+                {"phone_number": "+15550003006", "password": PASSWORD, "email": ""},
+            ],
+            many=True,
+        )
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(len(serializer.save()), 2)
+
+
+class RevocationStoreTest(TestCase):
+    def revoke(self, id, jti, created):
+        RevokedToken.objects.create(
+            id=id, jti=jti, expires_at=timezone.now() + timedelta(hours=1)
+        )
+        RevokedToken.objects.filter(pk=id).update(created=created)
+
+    def test_sync_picks_up_late_commits(self):
+        store = revocation.RevocationStore(capacity=1000, sync_overlap=60)
+        store.sync()
+        now = timezone.now()
+        self.revoke(200, "later", now)
+        store.sync()
+        self.assertTrue(store.is_revoked("later"))
+
+        # created (and numbered) before "later", committed after its sync
+        self.revoke(100, "earlier", now - timedelta(seconds=10))
+        store.sync()
+        self.assertTrue(store.is_revoked("earlier"))
+        # re-read by the overlapping syncs, added to the filter once
+        self.assertEqual(len(store.filter), 2)
+        store.sync()
+        self.assertEqual(len(store.filter), 2)
+
+    def test_checks_the_table_until_loaded(self):
+        store = revocation.RevocationStore()
+        self.revoke(300, "revoked", timezone.now())
+        with self.assertNumQueries(2):
+            self.assertTrue(store.is_revoked("revoked"))
+            self.assertFalse(store.is_revoked("fresh"))
+        self.assertIsNone(store.filter)
+
+    def test_rebuild_keeps_revocations_made_meanwhile(self):
+        store = revocation.RevocationStore(capacity=2)
+        store.sync()
+        expires_at = timezone.now() + timedelta(hours=1)
+        store.revoke("first", expires_at)
+        store.revoke("second", expires_at)
+        load = store._load
+
+        def load_then_revoke(queryset, bloom, lock):
+            load(queryset, bloom, lock)
+            store.revoke("meanwhile", expires_at)
+
+        # full, so the next sync builds a new filter
+        with mock.patch.object(store, "_load", load_then_revoke):
+            store.sync()
+        self.assertGreater(store.capacity, 2)
+        for jti in ("first", "second", "meanwhile"):
+            self.assertIn(jti, store.filter)
+
+
+class UserAdminSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            phone_number="+15550004000", email="admin@example.com"
+        )
+        for number, name in enumerate(["Ramesh", "Ram", "Sita"], 1):
+            User.objects.create_user(
+                phone_number=f"+1555000400{number}",
+                email=f"user{number}@example.com",
+                full_name=name,
+            )
+
+    def test_search(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            "/users/user/", {"q": "ram"}, HTTP_HOST="dj-admin.localhost"
+        )
+        self.assertEqual(response.status_code, 200)
+        names = [user.full_name for user in response.context["cl"].result_list]
+        if connection.vendor == "postgresql":
+            # best match first, not by phone number
+            self.assertEqual(names, ["Ram", "Ramesh"])
+        else:
+            self.assertCountEqual(names, ["Ram", "Ramesh"])
+
+        # a sorted column takes over
+        response = self.client.get(
+            "/users/user/", {"q": "ram", "o": "1"}, HTTP_HOST="dj-admin.localhost"
+        )
+        names = [user.full_name for user in response.context["cl"].result_list]
+        self.assertEqual(names, ["Ramesh", "Ram"])
+
+
+class ActivityTrackerTest(TestCase):
+    def test_flush_invalidates_cached_user(self):
+        user = User.objects.create_user(phone_number="+15550005000")
+        key = f"user:{user.pk}"
+        tiered_cache.get_or_set(key, lambda: User.objects.get(pk=user.pk), tags=[key])
+
+        activity.tracker.write([(user.pk, timezone.now(), False)])
+        cached = tiered_cache.get_or_set(
+            key, lambda: User.objects.get(pk=user.pk), tags=[key]
+        )
+        self.assertIsNotNone(cached.last_seen)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class UploadRaceTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="+15550006000")
+        token = RefreshToken.for_user(self.user).access_token
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        self.session = UploadSession.objects.create(
+            user=self.user, role="D", size=len(PNG), expires_at=uploads.expiry()
+        )
+
+    def test_retried_chunk_loses_to_the_first_attempt(self):
+        stale = UploadSession.objects.get(pk=self.session.pk)
+        uploads.write_chunk(self.session, 0, io.BytesIO(PNG), len(PNG))
+        # checked again once written, the retry rewrote the same bytes
+        with self.assertRaises(uploads.OffsetMismatch):
+            uploads.write_chunk(stale, 0, io.BytesIO(PNG), len(PNG))
+        with open(self.session.path, "rb") as file:
+            self.assertEqual(file.read(), PNG)
+
+    @skipUnless(connection.vendor == "postgresql", "needs row locks")
+    def test_concurrent_finalize(self):
+        uploads.write_chunk(self.session, 0, io.BytesIO(PNG), len(PNG))
+        statuses = []
+        assemble = uploads.assemble
+
+        def slow_assemble(session):
+            # room for the other request to get this far too
+            time.sleep(0.2)
+            return assemble(session)
+
+        def finalize():
+            response = Client().post(
+                f"/uploads/{self.session.pk}/finalize/", **self.auth
+            )
+            statuses.append(response.status_code)
+            connection.close()
+
+        threads = [threading.Thread(target=finalize) for _ in range(2)]
+        with mock.patch.object(uploads, "assemble", slow_assemble):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(sorted(statuses), [201, 404])
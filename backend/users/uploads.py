@@ -0,0 +1,149 @@
+"""
+Resumable document uploads.
+
+The client creates an UploadSession with the size of the file, PATCHes the
+bytes in chunks at the session's offset, and after a dropped connection asks
+for the offset and carries on from there. Chunks are written in place into
+a part file next to the documents, so finalizing renames it to its content
+address (see main.custom.uploads), nothing is copied or buffered in memory.
+
+A chunk is streamed to disk before the session row is locked, the lock only
+covers checking the offset again and moving it forward. The part file is
+written at the offsets clients send and never truncated, so a retried chunk
+racing its first attempt writes the same bytes to the same place and the
+loser gets a 409.
+Sessions expire UPLOAD_SESSION_TTL seconds after their last chunk and are
+removed by prune_upload_sessions.
+"""
+
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    NotFound,
+    ParseError,
+    UnsupportedMediaType,
+    ValidationError,
+)
+
+from main.custom.uploads import (
+    HEADER_SIZE,
+    StreamedUploadedFile,
+    UploadTooLarge,
+    sniff,
+)
+from .models import UploadSession
+
+READ_SIZE = 64 * 1024
+
+
+class OffsetMismatch(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Upload-Offset does not match the offset of the session."
+    default_code = "offset_mismatch"
+
+
+class ChecksumMismatch(ValidationError):
+    """The assembled file isn't what the client announced, start over."""
+
+
+def expiry():
+    return timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+
+def check_type(header):
+    content_type, extension = sniff(header)
+    if content_type not in settings.UPLOAD_CONTENT_TYPES:
+        raise UnsupportedMediaType(
+            content_type or "unknown",
+            f"Documents have to be one of {', '.join(settings.UPLOAD_CONTENT_TYPES)}.",
+        )
+    return content_type, extension
+
+
+def check_offset(session, offset, length):
+    if offset != session.offset:
+        raise OffsetMismatch(
+            f"Upload-Offset is {offset}, the session is at {session.offset}."
+        )
+    if offset + length > session.size:
+        raise UploadTooLarge(f"The upload is {session.size} bytes.")
+
+
+def write_chunk(session, offset, stream, length):
+    """Write `length` bytes of `stream` at `offset` of the session's file."""
+    if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadTooLarge(
+            f"Chunks are at most {settings.UPLOAD_CHUNK_MAX_SIZE} bytes."
+        )
+    check_offset(session, offset, length)
+
+    os.makedirs(os.path.dirname(session.path), exist_ok=True)
+    written = 0
+    with os.fdopen(os.open(session.path, os.O_RDWR | os.O_CREAT, 0o644), "r+b") as file:
+        file.seek(offset)
+        while written < length:
+            data = stream.read(min(READ_SIZE, length - written))
+            if not data:
+                break
+            if offset == 0 and written == 0 and len(data) >= HEADER_SIZE:
+                check_type(data[:HEADER_SIZE])
+            file.write(data)
+            written += len(data)
+    if written != length:
+        raise ParseError(f"Expected {length} bytes, got {written}.")
+
+    with transaction.atomic():
+        session = (
+            UploadSession.objects.select_for_update().filter(pk=session.pk).first()
+        )
+        if session is None:
+            raise NotFound("The upload was finalized or has expired.")
+        check_offset(session, offset, length)
+        session.offset += written
+        session.expires_at = expiry()
+        session.save(update_fields=["offset", "expires_at"])
+    return session
+
+
+def assemble(session):
+    """
+    The completed file of `session` as an upload named after its SHA-256,
+    which storages save with a rename.
+    """
+    if session.offset != session.size:
+        raise ValidationError(
+            {"offset": f"{session.size - session.offset} bytes are missing."}
+        )
+    file = open(session.path, "rb")
+    try:
+        content_type, extension = check_type(file.read(HEADER_SIZE))
+        file.seek(0)
+        sha256 = hashlib.sha256()
+        for data in iter(lambda: file.read(READ_SIZE), b""):
+            sha256.update(data)
+        file.seek(0)
+    except Exception:
+        file.close()
+        raise
+    digest = sha256.hexdigest()
+    if session.sha256 and session.sha256.lower() != digest:
+        file.close()
+        raise ChecksumMismatch({"sha256": "The upload does not match its checksum."})
+    return StreamedUploadedFile(
+        file, digest + extension, content_type, session.size, digest
+    )
+
+
+def discard(session):
+    try:
+        os.remove(session.path)
+    except FileNotFoundError:
+        pass
+    session.delete()
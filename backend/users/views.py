@@ -1,11 +1,31 @@
+import hashlib
+import mimetypes
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import redirect
+from django.utils._os import safe_join
 from django.views.generic import TemplateView
 from django_datatables_view.base_datatable_view import BaseDatatableView
-from rest_framework.decorators import api_view
+from firebase_admin import messaging
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+)
+from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from audit import events
+from main.custom.cache import cache
 from main.custom.permissions import StaffUserRequiredMixin
-from .models import Customer, Driver, User
+from notifications import push
+from notifications.broker import notify
+from .models import Customer, CustomerDocument, Driver, DriverDocument, User
 
 
 @staff_member_required
@@ -22,5 +42,76 @@ def handle_user_verification(request):
 
     instance.is_verified = response
     instance.save(update_fields=["is_verified"])
+    events.log(
+        "profile.verification",
+        request=request,
+        user_id=instance.user_id,
+        role=type(instance).__name__.lower(),
+        verified=response,
+    )
+    notify(
+        instance.user_id,
+        "profile.verification",
+        role="D" if isinstance(instance, Driver) else "C",
+        verified=response,
+    )
+    # the app may not be open, unlike the websocket the devices get it anyway
+    push.send_to_user_on_commit(
+        instance.user_id,
+        messaging.Message(
+            notification=messaging.Notification(
+                title="Profile verified" if response else "Profile not verified"
+            ),
+            data={"event": "profile.verification", "verified": str(response).lower()},
+        ),
+    )
 
     return redirect(request.META["HTTP_REFERER"])
+
+
+def get_document_owner_ids(path):
+    """
+    Ids of the users owning the document stored at `path`, cached so pages
+    showing many documents don't query once per file.
+    """
+
+    def load_owner_ids():
+        return list(
+            DriverDocument.objects.filter(image=path)
+            .values_list("driver__user_id", flat=True)
+            .union(
+                CustomerDocument.objects.filter(image=path).values_list(
+                    "customer__user_id", flat=True
+                )
+            )
+        )
+
+    key = "media-owners:" + hashlib.sha1(path.encode()).hexdigest()
+    return cache.get_or_set(key, load_owner_ids, settings.MEDIA_ACL_CACHE_TIMEOUT)
+
+
+@api_view(["GET", "HEAD"])
+@authentication_classes([SessionAuthentication, JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def serve_document(request, path):
+    path = posixpath.normpath(path).lstrip("/")
+    if path.startswith(".."):
+        raise Http404
+    user = request.user
+    if not user.is_staff and user.pk not in get_document_owner_ids(path):
+        raise Http404
+
+    if not settings.MEDIA_ACCEL_REDIRECT:
+        try:
+            return FileResponse(open(safe_join(settings.MEDIA_ROOT, path), "rb"))
+        except (FileNotFoundError, ValueError):
+            raise Http404
+
+    # nginx streams the file from its internal location (sendfile + ranges)
+    response = HttpResponse()
+    response["Content-Type"] = (
+        mimetypes.guess_type(path)[0] or "application/octet-stream"
+    )
+    response["Cache-Control"] = "private, max-age=3600"
+    response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+    return response